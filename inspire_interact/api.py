@@ -4,33 +4,39 @@ from argparse import ArgumentParser
 import os
 import shutil
 import socket
-import time
+import subprocess
+import sys
 
 import flask
-from flask import request, Response, render_template, send_file, send_from_directory
+from flask import (
+    request, Response, render_template, send_from_directory, stream_with_context,
+)
 from flask.json import jsonify
 from flask_cors import cross_origin
+from werkzeug.security import safe_join
 from jinja2.exceptions import TemplateNotFound
-import pandas as pd
-import yaml
+import psutil
 
+from inspire_interact.archive_cache import get_archive_key, stream_and_cache_archive
+from inspire_interact.cache_manager import fetch_cache_entry
 from inspire_interact.clean_up import (
     clear_queue,
     cancel_job_helper,
 )
 from inspire_interact.constants import (
-    ALL_CONFIG_KEYS,
-    CPUS_KEY,
-    FRAGGER_MEMORY_KEY,
-    FRAGGER_PATH_KEY,
+    ARCHIVE_CACHE,
+    ARCHIVE_CACHE_SIZE_KEY,
+    CACHE_PATH,
+    IMPORT_ROOTS_KEY,
     KEY_FILES,
-    MHCPAN_KEY,
     INTERACT_HOME_KEY,
     MODE_KEY,
-    QUEUE_PATH,
-    RESCORE_COMMAND_KEY,
+    QUEUE_POLICY_KEY,
+    REPORT_CACHE_SIZE_KEY,
     SERVER_ADDRESS_KEY,
-    SKYLINE_RUNNER_KEY,
+    SERVER_THREADS_KEY,
+    SERVER_WORKERS_KEY,
+    WORKER_LOG_PATH,
     ZIP_PATHS,
 )
 from inspire_interact.handle_results import (
@@ -39,20 +45,73 @@ from inspire_interact.handle_results import (
     deal_with_queue,
     deal_with_success,
     deal_with_waiting,
-    fetch_queue_and_task,
-    safe_fetch,
 )
+from inspire_interact.http_cache import (
+    compress_response, send_report, send_result_file, send_static_file,
+)
+from inspire_interact.import_manager import import_files, list_import_folder
 from inspire_interact.inspire_execute import execute_inspire
+from inspire_interact.job_status import (
+    STATUS_STREAM_LIFETIME,
+    close_status_stream,
+    get_job_status,
+    open_status_stream,
+    stream_job_status,
+)
+from inspire_interact.queue_manager import connect_queue, get_project_job, get_worker_pid
+from inspire_interact.results_tables import query_results_table
+from inspire_interact.server import run_production_server
+from inspire_interact.upload_manager import (
+    combine_proteomes,
+    get_upload_name,
+    start_upload,
+    write_chunk,
+)
 from inspire_interact.utils import (
-    check_pids,
     generate_raw_file_table,
     format_header_and_footer,
     read_meta,
+    read_server_config,
+    write_meta,
 )
+from inspire_interact.zip_stream import stream_zip
 
 app = flask.Flask(__name__, template_folder='templates')
 
 
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """ Function to link static files with their version, so that browsers
+        can cache them until they change.
+    """
+    if endpoint == 'static' and 'filename' in values:
+        static_path = os.path.join(app.static_folder, values['filename'])
+        if os.path.isfile(static_path):
+            values['v'] = int(os.path.getmtime(static_path))
+
+
+def serve_static(filename):
+    """ Endpoint sending static files, compressed and with cache headers.
+    """
+    if (static_path := safe_join(app.static_folder, filename)) is None or not os.path.isfile(
+        static_path
+    ):
+        return render_template('404.html', **format_header_and_footer(
+            app.config[SERVER_ADDRESS_KEY]
+        )), 404
+    return send_static_file(request, app.static_folder, filename)
+
+
+app.view_functions['static'] = serve_static
+
+
+@app.after_request
+def compress_text_response(response):
+    """ Function to compress text responses and answer unchanged ones with 304.
+    """
+    return compress_response(request, response)
+
+
 @app.route('/favicon.ico')
 @cross_origin()
 def favicon():
@@ -65,14 +124,6 @@ def favicon():
     )
 
 
-@app.route('/static/<path:path>')
-@cross_origin()
-def send_static(path):
-    """ Function to send static files from the static folder.
-    """
-    return send_from_directory('static', path)
-
-
 @app.route('/interact/user/<user>', methods=['GET'])
 @cross_origin()
 def get_user(user):
@@ -96,12 +147,8 @@ def fetch_page_no_arguments(page):
     additional_args = format_header_and_footer(app.config[SERVER_ADDRESS_KEY])
     try:
         if page == 'view-queue':
-            create_queue_fig(
-                app.config[INTERACT_HOME_KEY],
-                f'{app.config[INTERACT_HOME_KEY]}/locks/'
-            )
-            additional_args['queue_svg'] = safe_fetch(
-                f'{app.config[INTERACT_HOME_KEY]}/locks/queue.svg'
+            additional_args['queue_svg'] = create_queue_fig(
+                app.config[INTERACT_HOME_KEY], app.config[QUEUE_POLICY_KEY],
             )
         return render_template(
             f'{page}.html',
@@ -136,13 +183,8 @@ def fetch_page(page, user, project):
         except TemplateNotFound:
             return render_template('404.html', **header_and_footer), 404
 
-    try:
-        core_config = read_meta(project_home, 'core')
-        variant = core_config['variant']
-    except:
-        time.sleep(3)
-        core_config = read_meta(project_home, 'core')
-        variant = core_config['variant']
+    # Metadata is replaced atomically so it is never read partly written.
+    variant = read_meta(project_home, 'core')['variant']
 
     if page == 'proteome':
         page += f'-{variant}'
@@ -191,50 +233,116 @@ def upload_file(user, project, file_type):
     home_key= app.config[INTERACT_HOME_KEY]
     upload_home = f'{home_key}/projects/{user}/{project}/{file_type}'
 
-    if not os.path.isdir(f'{home_key}/projects/{user}/{project}/{file_type}'):
-        os.mkdir(f'projects/{user}/{project}/{file_type}')
+    if not os.path.isdir(upload_home):
+        os.mkdir(upload_home)
 
     uploaded_files = request.files.getlist("files")
 
-    if file_type == 'proteome':
-        uploaded_files[0].save(
-            f'{upload_home}/proteome_{uploaded_files[0].filename}'
-        )
-    elif file_type == 'proteome-select':
-        uploaded_files[0].save(
-            f'{upload_home}/host_{uploaded_files[0].filename}'
+    for idx, u_file in enumerate(uploaded_files):
+        u_file.save(
+            f'{upload_home}/{get_upload_name(file_type, u_file.filename, idx)}'
         )
-        uploaded_files[1].save(
-            f'{upload_home}/pathogen_{uploaded_files[1].filename}'
+    if file_type == 'proteome-select':
+        combine_proteomes(upload_home, uploaded_files[0].filename, uploaded_files[1].filename)
+
+    return jsonify(message='Ok')
+
+
+@app.route('/interact/upload/<user>/<project>/<file_type>/start', methods=['POST'])
+@cross_origin()
+def start_chunked_upload(user, project, file_type):
+    """ Function to start or resume a chunked upload of a file.
+    """
+    return jsonify(start_upload(
+        app.config[INTERACT_HOME_KEY], user, project, file_type, request.json
+    ))
+
+
+@app.route('/interact/upload/<user>/<project>/<file_type>/<upload_id>', methods=['PUT'])
+@cross_origin()
+def upload_chunk(user, project, file_type, upload_id):
+    """ Function to receive a chunk of a file, written at the offset given.
+    """
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify(message='The offset of the chunk must be an integer.'), 400
+    checksum = request.headers.get('X-Chunk-CRC32', type=int)
+    if checksum is None:
+        return jsonify(
+            message='The X-Chunk-CRC32 header must give the CRC32 checksum of the chunk.',
+            offset=offset,
+        ), 400
+    try:
+        received, complete, accepted = write_chunk(
+            app.config[INTERACT_HOME_KEY],
+            user,
+            project,
+            file_type,
+            upload_id,
+            offset,
+            request.stream,
+            checksum,
         )
-        with open(
-            f'{upload_home}/proteome_combined.fasta', mode='w', encoding='UTF-8',
-        ) as total_file:
-            for prot_file in (
-                f'{upload_home}/host_{uploaded_files[0].filename}',
-                f'{upload_home}/pathogen_{uploaded_files[1].filename}',
-            ):
-                with open(
-                    prot_file, mode='r', encoding='UTF-8'
-                ) as source_file:
-                    for line in source_file:
-                        total_file.write(line)
-    elif file_type == 'search':
-        # For search if there are multiple msms.txt, etc, we avoid overwriting
-        for idx, u_file in enumerate(uploaded_files):
-            renamed_file = f'{str(idx+1)}_' + u_file.filename.replace(" ", "_")
-            u_file.save(
-                f'{upload_home}/{renamed_file}'
-            )
-    else:
-        # For raw files we preserve name
-        for u_file in uploaded_files:
-            u_file.save(
-                f'{upload_home}/{u_file.filename}'
-            )
+    except KeyError:
+        return jsonify(message='Unknown upload.'), 404
+    except ValueError as err:
+        return jsonify(message=str(err), offset=offset), 400
+    if not accepted:
+        # A different chunk was expected, the client continues from this offset.
+        return jsonify(message='Unexpected offset.', offset=received), 409
+    return jsonify(offset=received, complete=complete)
+
 
+@app.route('/interact/upload/<user>/<project>/<file_type>/finish', methods=['POST'])
+@cross_origin()
+def finish_chunked_upload(user, project, file_type):
+    """ Function called once all files of an upload are complete.
+    """
+    if file_type == 'proteome-select':
+        file_names = request.json['fileNames']
+        combine_proteomes(
+            f'{app.config[INTERACT_HOME_KEY]}/projects/{user}/{project}/{file_type}',
+            file_names[0],
+            file_names[1],
+        )
     return jsonify(message='Ok')
 
+
+@app.route('/interact/import/browse', methods=['GET'])
+@cross_origin()
+def browse_import_folder():
+    """ Function to list a folder of the storage files can be imported from.
+    """
+    try:
+        folder_contents = list_import_folder(
+            app.config[IMPORT_ROOTS_KEY], request.args.get('path'),
+        )
+    except ValueError as err:
+        return jsonify(message=str(err)), 403
+    except FileNotFoundError:
+        return jsonify(message='Folder not found.'), 404
+    return jsonify(message=folder_contents)
+
+
+@app.route('/interact/import/<user>/<project>/<file_type>', methods=['POST'])
+@cross_origin()
+def import_server_files(user, project, file_type):
+    """ Function to import files from the server's storage into a project.
+    """
+    try:
+        imported_files = import_files(
+            app.config[INTERACT_HOME_KEY],
+            app.config[IMPORT_ROOTS_KEY],
+            user,
+            project,
+            file_type,
+            request.json['paths'],
+        )
+    except ValueError as err:
+        return jsonify(message=str(err)), 400
+    return jsonify(message=imported_files)
+
+
 @app.route('/interact/metadata', methods=['POST'])
 @cross_origin()
 def upload_metadata():
@@ -244,12 +352,9 @@ def upload_metadata():
     user = config_data.pop('user')
     project = config_data.pop('project')
     metadata_type = config_data.pop('metadata_type')
-    with open(
-        f'projects/{user}/{project}/{metadata_type}_metadata.yml',
-        'w',
-        encoding='UTF-8'
-    ) as yaml_out:
-        yaml.dump(config_data, yaml_out)
+    write_meta(
+        f'{app.config[INTERACT_HOME_KEY]}/projects/{user}/{project}', metadata_type, config_data
+    )
     return jsonify(message='Ok')
 
 
@@ -338,6 +443,52 @@ def delete_project():
     )
 
 
+def send_zip_stream(user, project, folder_path, download_name, extra_files=None):
+    """ Function to send a zip archive of a folder, from the archive cache if
+        the folder is unchanged and otherwise streamed as it is built.
+    """
+    home_key = app.config[INTERACT_HOME_KEY]
+    max_size = app.config[ARCHIVE_CACHE_SIZE_KEY]
+    if not max_size:
+        zip_stream = stream_zip(folder_path, extra_files)
+    else:
+        key = get_archive_key(user, project, download_name, folder_path, extra_files)
+        if (entry_path := fetch_cache_entry(home_key, ARCHIVE_CACHE, key)) is None and (
+            request.range is not None
+        ):
+            # A download can only be resumed from a whole archive, build it first.
+            for _ in stream_and_cache_archive(
+                home_key, key, folder_path, extra_files, max_size
+            ):
+                pass
+            entry_path = f'{CACHE_PATH.format(home_key=home_key, cache_name=ARCHIVE_CACHE)}/{key}'
+        if entry_path is not None:
+            try:
+                return send_result_file(
+                    request, entry_path, 'application/zip', download_name=download_name,
+                )
+            except FileNotFoundError:
+                # Evicted since the lookup, build it again.
+                pass
+        zip_stream = stream_and_cache_archive(
+            home_key, key, folder_path, extra_files, max_size
+        )
+    return Response(
+        zip_stream,
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={download_name}'},
+    )
+
+
+def remove_stale_archives(project_home):
+    """ Function to remove the archives written next to the outputs by earlier
+        versions, which doubled the disk used by a project.
+    """
+    for zip_path in ['inspireOutput', *ZIP_PATHS.values()]:
+        if os.path.exists(f'{project_home}/{zip_path}.zip'):
+            os.remove(f'{project_home}/{zip_path}.zip')
+
+
 @app.route('/interact/download/<user>/<project>', methods=['GET'])
 @cross_origin()
 def download_project(user, project):
@@ -345,12 +496,16 @@ def download_project(user, project):
     """
     home_key= app.config[INTERACT_HOME_KEY]
     project_home = f'{home_key}/projects/{user}/{project}'
-    if os.path.exists(f'{project_home}/config.yml'):
-        shutil.copyfile(f'{project_home}/config.yml', f'{project_home}/inspireOutput/config.yml')
     if not os.path.exists(f'{project_home}/inspireOutput'):
         os.mkdir((f'{project_home}/inspireOutput'))
-    shutil.make_archive(f'{project_home}/inspireOutput', 'zip', f'{project_home}/inspireOutput')
-    return send_file(f'{project_home}/inspireOutput.zip', mimetype='zip', as_attachment=True)
+    remove_stale_archives(project_home)
+    return send_zip_stream(
+        user,
+        project,
+        f'{project_home}/inspireOutput',
+        'inspireOutput.zip',
+        extra_files={'config.yml': f'{project_home}/config.yml'},
+    )
 
 
 @app.route('/interact/cancel', methods=['POST'])
@@ -387,7 +542,7 @@ def run_inspire_core():
 
     try:
         # If task is already running or queued, do nothing:
-        if check_pids(project_home, 'inspire') == 'waiting':
+        if get_project_job(app.config[INTERACT_HOME_KEY], user, project) is not None:
             return response
 
         execute_inspire(app.config, project_home, config_dict)
@@ -409,30 +564,11 @@ def check_results(user, project, workflow):
     if not os.path.exists(project_home):
         return render_template('404.html', **header_and_footer), 404
 
-    time.sleep(0.5)
-    status = check_pids(project_home, workflow)
-
-    # Task incomplete - either running or queueing (or total failure)
-    if status == 'waiting':
-        queue_df, task_id = fetch_queue_and_task(project_home, app.config[INTERACT_HOME_KEY])
-
-        if not queue_df.shape[0]:
-            time.sleep(2)
-            queue_df, task_id = fetch_queue_and_task(
-                project_home, app.config[INTERACT_HOME_KEY],
-            )
+    job = get_project_job(app.config[INTERACT_HOME_KEY], user, project)
 
-        if not queue_df.shape[0]:
-            return deal_with_failure(
-                project_home,
-                server_address,
-                user,
-                project,
-                workflow,
-                header_and_footer
-            )
-
-        if int(queue_df['taskID'].iloc[0]) == task_id:
+    # Task incomplete - either running or queueing.
+    if job is not None:
+        if job['state'] == 'running':
             return deal_with_waiting(
                 project_home,
                 server_address,
@@ -443,15 +579,15 @@ def check_results(user, project, workflow):
 
         return deal_with_queue(
             app.config[INTERACT_HOME_KEY],
-            project_home,
             server_address,
+            user,
+            project,
             header_and_footer,
+            app.config[QUEUE_POLICY_KEY],
         )
 
     # Task complete : either in success or failure.
-    with open(f'projects/{user}/{project}/core_metadata.yml', 'r', encoding='UTF-8') as stream:
-        core_config = yaml.safe_load(stream)
-        variant = core_config['variant']
+    variant = read_meta(project_home, 'core')['variant']
     if variant == 'pathogen':
         inspire_select_visible = 'visible'
         key_file = 'epitope/potentialEpitopeCandidates.xlsx'
@@ -479,6 +615,46 @@ def check_results(user, project, workflow):
     )
 
 
+@app.route('/interact/status/<user>/<project>', methods=['GET'])
+@cross_origin()
+def job_status(user, project):
+    """ Function to return the status of a project's job.
+    """
+    home_key = app.config[INTERACT_HOME_KEY]
+    if not os.path.exists(f'{home_key}/projects/{user}/{project}'):
+        return jsonify(message='Project not found.'), 404
+    return jsonify(get_job_status(home_key, user, project, app.config[QUEUE_POLICY_KEY]))
+
+
+@app.route('/interact/status/<user>/<project>/stream', methods=['GET'])
+@cross_origin()
+def job_status_stream(user, project):
+    """ Function to stream the status of a project's job as server-sent events,
+        sent each time the task statuses or the queue change. Once too many
+        threads stream statuses the page is told to poll the status instead.
+    """
+    home_key = app.config[INTERACT_HOME_KEY]
+    if not os.path.exists(f'{home_key}/projects/{user}/{project}'):
+        return jsonify(message='Project not found.'), 404
+    stream_id = open_status_stream(app.config[SERVER_THREADS_KEY])
+    if stream_id is None:
+        # Browsers do not reconnect after an error status.
+        return (
+            jsonify(message='Too many status streams, poll the status instead.'),
+            503,
+            {'Retry-After': str(STATUS_STREAM_LIFETIME)},
+        )
+    response = Response(
+        stream_with_context(stream_job_status(
+            home_key, user, project, app.config[QUEUE_POLICY_KEY],
+        )),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    response.call_on_close(lambda: close_status_stream(stream_id))
+    return response
+
+
 @app.route('/interact/get_results/<user>/<project>/<workflow>', methods=['GET'])
 @cross_origin()
 def get_results_file(user, project, workflow):
@@ -488,16 +664,17 @@ def get_results_file(user, project, workflow):
     server_address = app.config[SERVER_ADDRESS_KEY]
     project_home = f'{home_key}/projects/{user}/{project}'
 
-    # The quantification results require a zip archive
-    if workflow in ('quantification', 'inspirePathogen'):
-        if os.path.exists(f'{project_home}/{ZIP_PATHS[workflow]}.zip'):
-            os.remove(f'{project_home}/{ZIP_PATHS[workflow]}.zip')
-
-        shutil.make_archive(
-            f'{project_home}/{ZIP_PATHS[workflow]}',
-            'zip',
-            f'{project_home}/{ZIP_PATHS[workflow]}',
-        )
+    # The quantification and pathogen results are sent as a zip archive
+    if workflow in ZIP_PATHS:
+        remove_stale_archives(project_home)
+        if os.path.exists(f'{project_home}/{ZIP_PATHS[workflow]}'):
+            return send_zip_stream(
+                user,
+                project,
+                f'{project_home}/{ZIP_PATHS[workflow]}',
+                os.path.basename(KEY_FILES[workflow]),
+            )
+        return Response()
 
     # The following results require the relevant results file to be sent:
     if workflow in (
@@ -505,29 +682,44 @@ def get_results_file(user, project, workflow):
         'psms',
         'peptides',
         'inspireLog',
-        'inspirePathogen',
-        'quantification'
     ):
         if os.path.exists(f'{project_home}/{KEY_FILES[workflow]}'):
-            kwargs = {}
-            if KEY_FILES[workflow].endswith('.zip'):
-                kwargs['mimetype'] = 'zip'
-                kwargs['as_attachment'] = True
-            return send_file(f'{project_home}/{KEY_FILES[workflow]}', **kwargs)
+            return send_result_file(request, f'{project_home}/{KEY_FILES[workflow]}')
 
     # The following send html reports
     if workflow in ('epitopeReport', 'performance', 'quantReport'):
-        if (contents := safe_fetch(f'{project_home}/{KEY_FILES[workflow]}')):
+        if os.path.exists(f'{project_home}/{KEY_FILES[workflow]}'):
+            replacements = None
             if workflow == 'epitopeReport':
-                contents = contents.replace(
-                    f'{project_home}/inspireOutput/epitope/spectralPlots.pdf',
+                replacements = {
+                    f'{project_home}/inspireOutput/epitope/spectralPlots.pdf':
                     f'http://{server_address}:5000/interact/get_results/{user}/{project}/epitopePlots',
-                )
-
-            return contents
+                }
+            return send_report(
+                request,
+                home_key,
+                app.config[REPORT_CACHE_SIZE_KEY],
+                f'{project_home}/{KEY_FILES[workflow]}',
+                replacements,
+            )
 
     return Response()
 
+
+@app.route('/interact/query_results/<user>/<project>/<table_name>', methods=['GET'])
+@cross_origin()
+def query_results(user, project, table_name):
+    """ Function to return a page of the PSM or peptide assignments of a
+        project, filtered and sorted as requested.
+    """
+    project_home = f'{app.config[INTERACT_HOME_KEY]}/projects/{user}/{project}'
+    try:
+        return jsonify(query_results_table(project_home, table_name, request.args))
+    except (KeyError, FileNotFoundError) as err:
+        return jsonify(message=str(err)), 404
+    except ValueError as err:
+        return jsonify(message=str(err)), 400
+
 def get_arguments():
     """ Function to collect command line arguments.
 
@@ -548,20 +740,52 @@ def get_arguments():
         default='server',
         required=False,
     )
+    parser.add_argument(
+        '--worker',
+        choices=['embedded', 'external'],
+        default='embedded',
+        required=False,
+        help=(
+            'Whether to start the inSPIRE worker alongside the web server, or use one '
+            'started separately with inspire-interact-worker.'
+        ),
+    )
 
     return parser.parse_args()
 
 
+def start_worker(config_file, interact_home):
+    """ Function to start the inSPIRE worker in the background unless one is
+        already running.
+
+    Returns
+    -------
+    worker_process : subprocess.Popen or None
+        The worker process, if a new worker was started.
+    """
+    worker_pid = get_worker_pid(interact_home)
+    if worker_pid is not None and psutil.pid_exists(worker_pid):
+        return None
+
+    with open(WORKER_LOG_PATH.format(home_key=interact_home), 'a', encoding='UTF-8') as log_file:
+        return subprocess.Popen(
+            [
+                sys.executable, '-m', 'inspire_interact.worker',
+                '--config_file', os.path.abspath(config_file),
+                '--interact_home', interact_home,
+            ],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+
 def main():
     """ Main function to run inSPIRE-interactive.
     """
     args = get_arguments()
 
-    with open(args.config_file, 'r', encoding='UTF-8') as stream:
-        config_dict = yaml.safe_load(stream)
-    for config_key in config_dict:
-        if config_key not in ALL_CONFIG_KEYS:
-            raise ValueError(f'Unrecognised key {config_key} found in config file.')
+    app.config.update(read_server_config(args.config_file))
 
     app.config[INTERACT_HOME_KEY] = os.getcwd()
     app.config[INTERACT_HOME_KEY] = app.config[INTERACT_HOME_KEY].replace(
@@ -571,18 +795,8 @@ def main():
         os.mkdir('projects')
     if not os.path.exists('locks'):
         os.mkdir('locks')
-    if not os.path.exists(QUEUE_PATH.format(
-        home_key=app.config[INTERACT_HOME_KEY])
-    ):
-        empty_queue_df = pd.DataFrame({
-            'user': [],
-            'project': [],
-            'taskID': [],
-            'status': [],
-        })
-        empty_queue_df.to_csv(QUEUE_PATH.format(
-            home_key=app.config[INTERACT_HOME_KEY]), index=False
-        )
+    # Creates the queue database, migrating any queue from older versions.
+    connect_queue(app.config[INTERACT_HOME_KEY])
 
     if args.mode == 'local':
         host_name = socket.gethostname()
@@ -593,27 +807,29 @@ def main():
     else:
         raise ValueError(f'Unknown mode {args.mode} requested')
 
-    app.config[MHCPAN_KEY] = config_dict.get(MHCPAN_KEY)
-    app.config[FRAGGER_PATH_KEY] = config_dict.get(FRAGGER_PATH_KEY)
-    app.config[FRAGGER_MEMORY_KEY] = config_dict.get(FRAGGER_MEMORY_KEY)
-    app.config[CPUS_KEY] = config_dict.get(CPUS_KEY, 1)
-    app.config[SKYLINE_RUNNER_KEY] = config_dict.get(SKYLINE_RUNNER_KEY)
-    app.config[RESCORE_COMMAND_KEY] = config_dict.get(RESCORE_COMMAND_KEY, 'percolator')
-    if app.config[SKYLINE_RUNNER_KEY] is not None:
-         app.config[SKYLINE_RUNNER_KEY] = app.config[SKYLINE_RUNNER_KEY].replace(
-            '\\', '/'
-        )
-
     app.config[MODE_KEY] = args.mode
 
+    worker_process = None
+    if args.worker == 'embedded':
+        worker_process = start_worker(args.config_file, app.config[INTERACT_HOME_KEY])
+
     print('\n\033[1m\033[92m\nAddresses to navigate to')
     print(f'If you are running inSPIRE-Interactive on a remote server navigate to \033[96mhttp://{host_name}:5000/interact-page/home\033[92m')
     print(f'If you are running inSPIRE-Interactive on your local machine navigate to \033[96mhttp://127.0.0.1:5000/interact-page/home\033[92m')
     print('\n\033[0m\n')
-    app.run(host='0.0.0.0', debug = False)
-
-    print('Quitting, first clearing queue.')
-    clear_queue(app.config[INTERACT_HOME_KEY])
+    if args.mode == 'server':
+        run_production_server(
+            app, app.config[SERVER_WORKERS_KEY], app.config[SERVER_THREADS_KEY],
+        )
+    else:
+        app.run(host='0.0.0.0', debug = False, threaded=True)
+
+    # An external worker keeps running jobs after the web server stops.
+    if args.worker == 'embedded':
+        print('Quitting, first clearing queue.')
+        clear_queue(app.config[INTERACT_HOME_KEY])
+        if worker_process is not None:
+            worker_process.terminate()
 
 
 if __name__ == '__main__':
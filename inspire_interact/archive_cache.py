@@ -0,0 +1,115 @@
+""" Functions for the cache of result archives. Each archive is keyed by a
+    manifest of the files it contains, i.e. their names, sizes and
+    modification times, so a cached archive is served for as long as its
+    folder is unchanged and rebuilt once it changes.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from inspire_interact.cache_manager import add_cache_entry
+from inspire_interact.constants import ARCHIVE_CACHE, CACHE_PATH, KEY_FILES, ZIP_PATHS
+from inspire_interact.queue_manager import queue_transaction
+from inspire_interact.zip_stream import get_zip_members, stream_zip
+
+
+def get_project_archives(interact_home, user, project):
+    """ Function to find the archives which can be downloaded for a project.
+
+    Returns
+    -------
+    project_archives : dict
+        Map of archive name to the folder and extra files it contains.
+    """
+    project_home = f'{interact_home}/projects/{user}/{project}'
+    project_archives = {
+        'inspireOutput.zip': (
+            f'{project_home}/inspireOutput', {'config.yml': f'{project_home}/config.yml'},
+        ),
+    }
+    for workflow, zip_path in ZIP_PATHS.items():
+        if os.path.exists(f'{project_home}/{zip_path}'):
+            project_archives[os.path.basename(KEY_FILES[workflow])] = (
+                f'{project_home}/{zip_path}', None,
+            )
+    return project_archives
+
+
+def get_archive_key(user, project, archive_name, folder_path, extra_files=None):
+    """ Function to create the cache key of an archive from the manifest of
+        the files it would contain.
+    """
+    manifest = []
+    for member_name, file_path in get_zip_members(folder_path, extra_files):
+        file_stat = os.stat(file_path)
+        manifest.append([member_name, file_stat.st_size, file_stat.st_mtime_ns])
+    project_hash = hashlib.sha256(f'{user}/{project}'.encode()).hexdigest()[:16]
+    manifest_hash = hashlib.sha256(json.dumps(manifest).encode()).hexdigest()[:16]
+    return f'{project_hash}/{archive_name[:-len(".zip")]}_{manifest_hash}.zip'
+
+
+def add_archive(interact_home, key, archive_path, max_size):
+    """ Function to add a newly built archive to the cache, removing the
+        archives of earlier contents of the same folder.
+    """
+    add_cache_entry(interact_home, ARCHIVE_CACHE, key, archive_path, max_size)
+    os.remove(archive_path)
+
+    # Keys of the same archive differ only in their fixed length manifest hash.
+    # The prefix is compared exactly as archive names may contain LIKE wildcards.
+    archive_prefix = key[:key.rindex('_') + 1]
+    with queue_transaction(interact_home) as connection:
+        superseded_keys = [
+            entry['key'] for entry in connection.execute(
+                """SELECT key FROM cache_entries WHERE cache = ? AND key != ?
+                    AND substr(key, 1, ?) = ? AND length(key) = ?""",
+                (ARCHIVE_CACHE, key, len(archive_prefix), archive_prefix, len(key)),
+            )
+        ]
+        connection.executemany(
+            'DELETE FROM cache_entries WHERE cache = ? AND key = ?',
+            [(ARCHIVE_CACHE, superseded_key) for superseded_key in superseded_keys],
+        )
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=ARCHIVE_CACHE)
+    for superseded_key in superseded_keys:
+        if os.path.exists(f'{cache_folder}/{superseded_key}'):
+            os.remove(f'{cache_folder}/{superseded_key}')
+
+
+def stream_and_cache_archive(interact_home, key, folder_path, extra_files, max_size):
+    """ Function to stream an archive to the client while also writing it to
+        the cache. The archive is only cached if the whole archive was sent.
+    """
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=ARCHIVE_CACHE)
+    os.makedirs(cache_folder, exist_ok=True)
+    archive_file, archive_path = tempfile.mkstemp(suffix='.tmp', dir=cache_folder)
+    try:
+        with os.fdopen(archive_file, 'wb') as archive_out:
+            for zip_chunk in stream_zip(folder_path, extra_files):
+                archive_out.write(zip_chunk)
+                yield zip_chunk
+    except BaseException:
+        # The client disconnected or the archive failed.
+        os.remove(archive_path)
+        raise
+    add_archive(interact_home, key, archive_path, max_size)
+
+
+def build_result_archives(interact_home, user, project, max_size):
+    """ Function to build any archives of a project's results which are not
+        already cached, so that they are ready before they are first requested.
+    """
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=ARCHIVE_CACHE)
+    for archive_name, (folder_path, extra_files) in get_project_archives(
+        interact_home, user, project
+    ).items():
+        if not os.path.exists(folder_path):
+            continue
+        key = get_archive_key(user, project, archive_name, folder_path, extra_files)
+        if os.path.exists(f'{cache_folder}/{key}'):
+            continue
+        for _ in stream_and_cache_archive(
+            interact_home, key, folder_path, extra_files, max_size
+        ):
+            pass
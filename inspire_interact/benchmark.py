@@ -0,0 +1,835 @@
+""" Load benchmark of the inSPIRE-Interactive web server. The app is started
+    against a temporary interactHome with a worker whose inSPIRE is replaced
+    by a fake, which waits and writes outputs shaped like inSPIRE's, and many
+    simulated users then upload data, run jobs, watch their progress and
+    download their results, making the requests the GUI's pages make. The
+    latency of each route and the overall throughput are reported, and can be
+    compared against a baseline.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+
+import yaml
+
+from inspire_interact.constants import (
+    ARCHIVE_CACHE_SIZE_KEY,
+    BINDING_CACHE_KEY,
+    CPUS_KEY,
+    INTERACT_HOME_KEY,
+    JOB_CPUS_KEY,
+    MEMORY_KEY,
+    MGF_CACHE_SIZE_KEY,
+    MODE_KEY,
+    SERVER_ADDRESS_KEY,
+    SERVER_THREADS_KEY,
+    SERVER_WORKERS_KEY,
+    SPECTRA_CACHE_SIZE_KEY,
+    WORKER_LOG_PATH,
+)
+from inspire_interact.job_status import STATUS_RETRY_MS
+from inspire_interact.queue_manager import close_queue_connections, connect_queue
+from inspire_interact.server import SERVER_PORT
+from inspire_interact.utils import read_server_config
+
+REQUEST_TIMEOUT = 300
+SERVER_START_TIMEOUT = 60
+PERCENTILES = (50, 95, 99)
+STREAM_ROUTE = 'GET /interact/status/<user>/<project>/stream'
+# The GUI polls the status this often when the server is too busy to stream it.
+STATUS_POLL_FALLBACK = 10
+# Responses which are part of normal use rather than errors.
+EXPECTED_STATUSES = {(STREAM_ROUTE, 503)}
+
+# Settings of the fake inSPIRE, set in the worker before it starts.
+FAKE_INSPIRE = {
+    'taskSeconds': 0.5,
+    'psmRows': 10_000,
+}
+
+
+def get_arguments():
+    """ Function to collect command line arguments.
+
+    Returns
+    -------
+    args : argparse.Namespace
+        The parsed command line arguments.
+    """
+    parser = ArgumentParser(description='inSPIRE-Interactive Load Benchmark.')
+
+    parser.add_argument(
+        '--users',
+        type=int,
+        default=10,
+        help='The number of simulated users, each running a single job (default: 10).',
+    )
+    parser.add_argument(
+        '--ramp_seconds',
+        type=float,
+        default=0.0,
+        help='The time over which users start, by default all start at once.',
+    )
+    parser.add_argument(
+        '--poll_seconds',
+        type=float,
+        default=1.0,
+        help=(
+            'The time between each user\'s checks on their job with the legacy client '
+            '(default: 1).'
+        ),
+    )
+    parser.add_argument(
+        '--task_seconds',
+        type=float,
+        default=0.5,
+        help='The time each fake inSPIRE task takes (default: 0.5).',
+    )
+    parser.add_argument(
+        '--psm_rows',
+        type=int,
+        default=10_000,
+        help='The number of PSMs written by each fake job (default: 10000).',
+    )
+    parser.add_argument(
+        '--upload_kb',
+        type=int,
+        default=1024,
+        help='The size (KB) of the MS data uploaded by each user (default: 1024).',
+    )
+    parser.add_argument(
+        '--client',
+        choices=['gui', 'legacy'],
+        default='gui',
+        help=(
+            'Whether users upload in chunks and watch their job\'s status stream as the GUI '
+            'does, or upload forms and poll the status and queue (default: gui).'
+        ),
+    )
+    parser.add_argument(
+        '--server',
+        choices=['gunicorn', 'development'],
+        default='gunicorn',
+        help='Whether to serve the app as in server mode or local mode (default: gunicorn).',
+    )
+    parser.add_argument(
+        '--server_workers',
+        type=int,
+        default=4,
+        help='The number of gunicorn worker processes (default: 4).',
+    )
+    parser.add_argument(
+        '--server_threads',
+        type=int,
+        default=8,
+        help='The number of threads of each gunicorn worker (default: 8).',
+    )
+    parser.add_argument(
+        '--cpus',
+        type=int,
+        default=4,
+        help='The number of CPUs the inSPIRE worker may use, one per task (default: 4).',
+    )
+    parser.add_argument(
+        '--output',
+        required=False,
+        help='File to write the results to as JSON, for use as a later baseline.',
+    )
+    parser.add_argument(
+        '--baseline',
+        required=False,
+        help='Results of an earlier benchmark to compare the p95 latency of each route to.',
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=1.5,
+        help=(
+            'Routes whose p95 latency is more than this multiple of the baseline\'s '
+            'are reported as regressions (default: 1.5).'
+        ),
+    )
+    parser.add_argument(
+        '--keep_home',
+        action='store_true',
+        help='Keep the temporary interactHome rather than deleting it.',
+    )
+
+    return parser.parse_args()
+
+
+def write_fake_assignments(output_folder, psm_rows):
+    """ Function to write PSM and peptide assignments and Percolator outputs
+        with the columns read by inSPIRE-Interactive.
+    """
+    rng = random.Random(psm_rows)
+    peptides = [
+        ''.join(rng.choices('ACDEFGHIKLMNPQRSTVWY', k=rng.randint(8, 14)))
+        for _ in range(max(psm_rows//3, 1))
+    ]
+    proteins = {peptide: f'prot{rng.randrange(1000)}' for peptide in peptides}
+    psm_peptides = [rng.choice(peptides) for _ in range(psm_rows)]
+    q_values = sorted(rng.random()*0.05 for _ in range(psm_rows))
+
+    with open(f'{output_folder}/finalPsmAssignments.csv', 'w', encoding='UTF-8') as psm_file:
+        psm_file.write('source,scan,peptide,proteins,qValue,score\n')
+        for psm_idx, (peptide, q_value) in enumerate(zip(psm_peptides, q_values)):
+            psm_file.write(
+                f'sample{psm_idx % 4}.mgf,{psm_idx},{peptide},'
+                f'{proteins[peptide]},{q_value},{1 - q_value}\n'
+            )
+    with open(
+        f'{output_folder}/finalPeptideAssignments.csv', 'w', encoding='UTF-8'
+    ) as peptide_file:
+        peptide_file.write('peptide,proteins,qValue\n')
+        for peptide_idx, peptide in enumerate(peptides):
+            peptide_file.write(
+                f'{peptide},{proteins[peptide]},{peptide_idx/len(peptides)*0.05}\n'
+            )
+    for psms_name, psm_count in (
+        ('final.percolatorSeparate.psms.txt', psm_rows),
+        ('non_spectral.percolatorSeparate.psms.txt', psm_rows*4//5),
+    ):
+        with open(f'{output_folder}/{psms_name}', 'w', encoding='UTF-8') as psms_file:
+            psms_file.write('PSMId\tscore\tq-value\tpeptide\n')
+            for psm_idx in range(psm_count):
+                psms_file.write(
+                    f'{psm_idx}\t{1 - q_values[psm_idx]}\t{q_values[psm_idx]}\t'
+                    f'{psm_peptides[psm_idx]}\n'
+                )
+
+
+def fake_run_inspire(pipeline, config_file):
+    """ Function replacing inSPIRE's run_inspire, which waits for the time a
+        task is set to take and writes outputs shaped like inSPIRE's.
+    """
+    time.sleep(FAKE_INSPIRE['taskSeconds'])
+    with open(config_file, 'r', encoding='UTF-8') as yaml_file:
+        output_folder = yaml.safe_load(yaml_file)['outputFolder']
+    os.makedirs(f'{output_folder}/img', exist_ok=True)
+
+    if pipeline == 'featureSelection+':
+        write_fake_assignments(output_folder, FAKE_INSPIRE['psmRows'])
+    elif pipeline == 'generateReport':
+        with open(f'{output_folder}/inspire-report.html', 'w', encoding='UTF-8') as report_file:
+            report_file.write('<html><body><h1>inSPIRE Report</h1>')
+            report_file.write('<p>Fake inSPIRE report for benchmarking.</p>'*2000)
+            report_file.write('</body></html>')
+        with open(f'{output_folder}/img/psm_fdr_curve.svg', 'w', encoding='UTF-8') as svg_file:
+            svg_file.write(
+                '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">'
+                '<rect width="100" height="100"/></svg>'
+            )
+
+
+def install_fake_inspire(task_seconds, psm_rows):
+    """ Function to replace inSPIRE's run_inspire with the fake, both in inSPIRE
+        and in the modules which have already imported it.
+    """
+    from inspire import run as inspire_run
+    from inspire_interact import binding_cache, spectra_cache, worker
+
+    FAKE_INSPIRE['taskSeconds'] = task_seconds
+    FAKE_INSPIRE['psmRows'] = psm_rows
+    for inspire_module in (inspire_run, binding_cache, spectra_cache, worker):
+        inspire_module.run_inspire = fake_run_inspire
+
+
+def run_benchmark_worker(interact_home, server_config, task_seconds, psm_rows):
+    """ Function to run the inSPIRE worker with the fake inSPIRE. Jobs are
+        forked from the worker, so also run the fake.
+    """
+    from inspire_interact.worker import run_worker
+
+    install_fake_inspire(task_seconds, psm_rows)
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    with open(WORKER_LOG_PATH.format(home_key=interact_home), 'a', encoding='UTF-8') as log_file:
+        os.dup2(log_file.fileno(), sys.stdout.fileno())
+        os.dup2(log_file.fileno(), sys.stderr.fileno())
+    run_worker(interact_home, server_config)
+
+
+def run_benchmark_server(interact_home, server_config, server_type):
+    """ Function to serve the app against the benchmark's interactHome.
+    """
+    from inspire_interact.api import app
+    from inspire_interact.server import run_production_server
+
+    app.config.update(server_config)
+    app.config[INTERACT_HOME_KEY] = interact_home
+    app.config[SERVER_ADDRESS_KEY] = '127.0.0.1'
+    if server_type == 'gunicorn':
+        app.config[MODE_KEY] = 'server'
+        run_production_server(
+            app, server_config[SERVER_WORKERS_KEY], server_config[SERVER_THREADS_KEY],
+        )
+    else:
+        app.config[MODE_KEY] = 'local'
+        # Logging every request would slow the server down.
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        app.run(host='127.0.0.1', port=SERVER_PORT, debug=False, threaded=True)
+
+
+def create_benchmark_home(args):
+    """ Function to create a temporary interactHome and its server config.
+
+    Returns
+    -------
+    interact_home : str
+        The path of the temporary interactHome.
+    server_config : dict
+        The server config, read as the server would.
+    """
+    interact_home = tempfile.mkdtemp(prefix='inspire-interact-benchmark-').replace('\\', '/')
+    os.mkdir(f'{interact_home}/projects')
+    os.mkdir(f'{interact_home}/locks')
+    config_dict = {
+        CPUS_KEY: args.cpus,
+        JOB_CPUS_KEY: 1,
+        MEMORY_KEY: 1024*args.cpus,
+        # Caches are bypassed so that every task runs the fake inSPIRE.
+        MGF_CACHE_SIZE_KEY: 0,
+        SPECTRA_CACHE_SIZE_KEY: 0,
+        BINDING_CACHE_KEY: False,
+        ARCHIVE_CACHE_SIZE_KEY: 10,
+        SERVER_WORKERS_KEY: args.server_workers,
+        SERVER_THREADS_KEY: args.server_threads,
+    }
+    with open(f'{interact_home}/config.yml', 'w', encoding='UTF-8') as yaml_out:
+        yaml.dump(config_dict, yaml_out)
+    # Creates the queue database before the server and worker start.
+    connect_queue(interact_home)
+    close_queue_connections()
+    return interact_home, read_server_config(f'{interact_home}/config.yml')
+
+
+def send_request(timings, route, url, data=None, headers=None, method=None):
+    """ Function to send a request as a browser would, recording its latency
+        under the route it was sent to.
+
+    Returns
+    -------
+    status : int or None
+        The status code of the response, None if no response was received.
+    body : bytes
+        The uncompressed body of the response.
+    """
+    request_headers = {'Accept-Encoding': 'gzip'}
+    request_headers.update(headers or {})
+    http_request = urllib.request.Request(url, data=data, headers=request_headers, method=method)
+    start_time = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request, timeout=REQUEST_TIMEOUT) as response:
+            body = response.read()
+            status = response.status
+            content_encoding = response.headers.get('Content-Encoding')
+    except urllib.error.HTTPError as err:
+        body = err.read()
+        status = err.code
+        content_encoding = err.headers.get('Content-Encoding')
+    except OSError:
+        body = b''
+        status = None
+        content_encoding = None
+    timings.append((route, time.perf_counter() - start_time, status, len(body)))
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    return status, body
+
+
+def send_json(timings, route, url, json_data):
+    """ Function to post JSON as the GUI does.
+    """
+    return send_request(
+        timings,
+        route,
+        url,
+        data=json.dumps(json_data).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+
+
+def send_files(timings, route, url, files):
+    """ Function to upload files as a multipart form, as the GUI does.
+    """
+    boundary = uuid.uuid4().hex
+    form_data = bytearray()
+    for file_name, file_data in files.items():
+        form_data += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; '
+            f'filename="{file_name}"\r\nContent-Type: application/octet-stream\r\n\r\n'
+        ).encode()
+        form_data += file_data + b'\r\n'
+    form_data += f'--{boundary}--\r\n'.encode()
+    return send_request(
+        timings,
+        route,
+        url,
+        data=bytes(form_data),
+        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+        method='POST',
+    )
+
+
+def send_chunked_upload(timings, base_url, user, project, file_type, files):
+    """ Function to upload files in chunks with their checksums as the GUI does,
+        finishing the upload once all files are complete.
+    """
+    upload_url = f'{base_url}/interact/upload/{user}/{project}/{file_type}'
+    for file_idx, (file_name, file_data) in enumerate(files.items()):
+        status, body = send_json(
+            timings,
+            'POST /interact/upload/<user>/<project>/<file_type>/start',
+            f'{upload_url}/start',
+            {
+                'fileName': file_name,
+                'fileIdx': file_idx,
+                'size': len(file_data),
+                'lastModified': int(1000*time.time()),
+            },
+        )
+        if status != 200:
+            return
+        upload = json.loads(body)
+        offset = upload['offset']
+        while offset < len(file_data):
+            chunk = file_data[offset:offset + upload['chunkSize']]
+            status, body = send_request(
+                timings,
+                'PUT /interact/upload/<user>/<project>/<file_type>/<upload_id>',
+                f'{upload_url}/{upload["uploadID"]}?offset={offset}',
+                data=chunk,
+                headers={
+                    'Content-Type': 'application/octet-stream',
+                    'X-Chunk-CRC32': str(zlib.crc32(chunk)),
+                },
+                method='PUT',
+            )
+            if status not in (200, 409):
+                return
+            offset = json.loads(body)['offset']
+    send_json(
+        timings,
+        'POST /interact/upload/<user>/<project>/<file_type>/finish',
+        f'{upload_url}/finish',
+        {'fileNames': list(files)},
+    )
+
+
+def get_page_state(job_state):
+    """ Function to get the state of the job a page is shown for, starting jobs
+        are shown on the same page as running jobs.
+    """
+    return 'running' if job_state == 'starting' else job_state
+
+
+def read_status_stream(timings, base_url, user, project, page_state):
+    """ Function to read a job's status stream until the job leaves the state
+        its page was loaded in or the server closes the stream. The latency
+        recorded is the time until the stream is opened.
+
+    Returns
+    -------
+    status : int or None
+        The status code of the response, None if no response was received.
+    page_state : str or None
+        The state the page was loaded in, that of the first event if not known.
+    new_state : str or None
+        The state the job has changed to, None if the stream closed first.
+    """
+    http_request = urllib.request.Request(
+        f'{base_url}/interact/status/{user}/{project}/stream',
+        headers={'Accept': 'text/event-stream'},
+    )
+    start_time = time.perf_counter()
+    latency = None
+    received = 0
+    new_state = None
+    try:
+        with urllib.request.urlopen(http_request, timeout=REQUEST_TIMEOUT) as response:
+            latency = time.perf_counter() - start_time
+            status = response.status
+            event_name = None
+            for line in response:
+                received += len(line)
+                line = line.decode().rstrip('\n')
+                if line.startswith('event: '):
+                    event_name = line[len('event: '):]
+                elif line.startswith('data: ') and event_name == 'status':
+                    job_state = get_page_state(json.loads(line[len('data: '):])['state'])
+                    if page_state is None:
+                        page_state = job_state
+                    if job_state != page_state or job_state == 'finished':
+                        # The page is reloaded.
+                        new_state = job_state
+                        break
+    except urllib.error.HTTPError as err:
+        received = len(err.read())
+        status = err.code
+    except OSError:
+        status = None
+    if latency is None:
+        latency = time.perf_counter() - start_time
+    timings.append((STREAM_ROUTE, latency, status, received))
+    return status, page_state, new_state
+
+
+def poll_job_status(timings, base_url, user, project, page_state, poll_seconds):
+    """ Function to poll a job's status until it leaves the state its page was
+        loaded in.
+
+    Returns
+    -------
+    job_state : str or None
+        The new state of the job, None if the server failed.
+    """
+    while True:
+        time.sleep(poll_seconds)
+        status, body = send_request(
+            timings,
+            'GET /interact/status/<user>/<project>',
+            f'{base_url}/interact/status/{user}/{project}',
+        )
+        if status != 200:
+            return None
+        job_state = get_page_state(json.loads(body)['state'])
+        if job_state != page_state or job_state == 'finished':
+            return job_state
+
+
+def watch_job_status(timings, base_url, user, project):
+    """ Function to watch a job's status as the GUI's pages do, streaming it and
+        reconnecting when the server closes the stream, or polling it if the
+        server is too busy to stream it.
+
+    Returns
+    -------
+    job_state : str or None
+        The state the job has changed to, None if the server failed.
+    """
+    page_state = None
+    while True:
+        status, page_state, new_state = read_status_stream(
+            timings, base_url, user, project, page_state,
+        )
+        if new_state is not None:
+            return new_state
+        if status == 503:
+            return poll_job_status(
+                timings, base_url, user, project, page_state, STATUS_POLL_FALLBACK,
+            )
+        if status != 200:
+            return None
+        time.sleep(STATUS_RETRY_MS/1000)
+
+
+def create_mgf_data(size_kb):
+    """ Function to create MS data of roughly the given size.
+    """
+    spectrum = (
+        'BEGIN IONS\nTITLE=scan\nPEPMASS=500.25\nCHARGE=2+\n' +
+        ''.join(f'{100 + peak_idx*7.5:.4f} {1000 + peak_idx}\n' for peak_idx in range(40)) +
+        'END IONS\n'
+    ).encode()
+    return spectrum*max(size_kb*1024//len(spectrum), 1)
+
+
+def simulate_user(base_url, user_idx, args, timings, job_times):
+    """ Function to simulate a user creating a project, uploading data, running
+        a job, checking on it until it finishes and viewing the results.
+    """
+    time.sleep(args.ramp_seconds*user_idx/max(args.users, 1))
+    user = f'benchmarkUser{user_idx}'
+    project = 'benchmarkProject'
+
+    send_request(timings, 'GET /interact/user/<user>', f'{base_url}/interact/user/{user}')
+    send_request(
+        timings,
+        'GET /interact/project/<user>/<project>',
+        f'{base_url}/interact/project/{user}/{project}',
+    )
+    send_json(timings, 'POST /interact/metadata', f'{base_url}/interact/metadata', {
+        'user': user, 'project': project, 'metadata_type': 'core', 'variant': 'standard',
+    })
+    for file_type, files in (
+        ('ms', {'sample.mgf': create_mgf_data(args.upload_kb)}),
+        ('proteome', {'proteome.fasta': b'>prot0\nMKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQ\n'*100}),
+    ):
+        if args.client == 'gui':
+            send_chunked_upload(timings, base_url, user, project, file_type, files)
+        else:
+            send_files(
+                timings,
+                'POST /interact/upload/<user>/<project>/<file_type>',
+                f'{base_url}/interact/upload/{user}/{project}/{file_type}',
+                files,
+            )
+    send_json(timings, 'POST /interact/metadata', f'{base_url}/interact/metadata', {
+        'user': user, 'project': project, 'metadata_type': 'search',
+        'searchEngine': 'msfragger', 'runFragger': 1,
+    })
+
+    submit_time = time.perf_counter()
+    send_json(timings, 'POST /interact/inspire', f'{base_url}/interact/inspire', {
+        'user': user,
+        'project': project,
+        'ms1Accuracy': '20',
+        'mzAccuracy': '0.02',
+        'mzUnits': 'Da',
+        'controlFlags': '',
+        'technicalReplicates': [['sample.mgf']],
+        'runQuantification': 0,
+        'additionalConfigs': {},
+    })
+
+    job_state = None
+    while job_state != 'finished':
+        if args.client == 'legacy':
+            time.sleep(args.poll_seconds)
+        send_request(
+            timings,
+            'GET /interact/<user>/<project>/<workflow>',
+            f'{base_url}/interact/{user}/{project}/inspire',
+        )
+        if args.client == 'gui':
+            job_state = watch_job_status(timings, base_url, user, project)
+        else:
+            send_request(
+                timings, 'GET /interact-page/view-queue', f'{base_url}/interact-page/view-queue',
+            )
+            status, body = send_request(
+                timings,
+                'GET /interact/status/<user>/<project>',
+                f'{base_url}/interact/status/{user}/{project}',
+            )
+            job_state = json.loads(body)['state'] if status == 200 else None
+        if job_state is None:
+            # The job could not be submitted or the server failed.
+            return
+    job_times.append(time.perf_counter() - submit_time)
+
+    send_request(
+        timings,
+        'GET /interact/<user>/<project>/<workflow>',
+        f'{base_url}/interact/{user}/{project}/inspire',
+    )
+    for workflow in ('performance', 'psms'):
+        send_request(
+            timings,
+            'GET /interact/get_results/<user>/<project>/<workflow>',
+            f'{base_url}/interact/get_results/{user}/{project}/{workflow}',
+        )
+    send_request(
+        timings,
+        'GET /interact/query_results/<user>/<project>/<table_name>',
+        f'{base_url}/interact/query_results/{user}/{project}/psms?maxQValue=0.01&pageSize=50',
+    )
+    send_request(
+        timings,
+        'GET /interact/download/<user>/<project>',
+        f'{base_url}/interact/download/{user}/{project}',
+    )
+
+
+def get_percentile(sorted_values, percentile):
+    """ Function to get a percentile of sorted values by the nearest rank.
+    """
+    return sorted_values[max(math.ceil(percentile/100*len(sorted_values)) - 1, 0)]
+
+
+def summarise_timings(timings, job_times, wall_time):
+    """ Function to summarise the latencies of each route and the throughput.
+
+    Returns
+    -------
+    results : dict
+        The request count, error count and latency percentiles (ms) of each
+        route, with the totals over all routes.
+    """
+    route_latencies = {}
+    route_errors = {}
+    for route, latency, status, _ in timings:
+        route_latencies.setdefault(route, []).append(latency)
+        route_errors[route] = route_errors.get(route, 0) + int(
+            status is None or status >= 400 and (route, status) not in EXPECTED_STATUSES
+        )
+
+    routes = {}
+    for route, latencies in sorted(route_latencies.items()):
+        latencies.sort()
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': route_errors[route],
+            **{
+                f'p{percentile}': round(1000*get_percentile(latencies, percentile), 2)
+                for percentile in PERCENTILES
+            },
+        }
+    job_times = sorted(job_times)
+    return {
+        'routes': routes,
+        'requests': len(timings),
+        'errors': sum(route_errors.values()),
+        'seconds': round(wall_time, 2),
+        'requestsPerSecond': round(len(timings)/wall_time, 2),
+        'megabytesPerSecond': round(sum(timing[3] for timing in timings)/wall_time/1024**2, 2),
+        'jobs': len(job_times),
+        'jobSeconds': {
+            f'p{percentile}': round(get_percentile(job_times, percentile), 2)
+            for percentile in PERCENTILES
+        } if job_times else {},
+    }
+
+
+def print_results(results):
+    """ Function to print the benchmark results as a table.
+    """
+    route_width = max(len(route) for route in results['routes']) + 2
+    print(
+        'Route'.ljust(route_width) + 'Requests'.rjust(10) + 'Errors'.rjust(8) +
+        ''.join(f'p{percentile} (ms)'.rjust(12) for percentile in PERCENTILES)
+    )
+    for route, route_results in results['routes'].items():
+        print(
+            route.ljust(route_width) +
+            str(route_results['requests']).rjust(10) +
+            str(route_results['errors']).rjust(8) +
+            ''.join(
+                f'{route_results[f"p{percentile}"]:.1f}'.rjust(12) for percentile in PERCENTILES
+            )
+        )
+    print(
+        f'\n{results["requests"]} requests ({results["errors"]} errors) in '
+        f'{results["seconds"]} s: {results["requestsPerSecond"]} requests/s, '
+        f'{results["megabytesPerSecond"]} MB/s.'
+    )
+    if results['jobSeconds']:
+        print(
+            f'{results["jobs"]} jobs finished, taking ' + ', '.join(
+                f'p{percentile} {results["jobSeconds"][f"p{percentile}"]} s'
+                for percentile in PERCENTILES
+            ) + ' from submission.'
+        )
+
+
+def compare_to_baseline(results, baseline_file, tolerance):
+    """ Function to find the routes whose p95 latency has regressed since an
+        earlier benchmark.
+
+    Returns
+    -------
+    regressions : list of str
+        Descriptions of the routes which have regressed.
+    """
+    with open(baseline_file, 'r', encoding='UTF-8') as baseline_in:
+        baseline = json.load(baseline_in)
+    regressions = []
+    for route, route_results in results['routes'].items():
+        if (baseline_results := baseline['routes'].get(route)) is None:
+            continue
+        if route_results['p95'] > tolerance*baseline_results['p95']:
+            regressions.append(
+                f'{route}: p95 {route_results["p95"]} ms, baseline {baseline_results["p95"]} ms.'
+            )
+    return regressions
+
+
+def wait_for_server(base_url, server_process):
+    """ Function to wait until the server is accepting requests.
+    """
+    start_time = time.time()
+    while time.time() - start_time < SERVER_START_TIMEOUT:
+        if server_process.exitcode is not None:
+            raise RuntimeError('The inSPIRE-Interactive server failed to start.')
+        try:
+            with urllib.request.urlopen(f'{base_url}/interact-page/home', timeout=5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('The inSPIRE-Interactive server did not start in time.')
+
+
+def run_benchmark(args):
+    """ Function to run the benchmark, returning its results.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise RuntimeError('The benchmark requires processes to be forked, e.g. on Linux.')
+    process_context = multiprocessing.get_context('fork')
+    interact_home, server_config = create_benchmark_home(args)
+    # Routes using relative paths expect to be run from the interactHome.
+    working_directory = os.getcwd()
+    os.chdir(interact_home)
+
+    worker_process = process_context.Process(
+        target=run_benchmark_worker,
+        args=(interact_home, server_config, args.task_seconds, args.psm_rows),
+    )
+    server_process = process_context.Process(
+        target=run_benchmark_server, args=(interact_home, server_config, args.server),
+    )
+    worker_process.start()
+    server_process.start()
+    base_url = f'http://127.0.0.1:{SERVER_PORT}'
+    try:
+        wait_for_server(base_url, server_process)
+        timings = []
+        job_times = []
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as user_pool:
+            for user_future in [
+                user_pool.submit(simulate_user, base_url, user_idx, args, timings, job_times)
+                for user_idx in range(args.users)
+            ]:
+                user_future.result()
+        results = summarise_timings(timings, job_times, time.perf_counter() - start_time)
+    finally:
+        for benchmark_process in (server_process, worker_process):
+            benchmark_process.terminate()
+            benchmark_process.join()
+        os.chdir(working_directory)
+        if args.keep_home:
+            print(f'Benchmark interactHome kept at {interact_home}')
+        else:
+            shutil.rmtree(interact_home, ignore_errors=True)
+
+    results['settings'] = vars(args)
+    return results
+
+
+def main():
+    """ Main function to run the inSPIRE-Interactive load benchmark.
+    """
+    args = get_arguments()
+    results = run_benchmark(args)
+    print_results(results)
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='UTF-8') as results_out:
+            json.dump(results, results_out, indent=4)
+    if args.baseline is not None:
+        if regressions := compare_to_baseline(results, args.baseline, args.tolerance):
+            print('\nRoutes slower than the baseline:')
+            for regression in regressions:
+                print(regression)
+            sys.exit(1)
+        print('\nNo routes slower than the baseline.')
+
+
+if __name__ == '__main__':
+    main()
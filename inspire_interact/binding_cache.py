@@ -0,0 +1,229 @@
+""" Functions for the server-wide cache of NetMHCpan binding predictions. The
+    cache is sharded by allele, each shard mapping a peptide to the row of
+    NetMHCpan output predicted for it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import subprocess
+import time
+
+from inspire.run import run_inspire
+import yaml
+
+from inspire_interact.cache_manager import record_cache_lookups
+from inspire_interact.constants import BINDING_CACHE, CACHE_PATH
+from inspire_interact.queue_manager import queue_transaction
+
+BINDING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS binding (
+    peptide TEXT PRIMARY KEY,
+    prediction TEXT NOT NULL,
+    lastUsed REAL NOT NULL
+) WITHOUT ROWID;
+"""
+MHCPAN_DASH_LINE = '-'*100
+MHCPAN_HEADER = (
+    ' Pos MHC Peptide Core Of Gp Gl Ip Il Icore Identity Score_EL %Rank_EL' +
+    ' Score_BA %Rank_BA Aff(nM) BindLevel'
+)
+
+
+def connect_binding_shard(interact_home, pan_command, allele):
+    """ Function to connect to the cache shard of an allele. Predictions from
+        different NetMHCpan installations are kept apart.
+    """
+    command_hash = hashlib.sha256(pan_command.encode()).hexdigest()[:12]
+    cache_folder = (
+        f'{CACHE_PATH.format(home_key=interact_home, cache_name=BINDING_CACHE)}/{command_hash}'
+    )
+    os.makedirs(cache_folder, exist_ok=True)
+    connection = sqlite3.connect(
+        f'{cache_folder}/{re.sub(r"[^A-Za-z0-9_-]", "_", allele)}.db',
+        timeout=60,
+        isolation_level=None,
+    )
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(BINDING_SCHEMA)
+    return connection
+
+
+def fetch_cached_binding(connection, peptides):
+    """ Function to look up the predictions for a set of peptides in bulk.
+    """
+    connection.execute('CREATE TEMP TABLE IF NOT EXISTS lookup (peptide TEXT PRIMARY KEY)')
+    connection.execute('BEGIN')
+    connection.execute('DELETE FROM lookup')
+    connection.executemany(
+        'INSERT OR IGNORE INTO lookup (peptide) VALUES (?)', [(peptide,) for peptide in peptides]
+    )
+    cached_predictions = dict(connection.execute(
+        """SELECT binding.peptide, binding.prediction
+            FROM lookup JOIN binding ON binding.peptide = lookup.peptide"""
+    ).fetchall())
+    connection.execute(
+        """UPDATE binding SET lastUsed = ?
+            WHERE peptide IN (SELECT peptide FROM lookup)""",
+        (time.time(),),
+    )
+    connection.execute('COMMIT')
+    return cached_predictions
+
+
+def read_mhcpan_rows(output_path):
+    """ Function to read the rows of the prediction table of NetMHCpan output.
+
+    Returns
+    -------
+    predictions : dict
+        Map of peptide to its row of NetMHCpan output.
+    """
+    predictions = {}
+    n_dash_lines = 0
+    with open(output_path, 'r', encoding='UTF-8') as output_file:
+        for line in output_file:
+            if '--------' in line:
+                n_dash_lines += 1
+                if n_dash_lines == 3:
+                    break
+            elif n_dash_lines == 2 and line.strip():
+                prediction = ' '.join(
+                    line.replace('<= SB', '<=SB').replace('<= WB', '<=WB').split()
+                )
+                predictions[prediction.split(' ')[2]] = prediction
+    return predictions
+
+
+def run_netmhcpan(pan_command, missing_runs, output_folder, n_cpus):
+    """ Function to run NetMHCpan on the peptides missing from the cache, with
+        up to one process per CPU.
+
+    Returns
+    -------
+    predictions : dict
+        Map of allele to a map of peptide to its row of NetMHCpan output.
+    """
+    scratch_folder = f'{output_folder}/mhcpanCache'
+    os.makedirs(scratch_folder, exist_ok=True)
+    commands = []
+    for run_idx, (allele, pep_len, peptides) in enumerate(missing_runs):
+        with open(f'{scratch_folder}/input_{run_idx}.txt', 'w', encoding='UTF-8') as input_file:
+            input_file.write('\n'.join(peptides) + '\n')
+        commands.append(
+            f'{pan_command} -BA -inptype 1 -a {allele} -l {pep_len} -p ' +
+            f'-f {scratch_folder}/input_{run_idx}.txt > {scratch_folder}/output_{run_idx}.txt'
+        )
+    with ThreadPoolExecutor(max_workers=n_cpus) as executor:
+        list(executor.map(lambda command: subprocess.run(command, shell=True), commands))
+
+    predictions = {}
+    for run_idx, (allele, _, _) in enumerate(missing_runs):
+        predictions.setdefault(allele, {}).update(
+            read_mhcpan_rows(f'{scratch_folder}/output_{run_idx}.txt')
+        )
+    shutil.rmtree(scratch_folder)
+    return predictions
+
+
+def get_input_length(file_name):
+    """ Function to get the peptide length of a NetMHCpan input file written by inSPIRE.
+    """
+    return int(file_name.split('inputLen')[-1].split('_')[0].split('.')[0])
+
+
+def write_mhcpan_output(output_path, rows):
+    """ Function to write NetMHCpan predictions in the format read by inSPIRE.
+    """
+    with open(f'{output_path}.tmp', 'w', encoding='UTF-8') as output_file:
+        output_file.write('\n'.join(
+            [MHCPAN_DASH_LINE, MHCPAN_HEADER, MHCPAN_DASH_LINE] + rows + [MHCPAN_DASH_LINE, '']
+        ))
+    os.replace(f'{output_path}.tmp', output_path)
+
+
+def predict_binding_with_cache(interact_home, project_home, n_cpus):
+    """ Function to predict binding for the NetMHCpan input of a project, only
+        running NetMHCpan for the peptides and alleles which are not cached.
+    """
+    with open(f'{project_home}/config.yml', 'r', encoding='UTF-8') as stream:
+        inspire_config = yaml.safe_load(stream)
+    if inspire_config.get('useBindingAffinity') is None or inspire_config.get(
+        'panDocker', platform.system() == 'Windows'
+    ):
+        run_inspire('predictBinding', f'{project_home}/config.yml')
+        return
+
+    output_folder = inspire_config['outputFolder']
+    pan_command = inspire_config['netMHCpan']
+    ba_pred_limit = inspire_config.get(
+        'baPredictionLimit', 31 if inspire_config['useBindingAffinity'] == 'asFeature' else 15
+    )
+    input_peptides = {}
+    for file_name in os.listdir(f'{output_folder}/mhcpan'):
+        if not file_name.startswith('inputLen') or get_input_length(file_name) > ba_pred_limit:
+            continue
+        with open(f'{output_folder}/mhcpan/{file_name}', 'r', encoding='UTF-8') as input_file:
+            input_peptides[file_name] = [line.strip() for line in input_file if line.strip()]
+
+    # Look up every allele, collecting the missing peptides of each length.
+    connections = {}
+    predictions = {}
+    missing_runs = []
+    n_hits = 0
+    for allele in inspire_config['alleles']:
+        connections[allele] = connect_binding_shard(interact_home, pan_command, allele)
+        predictions[allele] = fetch_cached_binding(connections[allele], [
+            peptide for peptides in input_peptides.values() for peptide in peptides
+        ])
+        n_hits += len(predictions[allele])
+        missing_peptides = {}
+        for peptides in input_peptides.values():
+            for peptide in peptides:
+                if peptide not in predictions[allele]:
+                    missing_peptides.setdefault(len(peptide), set()).add(peptide)
+        for pep_len, peptides in missing_peptides.items():
+            # Split each allele's peptides so that all CPUs are used.
+            n_chunks = max(1, min(n_cpus, len(peptides)//1_000))
+            peptides = sorted(peptides)
+            for chunk_idx in range(n_chunks):
+                missing_runs.append((allele, pep_len, peptides[chunk_idx::n_chunks]))
+
+    n_missing = sum(len(peptides) for _, _, peptides in missing_runs)
+    with queue_transaction(interact_home) as queue_connection:
+        record_cache_lookups(queue_connection, BINDING_CACHE, n_hits, n_missing)
+    print(f'Found {n_hits} of {n_hits + n_missing} binding predictions in the cache.')
+
+    if missing_runs:
+        for allele, new_predictions in run_netmhcpan(
+            pan_command, missing_runs, output_folder, n_cpus
+        ).items():
+            predictions[allele].update(new_predictions)
+            connections[allele].execute('BEGIN IMMEDIATE')
+            connections[allele].executemany(
+                """INSERT OR REPLACE INTO binding (peptide, prediction, lastUsed)
+                    VALUES (?, ?, ?)""",
+                [
+                    (peptide, prediction, time.time())
+                    for peptide, prediction in new_predictions.items()
+                ],
+            )
+            connections[allele].execute('COMMIT')
+
+    for allele in inspire_config['alleles']:
+        for file_name, peptides in input_peptides.items():
+            pep_len = get_input_length(file_name)
+            write_mhcpan_output(
+                f'{output_folder}/mhcpan/' + file_name.replace(
+                    f'inputLen{pep_len}', f'output_{pep_len}_{allele}'
+                ),
+                [
+                    predictions[allele][peptide] for peptide in peptides
+                    if peptide in predictions[allele]
+                ],
+            )
+        connections[allele].close()
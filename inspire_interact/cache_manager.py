@@ -0,0 +1,169 @@
+""" Functions for the server-wide caches shared by all inSPIRE-Interactive
+    projects. Cached files are indexed in the queue database so that the least
+    recently used entries can be evicted once a cache exceeds its size.
+"""
+import os
+import shutil
+import threading
+import time
+
+from inspire_interact.constants import CACHE_PATH, MGF_CACHE
+from inspire_interact.fingerprints import hash_file, read_fingerprints
+from inspire_interact.queue_manager import connect_queue, queue_transaction
+
+
+def link_file(source_path, destination_path):
+    """ Function to hard link a file, copying it if it cannot be linked, e.g.
+        because it is on another file system.
+    """
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    temporary_path = f'{destination_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    try:
+        os.link(source_path, temporary_path)
+    except OSError:
+        shutil.copyfile(source_path, temporary_path)
+    os.replace(temporary_path, destination_path)
+
+
+def fetch_cache_entry(interact_home, cache_name, key):
+    """ Function to look up an entry of a cache, counting the hit or miss.
+
+    Returns
+    -------
+    entry_path : str or None
+        The path of the cached file, or None if it is not cached.
+    """
+    entry_path = f'{CACHE_PATH.format(home_key=interact_home, cache_name=cache_name)}/{key}'
+    with queue_transaction(interact_home) as connection:
+        entry = connection.execute(
+            'SELECT key FROM cache_entries WHERE cache = ? AND key = ?', (cache_name, key)
+        ).fetchone()
+        hit = entry is not None and os.path.exists(entry_path)
+        if hit:
+            connection.execute(
+                'UPDATE cache_entries SET lastUsed = ? WHERE cache = ? AND key = ?',
+                (time.time(), cache_name, key),
+            )
+        elif entry is not None:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE cache = ? AND key = ?', (cache_name, key)
+            )
+        record_cache_lookups(connection, cache_name, int(hit), int(not hit))
+    return entry_path if hit else None
+
+
+def record_cache_lookups(connection, cache_name, hits, misses):
+    """ Function to add to the hit and miss counters of a cache.
+    """
+    connection.execute(
+        """INSERT INTO cache_stats (cache, hits, misses) VALUES (?, ?, ?)
+            ON CONFLICT (cache) DO UPDATE SET
+                hits = hits + excluded.hits, misses = misses + excluded.misses""",
+        (cache_name, hits, misses),
+    )
+
+
+def add_cache_entry(interact_home, cache_name, key, file_path, max_size):
+    """ Function to add a file to a cache, evicting the least recently used
+        entries if the cache grows beyond its maximum size (GB).
+    """
+    entry_path = f'{CACHE_PATH.format(home_key=interact_home, cache_name=cache_name)}/{key}'
+    link_file(file_path, entry_path)
+    with queue_transaction(interact_home) as connection:
+        connection.execute(
+            """INSERT OR REPLACE INTO cache_entries (cache, key, size, lastUsed)
+                VALUES (?, ?, ?, ?)""",
+            (cache_name, key, os.path.getsize(entry_path), time.time()),
+        )
+    evict_cache(interact_home, cache_name, max_size)
+
+
+def evict_cache(interact_home, cache_name, max_size):
+    """ Function to remove the least recently used entries of a cache until it
+        fits within its maximum size (GB).
+    """
+    max_bytes = max_size*1024**3
+    with queue_transaction(interact_home) as connection:
+        entries = connection.execute(
+            """SELECT key, size FROM cache_entries WHERE cache = ?
+                ORDER BY lastUsed DESC""",
+            (cache_name,),
+        ).fetchall()
+        cache_size = 0
+        evicted_keys = []
+        for entry in entries:
+            cache_size += entry['size']
+            if cache_size > max_bytes:
+                evicted_keys.append(entry['key'])
+        connection.executemany(
+            'DELETE FROM cache_entries WHERE cache = ? AND key = ?',
+            [(cache_name, key) for key in evicted_keys],
+        )
+
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=cache_name)
+    for key in evicted_keys:
+        if os.path.exists(f'{cache_folder}/{key}'):
+            os.remove(f'{cache_folder}/{key}')
+
+
+def get_cache_stats(interact_home, cache_name):
+    """ Function to fetch the number of hits, misses and entries and the total
+        size (bytes) of a cache.
+    """
+    connection = connect_queue(interact_home)
+    cache_stats = connection.execute(
+        'SELECT hits, misses FROM cache_stats WHERE cache = ?', (cache_name,)
+    ).fetchone()
+    n_entries, cache_size = connection.execute(
+        'SELECT COUNT(*), TOTAL(size) FROM cache_entries WHERE cache = ?', (cache_name,)
+    ).fetchone()
+    return {
+        'hits': cache_stats['hits'] if cache_stats is not None else 0,
+        'misses': cache_stats['misses'] if cache_stats is not None else 0,
+        'entries': n_entries,
+        'size': int(cache_size),
+    }
+
+
+def get_raw_files(scans_folder):
+    """ Function to map the raw files of a project to the MGF files they convert
+        to, only including files which inSPIRE does not convert when the MGF exists.
+    """
+    return {
+        f'{scans_folder}/{file_name}': f'{scans_folder}/{file_name.replace(".raw", ".mgf")}'
+        for file_name in os.listdir(scans_folder) if file_name.endswith('.raw')
+    }
+
+
+def fetch_cached_scans(interact_home, project_home):
+    """ Function to link MGF files converted from identical raw files by any
+        project into this project, so that they are not converted again.
+    """
+    file_hashes = read_fingerprints(project_home)['fileHashes']
+    for raw_path, mgf_path in get_raw_files(f'{project_home}/ms').items():
+        if os.path.exists(mgf_path):
+            continue
+        entry_path = fetch_cache_entry(
+            interact_home, MGF_CACHE, f'{hash_file(raw_path, file_hashes)}.mgf'
+        )
+        if entry_path is None:
+            continue
+        try:
+            link_file(entry_path, mgf_path)
+            print(f'Reusing converted scans for {os.path.basename(raw_path)}.')
+        except FileNotFoundError:
+            # The entry was evicted by another job, convert as normal.
+            continue
+
+
+def store_converted_scans(interact_home, project_home, max_size):
+    """ Function to add the MGF files converted for this project to the cache.
+    """
+    file_hashes = read_fingerprints(project_home)['fileHashes']
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=MGF_CACHE)
+    for raw_path, mgf_path in get_raw_files(f'{project_home}/ms').items():
+        key = f'{hash_file(raw_path, file_hashes)}.mgf'
+        if os.path.exists(mgf_path) and not os.path.exists(f'{cache_folder}/{key}'):
+            add_cache_entry(interact_home, MGF_CACHE, key, mgf_path, max_size)
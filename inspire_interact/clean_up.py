@@ -5,63 +5,66 @@ import signal
 
 import pandas as pd
 
-from inspire_interact.constants import QUEUE_PATH
-from inspire_interact.queue_manager import remove_from_queue
-from inspire_interact.utils import get_pids
+from inspire_interact.queue_manager import (
+    get_project_job,
+    get_queue_job,
+    read_queue,
+    remove_from_queue,
+)
+from inspire_interact.utils import write_task_df
 
 
-def get_user_and_project(home_key, job_id):
-    """ Function to get the user and project name from a job ID.
-    """
-    queue_df = pd.read_csv(
-        QUEUE_PATH.format(home_key=home_key)
-    )
-    queue_df = queue_df[
-        queue_df['taskID'] == job_id
-    ]
-    if len(queue_df):
-        return queue_df['user'].iloc[0], queue_df['project'].iloc[0]
-    return None, None
-
 def clear_queue(interact_home):
     """ Function to cancel all running jobs and clear the queue.
     """
-    if os.path.exists(QUEUE_PATH.format(home_key=interact_home)):
-        queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-        for _, df_row in queue_df.iterrows():
-            cancel_job_helper(interact_home, df_row['user'], df_row['project'], df_row['taskID'])
+    queue_df = read_queue(interact_home)
+    for _, df_row in queue_df.iterrows():
+        cancel_job_helper(interact_home, df_row['user'], df_row['project'], df_row['taskID'])
+
+
+def kill_job(pid):
+    """ Function to stop the process running a job along with any processes
+        it has started.
+
+    Returns
+    -------
+    task_killed : bool
+        Whether the job's process was found and signalled.
+    """
+    try:
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(int(pid), signal.SIGTERM)
+            except ProcessLookupError:
+                # The job has not yet made its process group so cannot have
+                # started any processes of its own.
+                os.kill(int(pid), signal.SIGKILL)
+        else:
+            os.kill(int(pid), signal.SIGTERM)
+    except OSError:
+        return False
+    return True
 
 
 def cancel_job_helper(home_key, user, project, job_id):
     """ Function to cancel a job and delete it from the queue.
     """
-    if user is None:
-        user, project = get_user_and_project(home_key, job_id)
-    project_home = f'{home_key}/projects/{user}/{project}'
-
     if job_id is None:
-        pids = get_pids(project_home, 'inspire')
+        job = get_project_job(home_key, user, project)
     else:
-        pids = [int(job_id)]
+        job = get_queue_job(home_key, job_id)
 
-    if pids is None:
+    if job is None:
         return 'No task was running. Please refresh the page.'
 
-    remove_from_queue(home_key, int(pids[0]))
-
-    task_killed = False
-    for pid in pids:
-        try:
-            os.kill(int(pid), signal.SIGTERM)
-            task_killed = True
-        except OSError:
-            continue
-
-    if not task_killed:
-        return 'No task was running. Please refresh the page.'
+    remove_from_queue(home_key, job['taskID'], outcome='cancelled')
+    if job['pid'] is not None and not kill_job(job['pid']):
+        print(f'Could not stop process {job["pid"]} of cancelled job {job["taskID"]}.')
 
-    task_df = pd.read_csv(f'{project_home}/taskStatus.csv')
-    task_df['status'] = 'Job Cancelled'
-    task_df.to_csv(f'{project_home}/taskStatus.csv', index=False)
+    project_home = f'{home_key}/projects/{job["user"]}/{job["project"]}'
+    if os.path.exists(f'{project_home}/taskStatus.csv'):
+        task_df = pd.read_csv(f'{project_home}/taskStatus.csv')
+        task_df['status'] = 'Job Cancelled'
+        write_task_df(project_home, task_df)
 
     return 'Task cancelled. Please refresh the page.'
@@ -4,25 +4,80 @@ INTERACT_HOME_KEY = 'interactHome'
 SERVER_ADDRESS_KEY = 'serverAddress'
 FRAGGER_PATH_KEY = 'fraggerPath'
 FRAGGER_MEMORY_KEY = 'fraggerMemory'
+IMPORT_ROOTS_KEY = 'importRoots'
 CPUS_KEY = 'maxInspireCpus'
+JOB_CPUS_KEY = 'jobCpus'
+JOB_MEMORY_KEY = 'jobMemory'
+MEMORY_KEY = 'maxInspireMemory'
+QUEUE_POLICY_KEY = 'queuePolicy'
+USER_PRIORITY_KEY = 'userPriorities'
+MAX_USER_JOBS_KEY = 'maxUserJobs'
+MGF_CACHE_SIZE_KEY = 'mgfCacheSize'
+SPECTRA_CACHE_SIZE_KEY = 'spectraCacheSize'
+BINDING_CACHE_KEY = 'bindingCache'
+ARCHIVE_CACHE_SIZE_KEY = 'archiveCacheSize'
+REPORT_CACHE_SIZE_KEY = 'reportCacheSize'
 MHCPAN_KEY = 'netMHCpan'
+SERVER_WORKERS_KEY = 'serverWorkers'
+SERVER_THREADS_KEY = 'serverThreads'
 MODE_KEY = 'mode'
 SKYLINE_RUNNER_KEY = 'skylineRunner'
 RESCORE_COMMAND_KEY = 'rescoreCommand'
 
 QUEUE_PATH = '{home_key}/locks/inspireQueue.csv'
+QUEUE_DB_PATH = '{home_key}/locks/inspireQueue.db'
+WORKER_LOG_PATH = '{home_key}/locks/worker_log.txt'
+CACHE_PATH = '{home_key}/cache/{cache_name}'
+MGF_CACHE = 'mgf'
+SPECTRA_CACHE = 'spectra'
+BINDING_CACHE = 'netmhcpan'
+ARCHIVE_CACHE = 'archives'
+REPORT_CACHE = 'reports'
+UPLOAD_PATH = '{project_home}/uploads/{upload_id}.part'
+UPLOAD_CHUNK_SIZE = 8*1024*1024
+UPLOAD_EXPIRY = 7*24*60*60
+RESULTS_SUMMARY_PATH = '{project_home}/resultsSummary.json'
+RESULTS_TABLE_PATH = '{project_home}/resultsTables/{table}.parquet'
+QUEUE_COLUMNS = [
+    'user',
+    'project',
+    'taskID',
+    'status',
+    'state',
+    'cpus',
+    'memory',
+]
 
 ALL_CONFIG_KEYS = [
+    ARCHIVE_CACHE_SIZE_KEY,
+    BINDING_CACHE_KEY,
     CPUS_KEY,
     FRAGGER_PATH_KEY,
     FRAGGER_MEMORY_KEY,
+    IMPORT_ROOTS_KEY,
     INTERACT_HOME_KEY,
+    JOB_CPUS_KEY,
+    JOB_MEMORY_KEY,
+    MAX_USER_JOBS_KEY,
+    MEMORY_KEY,
+    MGF_CACHE_SIZE_KEY,
     MHCPAN_KEY,
+    QUEUE_POLICY_KEY,
+    REPORT_CACHE_SIZE_KEY,
     RESCORE_COMMAND_KEY,
     SERVER_ADDRESS_KEY,
+    SERVER_THREADS_KEY,
+    SERVER_WORKERS_KEY,
     SKYLINE_RUNNER_KEY,
+    SPECTRA_CACHE_SIZE_KEY,
+    USER_PRIORITY_KEY,
 ]
 
+FIFO_POLICY = 'fifo'
+PRIORITY_POLICY = 'priority'
+FAIR_SHARE_POLICY = 'fairShare'
+SHORTEST_JOB_POLICY = 'shortestJob'
+
 INTERMEDIATE_FILES = [
     # 'input_all_features.tab'
 ]
@@ -56,6 +111,105 @@ TASKS_NAMES = [
     'quantify',
     'extractCandidates',
 ]
+# The data each task reads and writes. A task depends on the tasks in the same
+# job which write any of its inputs, independent tasks can run concurrently.
+TASK_IO = {
+    'convert': {
+        'inputs': ['rawFiles'],
+        'outputs': ['scans'],
+    },
+    'fragger': {
+        'inputs': ['scans', 'proteome'],
+        'outputs': ['searchResults'],
+    },
+    'prepare': {
+        'inputs': ['scans', 'searchResults', 'proteome'],
+        'outputs': ['spectralInput', 'bindingInput', 'collisionEnergy'],
+    },
+    'predictSpectra': {
+        'inputs': ['spectralInput', 'collisionEnergy'],
+        'outputs': ['spectralPredictions'],
+    },
+    'predictBinding': {
+        'inputs': ['bindingInput'],
+        'outputs': ['bindingPredictions'],
+    },
+    'featureGeneration': {
+        'inputs': ['scans', 'searchResults', 'spectralPredictions', 'bindingPredictions'],
+        'outputs': ['features'],
+    },
+    'featureSelection+': {
+        'inputs': ['features'],
+        'outputs': ['rescoredPsms'],
+    },
+    'generateReport': {
+        'inputs': ['rescoredPsms', 'bindingPredictions'],
+        'outputs': ['performanceReport'],
+    },
+    'quantify': {
+        'inputs': ['rescoredPsms', 'scans'],
+        'outputs': ['quantification'],
+    },
+    'extractCandidates': {
+        'inputs': ['rescoredPsms', 'quantification'],
+        'outputs': ['epitopeCandidates'],
+    },
+}
+
+# Tasks whose failure does not prevent the tasks depending on them from running.
+OPTIONAL_TASKS = ('predictBinding', 'quantify', 'generateReport')
+
+# inSPIRE config keys which do not change the results of any task.
+EXECUTION_CONFIG_KEYS = (
+    'fraggerMemory',
+    'forceReload',
+    'nCores',
+    'reuseInput',
+    'silentExecution',
+)
+
+# The inSPIRE config keys read by a task, tasks not listed may read any key.
+TASK_CONFIG_KEYS = {
+    'convert': ['scansFolder', 'scansFormat'],
+    'fragger': [
+        'fraggerDbSplits', 'fraggerParams', 'fraggerPath', 'ms1Accuracy',
+        'mzAccuracy', 'mzUnits', 'proteome', 'scansFolder',
+    ],
+    'predictSpectra': ['collisionEnergy', 'spectralPredictor'],
+    'predictBinding': ['alleles', 'netMHCpan', 'panDocker', 'useBindingAffinity'],
+}
+
+# inSPIRE config keys which are only read by the given task and those after it.
+LATE_CONFIG_KEYS = {
+    'excludeFeatures': 'featureSelection+',
+    'falseDiscoveryRate': 'featureSelection+',
+    'includeFeatures': 'featureSelection+',
+    'rescoreCommand': 'featureSelection+',
+    'useIrtDelta': 'featureSelection+',
+    'skylineConfig': 'quantify',
+    'skylineIdpCutOff': 'quantify',
+    'skylineRatioCutOff': 'quantify',
+    'skylineReportTemplate': 'quantify',
+    'skylineRunner': 'quantify',
+    'quantCutOff': 'quantify',
+    'epitopeCandidateCutOff': 'extractCandidates',
+}
+
+# CPUs and memory (GB) reserved by each task while it runs, either a fixed
+# amount or the config key giving it.
+TASK_RESOURCES = {
+    'convert': {'cpus': JOB_CPUS_KEY, 'memory': 4},
+    'fragger': {'cpus': JOB_CPUS_KEY, 'memory': JOB_MEMORY_KEY},
+    'prepare': {'cpus': 1, 'memory': 8},
+    'predictSpectra': {'cpus': JOB_CPUS_KEY, 'memory': 16},
+    'predictBinding': {'cpus': JOB_CPUS_KEY, 'memory': 4},
+    'featureGeneration': {'cpus': JOB_CPUS_KEY, 'memory': 16},
+    'featureSelection+': {'cpus': 1, 'memory': 8},
+    'generateReport': {'cpus': 1, 'memory': 4},
+    'quantify': {'cpus': JOB_CPUS_KEY, 'memory': 8},
+    'extractCandidates': {'cpus': 1, 'memory': 4},
+}
+
 TASK_DESCRIPTIONS = {
     'convert': 'Converting MS Data',
     'fragger': 'Executing MSFragger',
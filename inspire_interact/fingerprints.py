@@ -0,0 +1,214 @@
+""" Functions for fingerprinting inSPIRE tasks so that a rerun of a project can
+    reuse the results of tasks whose settings and inputs have not changed.
+"""
+import hashlib
+import json
+import os
+
+import yaml
+
+from inspire_interact.constants import (
+    EXECUTION_CONFIG_KEYS,
+    LATE_CONFIG_KEYS,
+    TASK_CONFIG_KEYS,
+    TASK_IO,
+    TASKS_NAMES,
+)
+from inspire_interact.utils import get_task_dependencies
+
+HASH_CHUNK_SIZE = 1024*1024
+
+
+def read_fingerprints(project_home):
+    """ Function to read the task fingerprints and file hashes of a project.
+    """
+    if os.path.exists(f'{project_home}/taskFingerprints.yml'):
+        with open(f'{project_home}/taskFingerprints.yml', 'r', encoding='UTF-8') as stream:
+            return yaml.safe_load(stream)
+    return {'tasks': {}, 'fileHashes': {}}
+
+
+def write_fingerprints(project_home, fingerprint_data):
+    """ Function to write the task fingerprints and file hashes of a project.
+    """
+    with open(f'{project_home}/taskFingerprints.yml.tmp', 'w', encoding='UTF-8') as yaml_out:
+        yaml.dump(fingerprint_data, yaml_out)
+    os.replace(
+        f'{project_home}/taskFingerprints.yml.tmp', f'{project_home}/taskFingerprints.yml'
+    )
+
+
+def hash_file(file_path, file_hashes):
+    """ Function to hash the contents of a file, reusing the previous hash if
+        the file's size and modification time are unchanged.
+    """
+    file_stat = os.stat(file_path)
+    cached = file_hashes.get(file_path)
+    if cached is not None and cached[:2] == [file_stat.st_size, file_stat.st_mtime_ns]:
+        return cached[2]
+
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file_contents:
+        while chunk := file_contents.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    file_hashes[file_path] = [file_stat.st_size, file_stat.st_mtime_ns, file_hash.hexdigest()]
+    return file_hashes[file_path][2]
+
+
+def get_input_files(artifact, inspire_config):
+    """ Function to find the files of an input which is provided by the user
+        rather than written by an inSPIRE task.
+    """
+    if artifact in ('rawFiles', 'scans'):
+        extension = '.raw' if artifact == 'rawFiles' else '.mgf'
+        return [
+            f'{inspire_config["scansFolder"]}/{file_name}'
+            for file_name in os.listdir(inspire_config['scansFolder'])
+            if file_name.lower().endswith(extension)
+        ]
+    if artifact == 'proteome':
+        return [
+            inspire_config[config_key]
+            for config_key in ('proteome', 'pathogenProteome', 'hostProteome')
+            if inspire_config.get(config_key) and os.path.exists(inspire_config[config_key])
+        ]
+    if artifact == 'searchResults':
+        return inspire_config.get('searchResults', [])
+    return []
+
+
+def get_task_config(task, inspire_config):
+    """ Function to subset the inSPIRE config to the settings read by a task.
+    """
+    if task in TASK_CONFIG_KEYS:
+        return {
+            config_key: inspire_config.get(config_key)
+            for config_key in TASK_CONFIG_KEYS[task]
+        }
+    return {
+        config_key: config_value for config_key, config_value in inspire_config.items()
+        if config_key not in EXECUTION_CONFIG_KEYS and (
+            config_key not in LATE_CONFIG_KEYS or
+            TASKS_NAMES.index(task) >= TASKS_NAMES.index(LATE_CONFIG_KEYS[config_key])
+        )
+    }
+
+
+def get_task_fingerprints(project_home, task_list, file_hashes):
+    """ Function to fingerprint each task of a job from the settings it reads,
+        the hashes of the user provided files it reads and the fingerprints of
+        the tasks writing its other inputs.
+
+    Returns
+    -------
+    fingerprints : dict
+        Map of task ID to its fingerprint.
+    """
+    with open(f'{project_home}/config.yml', 'r', encoding='UTF-8') as stream:
+        inspire_config = yaml.safe_load(stream)
+    dependencies = get_task_dependencies(task_list)
+    written_artifacts = {
+        artifact for task in task_list for artifact in TASK_IO[task]['outputs']
+    }
+
+    fingerprints = {}
+    for task in task_list:
+        input_hashes = {
+            file_path: hash_file(file_path, file_hashes)
+            for artifact in TASK_IO[task]['inputs'] if artifact not in written_artifacts
+            for file_path in get_input_files(artifact, inspire_config)
+        }
+        task_details = {
+            'task': task,
+            'config': get_task_config(task, inspire_config),
+            'inputs': input_hashes,
+            'dependencies': {
+                dependency: fingerprints[dependency] for dependency in dependencies[task]
+            },
+        }
+        fingerprints[task] = hashlib.sha256(
+            json.dumps(task_details, sort_keys=True, default=str).encode()
+        ).hexdigest()
+    return fingerprints
+
+
+def snapshot_outputs(project_home, task, started, completed):
+    """ Function to record the size and modification time of all files in the
+        project's inSPIRE output and MS folders which a task changed, i.e.
+        those last modified while it ran. MGF files linked from the server-wide
+        cache keep their original modification time, so all MGF files are
+        recorded for convert.
+    """
+    outputs = {}
+    for folder in ('inspireOutput', 'ms'):
+        for dir_path, _, file_names in os.walk(f'{project_home}/{folder}'):
+            for file_name in file_names:
+                file_stat = os.stat(f'{dir_path}/{file_name}')
+                if started <= file_stat.st_mtime <= completed or (
+                    task == 'convert' and file_name.endswith('.mgf')
+                ):
+                    outputs[f'{dir_path}/{file_name}'] = [
+                        file_stat.st_size, file_stat.st_mtime_ns,
+                    ]
+    return outputs
+
+
+def record_task_outputs(project_home, fingerprint_data, fingerprints, completed_tasks, running):
+    """ Function to record the fingerprints and outputs of completed tasks once
+        all tasks which were running alongside them have finished as well. A
+        task running alongside may still be writing files changed while the
+        completed task ran. Once it has finished, those files either are no
+        longer changed or were last modified after the completed task.
+
+    Parameters
+    ----------
+    completed_tasks : dict
+        Map of each completed task which is not yet recorded to the times it
+        started and completed and the tasks which were still running then.
+        Recorded tasks are removed.
+    running : collection
+        The tasks still running.
+    """
+    recorded_tasks = [
+        task for task, (_, _, running_alongside) in completed_tasks.items()
+        if running_alongside.isdisjoint(running)
+    ]
+    for task in recorded_tasks:
+        started, completed, _ = completed_tasks.pop(task)
+        fingerprint_data['tasks'][task] = {
+            'fingerprint': fingerprints[task],
+            'outputs': snapshot_outputs(project_home, task, started, completed),
+        }
+    if recorded_tasks:
+        write_fingerprints(project_home, fingerprint_data)
+
+
+def outputs_unchanged(outputs):
+    """ Function to check that the files written by a task have not changed.
+    """
+    for file_path, (file_size, file_mtime) in outputs.items():
+        if not os.path.exists(file_path):
+            return False
+        file_stat = os.stat(file_path)
+        if [file_stat.st_size, file_stat.st_mtime_ns] != [file_size, file_mtime]:
+            return False
+    return True
+
+
+def get_reusable_tasks(task_list, fingerprint_data, fingerprints):
+    """ Function to find the tasks of a job whose previous results can be
+        reused, i.e. the task, and all the tasks it depends on, completed with
+        the same fingerprint and its outputs have not changed since.
+    """
+    dependencies = get_task_dependencies(task_list)
+    reusable_tasks = []
+    for task in task_list:
+        previous_run = fingerprint_data['tasks'].get(task)
+        if (
+            previous_run is not None and
+            previous_run['fingerprint'] == fingerprints[task] and
+            all(dependency in reusable_tasks for dependency in dependencies[task]) and
+            outputs_unchanged(previous_run['outputs'])
+        ):
+            reusable_tasks.append(task)
+    return reusable_tasks
@@ -1,167 +1,181 @@
 """ Functions to deal with returning results.
 """
 import os
-import time
+import threading
 
 from flask import render_template
 import pandas as pd
-import plotly.graph_objects as go
 
-from inspire_interact.constants import QUEUE_PATH
-from inspire_interact.utils import safe_job_id_fetch
+from inspire_interact.constants import QUEUE_DB_PATH
+from inspire_interact.queue_manager import get_queue_position, read_queue
+from inspire_interact.results_summary import get_results_summary
+from inspire_interact.state_cache import read_cached_file
 
-EPITOPE_CANDIDATE_ROUTE = 'inspireOutput/epitope/potentialEpitopeCandidates.csv'
-NS_PERC_PSMS_PATH = 'inspireOutput/non_spectral.percolator.psms.txt'
-NS_PERC_SEP_PSMS_PATH = 'inspireOutput/non_spectral.percolatorSeparate.psms.txt'
-PERC_PSMS_PATH = 'inspireOutput/final.percolator.psms.txt'
-PERC_SEP_PSMS_PATH = 'inspireOutput/final.percolatorSeparate.psms.txt'
-QUANT_FILE_PATH = 'inspireOutput/quant/quantified_per_file.csv'
+STATUS_COLORS = {
+    'Queued': '#AFEEEE',
+    'Completed': 'darkseagreen',
+    'Reused': '#c1e1c1',
+    'Failed': 'lightcoral',
+    'Running': '#FFE4B5',
+    'Skipped': '#FFE4B5',
+    'Job Cancelled': '#dec8d1',
+}
+TABLE_HEADER_HEIGHT = 25
+TABLE_ROW_HEIGHT = 20
+FIG_CACHE_SIZE = 1024
 
+# Rendered tables with the modification times of the files they were rendered from.
+_FIG_CACHE = {}
+_FIG_LOCK = threading.Lock()
 
 
-def fetch_queue_and_task(project_home, home_key):
-    """ Function to fetch interact queue and the job ID of an
-        inSPIRE execution.
-    """
-    job_id = safe_job_id_fetch(project_home)
+def render_table(column_names, column_widths, rows, width, height, margin=30, row_ids=None):
+    """ Function to render a table as an svg, with each row filled in its colour.
 
-    if not job_id:
-        time.sleep(3)
-        job_id = safe_job_id_fetch(project_home)
-    queue_df = pd.read_csv(
-        QUEUE_PATH.format(home_key=home_key)
+    Parameters
+    ----------
+    rows : list of tuple
+        The cell values and fill colour of each row.
+    row_ids : list of str or None
+        IDs of the rows, allowing them to be updated in the page.
+    """
+    columns = []
+    column_x = margin
+    for column_name, column_width in zip(column_names, column_widths):
+        columns.append({'name': column_name, 'x': column_x, 'width': column_width})
+        column_x += column_width
+    table_height = TABLE_HEADER_HEIGHT + len(rows)*TABLE_ROW_HEIGHT
+    height = max(height, table_height + 20)
+    return render_template(
+        'table.svg',
+        width=width,
+        height=height,
+        top=(height - table_height)//2,
+        header_height=TABLE_HEADER_HEIGHT,
+        row_height=TABLE_ROW_HEIGHT,
+        columns=columns,
+        rows=[
+            {'cells': cells, 'color': color, 'id': row_id}
+            for (cells, color), row_id in zip(rows, row_ids or [None]*len(rows))
+        ],
     )
-    if not queue_df.shape[0]:
-        time.sleep(2)
-        queue_df = pd.read_csv(
-            QUEUE_PATH.format(home_key=home_key)
-        )
-    return queue_df, job_id
 
 
-def create_queue_fig(interact_home, project_home):
-    """ Function to create an svg plot of the inSPIRE-interactive queue.
+def get_file_stamp(*file_paths):
+    """ Function to get the modification times and sizes of files, which change
+        whenever the files are written.
+    """
+    file_stamp = []
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            file_stat = os.stat(file_path)
+            file_stamp.append((file_stat.st_mtime_ns, file_stat.st_size))
+        else:
+            file_stamp.append(None)
+    return tuple(file_stamp)
+
+
+def store_cached_fig(cache_key, file_stamp, fig):
+    """ Function to store a rendered table in the cache, removing the least
+        recently stored tables once the cache is full.
+    """
+    with _FIG_LOCK:
+        _FIG_CACHE.pop(cache_key, None)
+        while len(_FIG_CACHE) >= FIG_CACHE_SIZE:
+            del _FIG_CACHE[next(iter(_FIG_CACHE))]
+        _FIG_CACHE[cache_key] = (file_stamp, fig)
+
+
+def create_queue_fig(interact_home, queue_policy):
+    """ Function to create an svg table of the inSPIRE-interactive queue in the
+        order the scheduling policy will run it. The table is only rendered
+        again once the queue database has been written to.
     """
-    queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-    queue_length = queue_df.shape[0]
-    task_colors = []
-    for idx in range(4):
-        task_colors.append([])
-        for row_idx in range(queue_length):
-            if row_idx > 0:
-                task_colors[idx].append('#AFEEEE')
-            else:
-                task_colors[idx].append('#FFE4B5')
-
-    fig = go.Figure(
-        data=[
-            go.Table(
-                header={
-                    'height': 25,
-                    'values': [
-                        'User',
-                        'Project',
-                        'Job ID',
-                        'Task Status',
-                    ],
-                    'line_color': 'black',
-                    'align': 'left',
-                },
-                cells={
-                    'height': 20,
-                    'values': [
-                        queue_df.user,
-                        queue_df.project,
-                        queue_df.taskID,
-                        queue_df.status,
-                    ],
-                    'fill_color': task_colors,
-                    'line_color': 'black',
-                    'align': 'left',
-                },
-                columnwidth = [200, 200, 100, 300],
+    db_path = QUEUE_DB_PATH.format(home_key=interact_home)
+    cache_key = ('queue', interact_home, queue_policy)
+    file_stamp = get_file_stamp(db_path, f'{db_path}-wal')
+    if (cached_fig := _FIG_CACHE.get(cache_key)) is not None and cached_fig[0] == file_stamp:
+        return cached_fig[1]
+
+    queue_df = read_queue(interact_home, queue_policy)
+    queue_svg = render_table(
+        ['User', 'Project', 'Job ID', 'Task Status', 'CPUs', 'Memory (GB)'],
+        [190, 190, 94, 282, 75, 109],
+        [
+            (
+                [user, project, job_id, status, cpus, memory],
+                '#FFE4B5' if job_state == 'running' else '#AFEEEE',
             )
-        ]
-    )
-    total_height = (queue_df.shape[0]*20) + 25 + 4
-    fig.update_layout(
-        width=800,
-        height=total_height+20,
-        margin={'r':30, 'l':30, 't':10, 'b':10}
+            for user, project, job_id, status, cpus, memory, job_state in zip(
+                queue_df['user'],
+                queue_df['project'],
+                queue_df['taskID'],
+                queue_df['status'],
+                queue_df['cpus'],
+                queue_df['memory'],
+                queue_df['state'],
+            )
+        ],
+        width=1000,
+        height=0,
     )
+    store_cached_fig(cache_key, file_stamp, queue_svg)
+    return queue_svg
+
+
+def load_task_statuses(status_path):
+    """ Function to parse a taskStatus.csv file.
+    """
+    task_df = pd.read_csv(status_path)
+    return [
+        {
+            'taskIndex': int(task_idx),
+            'taskName': task_name,
+            'status': status,
+            'color': STATUS_COLORS.get(status, 'white'),
+        }
+        for task_idx, task_name, status in zip(
+            task_df['taskIndex'], task_df['taskName'], task_df['status'],
+        )
+    ]
+
+
+def get_task_statuses(project_home):
+    """ Function to read the status of all tasks within an inSPIRE job, with
+        the colour each status is shown in.
+    """
+    try:
+        return read_cached_file(f'{project_home}/taskStatus.csv', load_task_statuses)
+    except FileNotFoundError:
+        return []
 
-    fig.write_image(f'{project_home}/queue.svg', engine='kaleido')
 
 def create_status_fig(project_home):
-    """ Function to create an svg plot of the status of all tasks within
-        an inSPIRE job.
+    """ Function to create an svg table of the status of all tasks within an
+        inSPIRE job. The table is only rendered again once the task statuses
+        have been written to.
     """
-    if not os.path.exists(f'{project_home}/taskStatus.csv'):
-        return
-    task_df = pd.read_csv(f'{project_home}/taskStatus.csv')
-    task_colors = []
-    for idx in range(3):
-        task_colors.append([])
-        for task_status in task_df['status'].tolist():
-            if task_status == 'Queued':
-                task_colors[idx].append('#AFEEEE')
-            if task_status == 'Completed':
-                task_colors[idx].append('darkseagreen')
-            if task_status == 'Failed':
-                task_colors[idx].append('lightcoral')
-            if task_status == 'Running':
-                task_colors[idx].append('#FFE4B5')
-            if task_status == 'Skipped':
-                task_colors[idx].append('#FFE4B5')
-            if task_status == 'Job Cancelled':
-                task_colors[idx].append('#dec8d1')
-
-    fig = go.Figure(
-        data=[
-            go.Table(
-                header={
-                    'height': 25,
-                    'values': [
-                        'Task Index',
-                        'Task',
-                        'Task Status',
-                    ],
-                    'line_color': 'black',
-                    'align': 'left',
-                },
-                cells={
-                    'height': 20,
-                    'values': [
-                        task_df.taskIndex,
-                        task_df.taskName,
-                        task_df.status,
-                    ],
-                    'fill_color': task_colors,
-                    'line_color': 'black',
-                    'align': 'left',
-                },
-                columnwidth = [120,200,120],
-            )
-        ]
-    )
-    total_height = (task_df.shape[0]*20) + 25 + 4
-    padding = (300 - total_height)/2
-    fig.update_layout(
+    cache_key = ('status', project_home)
+    file_stamp = get_file_stamp(f'{project_home}/taskStatus.csv')
+    if file_stamp == (None,):
+        return ''
+    if (cached_fig := _FIG_CACHE.get(cache_key)) is not None and cached_fig[0] == file_stamp:
+        return cached_fig[1]
+
+    task_statuses = get_task_statuses(project_home)
+    status_svg = render_table(
+        ['Task Index', 'Task', 'Task Status'],
+        [120, 200, 120],
+        [
+            ([task['taskIndex'], task['taskName'], task['status']], task['color'])
+            for task in task_statuses
+        ],
         width=500,
         height=300,
-        margin={'r':30, 'l':30, 't':padding, 'b':padding}
+        row_ids=[f'task-{task["taskIndex"]}' for task in task_statuses],
     )
-
-    fig_html = fig.to_html()
-    fig.write_image(
-        f'{project_home}/progress.svg', engine='kaleido'
-    )
-    with open(
-        f'{project_home}/progress.html',
-        mode='w',
-        encoding='UTF-8',
-    ) as html_out:
-        html_out.write(fig_html)
+    store_cached_fig(cache_key, file_stamp, status_svg)
+    return status_svg
 
 def safe_fetch(file_path):
     """ Function to check if a file_path exists and return the contents
@@ -172,14 +186,27 @@ def safe_fetch(file_path):
             return file_contents.read()
     return ''
 
-def deal_with_queue(interact_home, project_home, server_address, header_and_footer):
+def deal_with_queue(
+        interact_home,
+        server_address,
+        user,
+        project,
+        header_and_footer,
+        queue_policy,
+    ):
     """ Function to provide information if the inSPIRE execution is still queued.
     """
-    create_queue_fig(interact_home, project_home)
-    queue_svg = safe_fetch(f'{project_home}/queue.svg')
+    queue_svg = create_queue_fig(interact_home, queue_policy)
+    queue_position, queue_length = get_queue_position(
+        interact_home, user, project, queue_policy,
+    )
     return render_template(
         'queued.html',
+        queue_position=queue_position,
+        queue_length=queue_length,
         server_address=server_address,
+        user=user,
+        project=project,
         queue_svg=queue_svg,
         **header_and_footer
     )
@@ -187,8 +214,7 @@ def deal_with_queue(interact_home, project_home, server_address, header_and_foot
 def deal_with_failure(project_home, server_address, user, project, workflow, header_and_footer):
     """ Function to provide information if the inSPIRE execution has failed.
     """
-    create_status_fig(project_home)
-    progress_html = safe_fetch(f'{project_home}/progress.html')
+    progress_html = create_status_fig(project_home)
 
     return render_template(
         'failed.html',
@@ -203,8 +229,7 @@ def deal_with_failure(project_home, server_address, user, project, workflow, hea
 def deal_with_waiting(project_home, server_address, user, project, header_and_footer):
     """ Function to return waiting screen if data is still processing.
     """
-    create_status_fig(project_home)
-    progress_svg = safe_fetch(f'{project_home}/progress.svg')
+    progress_svg = create_status_fig(project_home)
     return render_template(
         'waiting.html',
         progress_html=progress_svg,
@@ -226,13 +251,13 @@ def deal_with_success(
     """ Function to return the results screen if inSPIRE has executed successfully
     """
     # Fetch the plots to be shown on results page.
-    create_status_fig(project_home)
-    progress_svg = safe_fetch(f'{project_home}/progress.svg')
+    progress_svg = create_status_fig(project_home)
     psm_fdr_svg = safe_fetch(f'{project_home}/inspireOutput/img/psm_fdr_curve.svg')
     ep_bar = safe_fetch(f'{project_home}/inspireOutput/img/epitope_bar_plot.svg')
     quant_svg = safe_fetch(f'{project_home}/inspireOutput/img/peptide_volcano.svg')
     if not quant_svg:
         quant_svg = safe_fetch(f'{project_home}/inspireOutput/img/norm_correlation.svg')
+    results_summary = get_results_summary(project_home)
 
     return render_template(
         'ready.html',
@@ -245,54 +270,29 @@ def deal_with_success(
         ep_bar=ep_bar,
         quant_html=quant_svg,
         progress_html=progress_svg,
-        inspire_increase=get_inspire_increase(project_home, 'total'),
-        pathogen_increase=get_inspire_increase(project_home, 'pathogen'),
-        inspire_quantified_count=get_quant_count(project_home),
+        inspire_increase=get_inspire_increase(results_summary, 'total'),
+        pathogen_increase=get_inspire_increase(results_summary, 'pathogen'),
+        inspire_quantified_count=get_quant_count(results_summary),
         **header_and_footer
     )
 
 
-def get_inspire_increase(project_home, variant):
+def get_inspire_increase(results_summary, variant):
     """ Function to calculate the percentage increase in peptides/PSMs by inSPIRE.
     """
     if variant == 'total':
-        try:
-            if os.path.exists(f'{project_home}/{PERC_PSMS_PATH}'):
-                inspire_df = pd.read_csv(f'{project_home}/{PERC_PSMS_PATH}', sep='\t')
-            elif os.path.exists(f'{project_home}/{PERC_SEP_PSMS_PATH}'):
-                inspire_df = pd.read_csv(f'{project_home}/{PERC_SEP_PSMS_PATH}', sep='\t')
-            else:
-                inspire_df = pd.DataFrame({'q-value': []})
-        except pd.errors.EmptyDataError:
-            inspire_df = pd.DataFrame({'q-value': []})
-        inspire_count = len(inspire_df[inspire_df['q-value'] < 0.01])
-
-        try:
-            if os.path.exists(f'{project_home}/{NS_PERC_PSMS_PATH}'):
-                ns_df = pd.read_csv(f'{project_home}/{NS_PERC_PSMS_PATH}', sep='\t')
-            elif os.path.exists(f'{project_home}/{NS_PERC_SEP_PSMS_PATH}'):
-                ns_df = pd.read_csv(f'{project_home}/{NS_PERC_SEP_PSMS_PATH}', sep='\t')
-            else:
-                ns_df = pd.DataFrame({'q-value': []})
-        except pd.errors.EmptyDataError:
-            ns_df = pd.DataFrame({'q-value': []})
-        ns_count = len(ns_df[ns_df['q-value'] < 0.01])
-
+        inspire_count = results_summary['inspirePsms']
+        ns_count = results_summary['nonSpectralPsms']
         if ns_count <= 0:
             return ''
         increase = round(100*(inspire_count - ns_count)/ns_count, 2)
 
         return f'inSPIRE increased overall PSM yield by {increase}% at 1% FDR.'
 
-    if not os.path.exists(f'{project_home}/{EPITOPE_CANDIDATE_ROUTE}'):
+    if results_summary['pathogenShared'] is None:
         return 'No epitope candidates found.'
-    pathogen_df = pd.read_csv(f'{project_home}/{EPITOPE_CANDIDATE_ROUTE}')
-    shared_count = len(pathogen_df[
-        pathogen_df['foundBySearchEngine'] == 'Yes'
-    ])
-    inspire_count = len(pathogen_df[
-        pathogen_df['foundBySearchEngine'] == 'No'
-    ])
+    shared_count = results_summary['pathogenShared']
+    inspire_count = results_summary['pathogenInspire']
     if shared_count == 0:
         increase = '>100'
     else:
@@ -301,13 +301,7 @@ def get_inspire_increase(project_home, variant):
     return f'inSPIRE increased pathogen peptide yield by {increase}%.'
 
 
-def get_quant_count(project_home):
+def get_quant_count(results_summary):
     """ Function to get the number of peptides quantified via Skyline.
     """
-    if os.path.exists(f'{project_home}/{QUANT_FILE_PATH}'):
-        quant_df = pd.read_csv(f'{project_home}/{QUANT_FILE_PATH}')
-        quant_count = quant_df.shape[0]
-    else:
-        quant_count = 0
-
-    return f'inSPIRE quantified {quant_count} peptides via Skyline.'
+    return f'inSPIRE quantified {results_summary["quantifiedPeptides"]} peptides via Skyline.'
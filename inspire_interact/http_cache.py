@@ -0,0 +1,332 @@
+""" Functions for HTTP caching and compression. Reports are compressed once and
+    the compressed copies kept in a server-wide cache, static files are
+    compressed once per process and other text responses as they are sent.
+    All responses carry an ETag so that unchanged content is answered with a
+    304 response. Result files are sent in byte ranges on request, so that
+    interrupted downloads resume, and through the server's file wrapper, so
+    that gunicorn copies them to the socket with sendfile.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from flask import Response, send_file
+
+from inspire_interact.cache_manager import add_cache_entry, fetch_cache_entry
+from inspire_interact.constants import CACHE_PATH, REPORT_CACHE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+)
+MIN_COMPRESS_SIZE = 1024
+# Reports and static files are compressed once so the best compression is used.
+STORED_COMPRESS_LEVELS = {'br': 9, 'gzip': 9}
+RESPONSE_COMPRESS_LEVELS = {'br': 4, 'gzip': 6}
+# Static files linked with their version can be cached until the version changes.
+STATIC_MAX_AGE = 365*24*60*60
+STATIC_UNVERSIONED_MAX_AGE = 60*60
+ENCODING_EXTENSIONS = {None: '', 'br': '.br', 'gzip': '.gz'}
+TRANSFER_BLOCK_SIZE = 1024*1024
+
+# Compressed static files with the modification times of the files.
+_STATIC_CACHE = {}
+
+
+def choose_encoding(request):
+    """ Function to choose the content encoding to send a response with.
+    """
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_data(data, encoding, compress_levels):
+    """ Function to compress data with the chosen content encoding.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=compress_levels['br'])
+    return gzip.compress(data, compresslevel=compress_levels['gzip'], mtime=0)
+
+
+def is_compressible(mimetype):
+    """ Function to check whether a response type is text, which compresses well.
+    """
+    return mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def get_file_etag(file_path, variant=''):
+    """ Function to create an ETag for a file from its modification time and
+        size, along with anything else changing what is sent.
+    """
+    file_stat = os.stat(file_path)
+    return hashlib.sha256(
+        f'{file_path}/{file_stat.st_mtime_ns}/{file_stat.st_size}/{variant}'.encode()
+    ).hexdigest()[:32]
+
+
+def is_not_modified(request, etag, last_modified):
+    """ Function to check whether the client's cached copy is still current.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since is not None:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def add_cache_headers(response, etag, last_modified, encoding, max_age=None):
+    """ Function to add the validators and caching policy to a response.
+    """
+    response.set_etag(etag)
+    response.last_modified = int(last_modified)
+    response.vary.add('Accept-Encoding')
+    if encoding is not None and response.status_code != 304:
+        response.content_encoding = encoding
+    if max_age is None:
+        # Results may change when a project is run again, so always revalidate.
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+def read_file_range(result_file, length):
+    """ Function to read a range of an open file in blocks, closing it once sent.
+    """
+    try:
+        while length > 0:
+            file_block = result_file.read(min(TRANSFER_BLOCK_SIZE, length))
+            if not file_block:
+                break
+            length -= len(file_block)
+            yield file_block
+    finally:
+        result_file.close()
+
+
+def get_file_body(environ, result_file, start, length):
+    """ Function to create the body sending a range of an open file. gunicorn's
+        file wrapper sends the file with sendfile and stops at the
+        Content-Length, other servers are given the range in blocks.
+    """
+    result_file.seek(start)
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        return file_wrapper(result_file, TRANSFER_BLOCK_SIZE)
+    return read_file_range(result_file, length)
+
+
+def get_requested_range(request, file_size, etag, last_modified):
+    """ Function to find the byte range of a file requested by the client.
+
+    Returns
+    -------
+    byte_range : tuple or None
+        The start and stop of the range, None if the whole file is to be sent
+        or (None, None) if the range is outside the file.
+    """
+    byte_range = request.range
+    if byte_range is None or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        # Several ranges may be answered with the whole file.
+        return None
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and int(if_range.date.timestamp()) != int(last_modified):
+        return None
+
+    start, stop = byte_range.ranges[0]
+    if stop is None:
+        if start < 0:
+            # The last bytes of the file, all of it if it is shorter.
+            start = max(file_size + start, 0)
+        stop = file_size
+    if start >= file_size:
+        return None, None
+    return start, min(stop, file_size)
+
+
+def send_result_file(
+    request, file_path, mimetype=None, etag=None, last_modified=None, download_name=None,
+):
+    """ Function to send a file, or the byte range of it which was requested.
+
+    Parameters
+    ----------
+    etag : str or None
+        The ETag of the content sent, by default created from the file.
+    last_modified : float or None
+        The modification time of the content sent, by default the file's.
+    download_name : str or None
+        The name to save the file as, if it is to be downloaded rather than shown.
+    """
+    result_file = open(file_path, 'rb')
+    file_stat = os.fstat(result_file.fileno())
+    if last_modified is None:
+        last_modified = file_stat.st_mtime
+    if etag is None:
+        etag = get_file_etag(file_path)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+
+    if is_not_modified(request, etag, last_modified):
+        result_file.close()
+        return add_cache_headers(Response(status=304), etag, last_modified, None)
+    byte_range = get_requested_range(request, file_stat.st_size, etag, last_modified)
+    if byte_range == (None, None):
+        result_file.close()
+        response = Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{file_stat.st_size}'
+        return add_cache_headers(response, etag, last_modified, None)
+
+    start, stop = byte_range or (0, file_stat.st_size)
+    response = Response(
+        get_file_body(request.environ, result_file, start, stop - start),
+        status=206 if byte_range else 200,
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    response.content_length = stop - start
+    response.accept_ranges = 'bytes'
+    if byte_range:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{file_stat.st_size}'
+    if download_name is not None:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return add_cache_headers(response, etag, last_modified, None)
+
+
+def send_report(request, interact_home, max_size, file_path, replacements=None):
+    """ Function to send an html report, compressed if the client accepts it.
+        Rewritten and compressed copies of the report are kept in the report
+        cache until the report changes.
+
+    Parameters
+    ----------
+    replacements : dict or None
+        Text to replace in the report, e.g. paths to rewrite as links.
+    """
+    encoding = choose_encoding(request)
+    last_modified = os.path.getmtime(file_path)
+    etag = get_file_etag(file_path, f'{sorted((replacements or {}).items())}')
+    variant_etag = f'{etag}{ENCODING_EXTENSIONS[encoding]}'
+    if is_not_modified(request, variant_etag, last_modified):
+        return add_cache_headers(Response(status=304), variant_etag, last_modified, encoding)
+    if encoding is None and not replacements:
+        return add_cache_headers(
+            send_result_file(request, file_path, 'text/html', variant_etag, last_modified),
+            variant_etag,
+            last_modified,
+            encoding,
+        )
+
+    key = f'{etag}.html{ENCODING_EXTENSIONS[encoding]}'
+    if max_size and (entry_path := fetch_cache_entry(interact_home, REPORT_CACHE, key)):
+        try:
+            return add_cache_headers(
+                send_result_file(request, entry_path, 'text/html', variant_etag, last_modified),
+                variant_etag,
+                last_modified,
+                encoding,
+            )
+        except FileNotFoundError:
+            # Evicted since the lookup, create it again.
+            pass
+
+    with open(file_path, 'r', encoding='UTF-8') as report_file:
+        contents = report_file.read()
+    for old_text, new_text in (replacements or {}).items():
+        contents = contents.replace(old_text, new_text)
+    report_data = contents.encode('UTF-8')
+    if encoding is not None:
+        report_data = compress_data(report_data, encoding, STORED_COMPRESS_LEVELS)
+
+    if max_size:
+        cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=REPORT_CACHE)
+        os.makedirs(cache_folder, exist_ok=True)
+        report_file, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=cache_folder)
+        with os.fdopen(report_file, 'wb') as report_out:
+            report_out.write(report_data)
+        add_cache_entry(interact_home, REPORT_CACHE, key, temporary_path, max_size)
+        os.remove(temporary_path)
+    return add_cache_headers(
+        Response(report_data, mimetype='text/html'), variant_etag, last_modified, encoding,
+    )
+
+
+def send_static_file(request, static_folder, file_name):
+    """ Function to send a static file, compressed if it is text. Files linked
+        with their version are cached by the browser for a year.
+    """
+    file_path = os.path.join(static_folder, file_name)
+    mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    encoding = choose_encoding(request) if is_compressible(mimetype) else None
+    last_modified = os.path.getmtime(file_path)
+    etag = f'{get_file_etag(file_path)}{ENCODING_EXTENSIONS[encoding]}'
+    max_age = STATIC_MAX_AGE if 'v' in request.args else STATIC_UNVERSIONED_MAX_AGE
+    if is_not_modified(request, etag, last_modified):
+        return add_cache_headers(Response(status=304), etag, last_modified, encoding, max_age)
+    if encoding is None:
+        return add_cache_headers(
+            send_file(file_path, mimetype=mimetype, etag=False), etag, last_modified, encoding, max_age,
+        )
+
+    if (cached_file := _STATIC_CACHE.get((file_path, encoding))) is None or (
+        cached_file[0] != etag
+    ):
+        with open(file_path, 'rb') as static_file:
+            cached_file = (
+                etag, compress_data(static_file.read(), encoding, STORED_COMPRESS_LEVELS),
+            )
+        _STATIC_CACHE[(file_path, encoding)] = cached_file
+    return add_cache_headers(
+        Response(cached_file[1], mimetype=mimetype), etag, last_modified, encoding, max_age,
+    )
+
+
+def compress_response(request, response):
+    """ Function to compress a text response as it is sent, answering with a
+        304 response if the client already has it.
+    """
+    if (
+        request.method != 'GET' or
+        response.status_code != 200 or
+        response.direct_passthrough or
+        response.is_streamed or
+        'Content-Encoding' in response.headers or
+        not is_compressible(response.mimetype)
+    ):
+        return response
+
+    response_data = response.get_data()
+    encoding = choose_encoding(request) if len(response_data) >= MIN_COMPRESS_SIZE else None
+    # Compressed and uncompressed responses must have different ETags.
+    etag = f'{hashlib.sha256(response_data).hexdigest()[:32]}{ENCODING_EXTENSIONS[encoding]}'
+    if request.if_none_match.contains(etag):
+        not_modified = Response(status=304)
+        not_modified.set_etag(etag)
+        not_modified.vary.add('Accept-Encoding')
+        return not_modified
+
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.set_data(compress_data(response_data, encoding, RESPONSE_COMPRESS_LEVELS))
+        response.content_encoding = encoding
+    return response
@@ -0,0 +1,125 @@
+""" Functions for importing files which are already on storage mounted by the
+    server, e.g. a NAS written to by the instruments, into a project without
+    uploading them. Files are only imported from the configured import roots.
+"""
+import os
+import shutil
+import threading
+
+from inspire_interact.upload_manager import get_upload_name
+
+IMPORT_FILE_TYPES = ('ms', 'search', 'proteome')
+# ioctl request to clone a file's extents, see ioctl_ficlone(2).
+FICLONE = 0x40049409
+
+
+def resolve_import_path(import_roots, import_path):
+    """ Function to resolve a path to be imported, checking that it lies
+        within one of the import roots.
+    """
+    real_path = os.path.realpath(import_path)
+    for import_root in import_roots:
+        if os.path.commonpath([import_root, real_path]) == import_root:
+            return real_path
+    raise ValueError(f'{import_path} is not within an import root.')
+
+
+def list_import_folder(import_roots, folder_path=None):
+    """ Function to list the folders and files of a folder which can be imported,
+        or the import roots if no folder is given.
+    """
+    if folder_path is None:
+        return {'path': None, 'folders': import_roots, 'files': []}
+
+    folder_path = resolve_import_path(import_roots, folder_path)
+    folders = []
+    files = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                resolve_import_path(import_roots, entry.path)
+            except ValueError:
+                # A link leading outside of the import roots.
+                continue
+            if entry.is_dir():
+                folders.append(entry.path)
+            elif entry.is_file():
+                files.append({'path': entry.path, 'size': entry.stat().st_size})
+    return {
+        'path': folder_path,
+        'folders': sorted(folders),
+        'files': sorted(files, key=lambda file_details: file_details['path']),
+    }
+
+
+def reflink_file(source_path, destination_path):
+    """ Function to create a copy-on-write clone of a file, which is only
+        possible on file systems such as Btrfs and XFS.
+    """
+    import fcntl
+
+    with open(source_path, 'rb') as source_file:
+        with open(destination_path, 'wb') as destination_file:
+            try:
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+            except OSError:
+                destination_file.close()
+                os.remove(destination_path)
+                raise
+
+
+def import_file(source_path, destination_path):
+    """ Function to bring a file into a project without copying its contents if
+        possible. A reflink is tried first as later changes to the source do
+        not affect it, then a hard link and a symbolic link, copying the file
+        only if none of these are supported.
+
+    Returns
+    -------
+    import_method : str
+        The method by which the file was imported.
+    """
+    temporary_path = f'{destination_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if os.path.lexists(temporary_path):
+        os.remove(temporary_path)
+    for import_method, import_function in (
+        ('reflink', reflink_file),
+        ('hardlink', os.link),
+        ('symlink', os.symlink),
+    ):
+        try:
+            import_function(source_path, temporary_path)
+            break
+        except (ImportError, NotImplementedError, OSError):
+            continue
+    else:
+        import_method = 'copy'
+        shutil.copyfile(source_path, temporary_path)
+    os.replace(temporary_path, destination_path)
+    return import_method
+
+
+def import_files(interact_home, import_roots, user, project, file_type, import_paths):
+    """ Function to import files from the import roots into a project, named
+        as if they had been uploaded.
+
+    Returns
+    -------
+    imported_files : dict
+        Map of the names of the imported files to the method used for each.
+    """
+    if file_type not in IMPORT_FILE_TYPES:
+        raise ValueError(f'Files cannot be imported as {file_type}.')
+    import_home = f'{interact_home}/projects/{user}/{project}/{file_type}'
+    os.makedirs(import_home, exist_ok=True)
+
+    imported_files = {}
+    for file_idx, import_path in enumerate(import_paths):
+        source_path = resolve_import_path(import_roots, import_path)
+        if not os.path.isfile(source_path):
+            raise ValueError(f'{import_path} is not a file.')
+        file_name = get_upload_name(file_type, os.path.basename(import_path), file_idx)
+        imported_files[file_name] = import_file(source_path, f'{import_home}/{file_name}')
+    return imported_files
@@ -2,57 +2,52 @@
 """
 import ast
 import os
-import sys
-import time
 
 from inspire.config import ALL_CONFIG_KEYS
 import yaml
 
 from inspire_interact.constants import (
-    CPUS_KEY,
-    FRAGGER_MEMORY_KEY,
     FRAGGER_PATH_KEY,
     INTERACT_HOME_KEY,
+    JOB_CPUS_KEY,
+    JOB_MEMORY_KEY,
     MHCPAN_KEY,
     RESCORE_COMMAND_KEY,
     SKYLINE_RUNNER_KEY,
+    USER_PRIORITY_KEY,
 )
+from inspire_interact.queue_manager import submit_job
 from inspire_interact.utils import (
-    check_pids, write_task_status, read_meta, subset_tasks,
+    write_task_status, read_meta, subset_tasks,
 )
-from inspire_interact.inspire_script import INSPIRE_SCRIPT
-
 
 
 def execute_inspire(app_config, project_home, config_dict):
-    """ Function to execute inSPIRE, writes config file, a bash file with all
-        required tasks, and then executes the bash file in the background.
+    """ Function to execute inSPIRE, writes config file and task status and
+        then submits the job to the queue to be run by the worker.
     """
     inspire_settings = prepare_inspire(config_dict, project_home, app_config)
     write_task_status(inspire_settings, project_home)
 
-    # In case of rerunning, we should be careful not to reuse this file.
-    if os.path.exists(f'{project_home}/inspireOutput/formated_df.csv'):
-        os.remove(f'{project_home}/inspireOutput/formated_df.csv')
-
     task_list = subset_tasks(inspire_settings)
-    inspire_script = INSPIRE_SCRIPT.format(
-        home_key=app_config[INTERACT_HOME_KEY],
-        project_home=project_home,
-        task_list=','.join(task_list)
+    submit_job(
+        app_config[INTERACT_HOME_KEY],
+        config_dict['user'],
+        config_dict['project'],
+        task_list,
+        priority=app_config[USER_PRIORITY_KEY].get(config_dict['user'], 0),
+        input_size=get_input_size(project_home),
     )
-    script_path = f'{project_home}/inspire_script.py'
-    with open(script_path, mode='w', encoding='UTF-8') as script_file:
-        script_file.writelines(inspire_script)
 
-    os.popen(
-        f'{sys.executable} {script_path} > {project_home}/inspire_log.txt 2>&1'
+
+def get_input_size(project_home):
+    """ Function to get the total size (bytes) of the MS data of a project.
+    """
+    return sum(
+        os.path.getsize(f'{project_home}/ms/{file_name}')
+        for file_name in os.listdir(f'{project_home}/ms')
+        if file_name.lower().endswith(('.raw', '.mgf'))
     )
-    for idx in range(3):
-        if check_pids(project_home, 'inspire') == 'waiting':
-            break
-        
-        time.sleep(idx+1)
 
 
 def prepare_inspire(config_dict, project_home, app_config):
@@ -75,8 +70,8 @@ def prepare_inspire(config_dict, project_home, app_config):
         'silentExecution': True,
         'reuseInput': True,
         'fraggerPath': app_config[FRAGGER_PATH_KEY],
-        'fraggerMemory': app_config[FRAGGER_MEMORY_KEY],
-        'nCores': app_config[CPUS_KEY],
+        'fraggerMemory': app_config[JOB_MEMORY_KEY],
+        'nCores': app_config[JOB_CPUS_KEY],
         'skylineRunner': app_config[SKYLINE_RUNNER_KEY],
         RESCORE_COMMAND_KEY: app_config[RESCORE_COMMAND_KEY],
         'technicalReplicates': config_dict['technicalReplicates'],
@@ -0,0 +1,136 @@
+""" Functions for reporting the status of a project's job, either once or as a
+    stream of server-sent events. The stream only checks the modification
+    times of the task status file and the queue database, reading them again
+    and sending an event only when one of them has changed.
+"""
+import itertools
+import json
+import threading
+import time
+
+from inspire_interact.constants import QUEUE_DB_PATH
+from inspire_interact.handle_results import create_queue_fig, get_file_stamp, get_task_statuses
+from inspire_interact.queue_manager import get_project_job, get_queue_position
+
+STATUS_POLL_INTERVAL = 1
+STATUS_KEEP_ALIVE = 15
+# Each stream holds a server thread, so streams are closed after a minute and
+# the browser reconnects after the retry interval, freeing threads for other
+# requests.
+STATUS_STREAM_LIFETIME = 60
+STATUS_RETRY_MS = 5000
+# Pages watching a job poll the status instead once this share of a process's
+# threads are streaming, keeping the others free for other requests.
+STATUS_STREAM_SHARE = 0.5
+
+_STREAM_IDS = itertools.count()
+_OPEN_STREAMS = set()
+_STREAM_LOCK = threading.Lock()
+
+
+def open_status_stream(server_threads):
+    """ Function to reserve a thread of this process for a status stream.
+
+    Returns
+    -------
+    stream_id : int or None
+        The ID to close the stream with, or None if too many threads of this
+        process already stream statuses.
+    """
+    with _STREAM_LOCK:
+        if len(_OPEN_STREAMS) >= int(server_threads*STATUS_STREAM_SHARE):
+            return None
+        stream_id = next(_STREAM_IDS)
+        _OPEN_STREAMS.add(stream_id)
+        return stream_id
+
+
+def close_status_stream(stream_id):
+    """ Function to free the thread reserved for a status stream.
+    """
+    with _STREAM_LOCK:
+        _OPEN_STREAMS.discard(stream_id)
+
+
+def get_job_status(interact_home, user, project, queue_policy, include_svg=False):
+    """ Function to get the status of a project's job.
+
+    Returns
+    -------
+    job_status : dict
+        The state of the job (queued, starting, running or finished), with the
+        queue position of a queued job and the task statuses of a started job.
+    """
+    project_home = f'{interact_home}/projects/{user}/{project}'
+    job = get_project_job(interact_home, user, project)
+    if job is None:
+        return {'state': 'finished'}
+
+    if job['state'] == 'running':
+        return {
+            # The job's process is started once the worker has granted it.
+            'state': 'running' if job['pid'] is not None else 'starting',
+            'status': job['status'],
+            'tasks': get_task_statuses(project_home),
+        }
+
+    queue_position, queue_length = get_queue_position(
+        interact_home, user, project, queue_policy,
+    )
+    job_status = {
+        'state': 'queued',
+        'status': job['status'],
+        'queuePosition': queue_position,
+        'queueLength': queue_length,
+    }
+    if include_svg:
+        job_status['queueSvg'] = create_queue_fig(interact_home, queue_policy)
+    return job_status
+
+
+def get_status_stamp(interact_home, user, project):
+    """ Function to get the modification times of the files a job's status is
+        read from.
+    """
+    db_path = QUEUE_DB_PATH.format(home_key=interact_home)
+    return get_file_stamp(
+        f'{interact_home}/projects/{user}/{project}/taskStatus.csv',
+        db_path,
+        f'{db_path}-wal',
+    )
+
+
+def format_event(event_name, event_data):
+    """ Function to format a server-sent event.
+    """
+    return f'event: {event_name}\ndata: {json.dumps(event_data)}\n\n'
+
+
+def stream_job_status(interact_home, user, project, queue_policy):
+    """ Function to generate server-sent events with the status of a project's
+        job each time it changes, until the job has finished.
+    """
+    yield f'retry: {STATUS_RETRY_MS}\n\n'
+    stream_start = time.time()
+    last_event = stream_start
+    status_stamp = None
+    job_status = None
+    while time.time() - stream_start < STATUS_STREAM_LIFETIME:
+        new_stamp = get_status_stamp(interact_home, user, project)
+        if new_stamp != status_stamp:
+            status_stamp = new_stamp
+            new_status = get_job_status(
+                interact_home, user, project, queue_policy, include_svg=True,
+            )
+            if new_status != job_status:
+                job_status = new_status
+                last_event = time.time()
+                yield format_event('status', job_status)
+                if job_status['state'] == 'finished':
+                    return
+        if time.time() - last_event >= STATUS_KEEP_ALIVE:
+            # Comments keep proxies from closing the connection and detect
+            # clients which have gone away.
+            last_event = time.time()
+            yield ': keep-alive\n\n'
+        time.sleep(STATUS_POLL_INTERVAL)
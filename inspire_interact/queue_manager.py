@@ -1,12 +1,110 @@
 """ Scripts for managing inSPIRE jobs running on after another.
 """
 from argparse import ArgumentParser
+from contextlib import contextmanager
 import os
-from time import sleep
+import socket
+import sqlite3
+import threading
+import time
 
 import pandas as pd
 
-from inspire_interact.constants import QUEUE_PATH
+from inspire_interact.constants import (
+    FIFO_POLICY,
+    QUEUE_COLUMNS,
+    QUEUE_DB_PATH,
+    QUEUE_PATH,
+)
+from inspire_interact.queue_policies import order_jobs
+from inspire_interact.utils import write_task_df
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    taskID INTEGER NOT NULL UNIQUE,
+    user TEXT NOT NULL,
+    project TEXT NOT NULL,
+    status TEXT NOT NULL,
+    state TEXT NOT NULL,
+    cpus INTEGER NOT NULL,
+    memory INTEGER NOT NULL,
+    submitted REAL NOT NULL,
+    started REAL,
+    handoffDelay REAL,
+    pid INTEGER,
+    taskList TEXT NOT NULL DEFAULT '',
+    priority INTEGER NOT NULL DEFAULT 0,
+    inputSize INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queue_user ON queue(user, project);
+CREATE INDEX IF NOT EXISTS queue_state ON queue(state, seq);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    taskID INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    project TEXT NOT NULL,
+    status TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    cpus INTEGER NOT NULL,
+    memory INTEGER NOT NULL,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL NOT NULL,
+    handoffDelay REAL
+);
+CREATE INDEX IF NOT EXISTS history_task ON history(taskID);
+CREATE INDEX IF NOT EXISTS history_user ON history(user, project);
+CREATE TABLE IF NOT EXISTS reservations (
+    taskID INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    state TEXT NOT NULL,
+    cpus INTEGER NOT NULL DEFAULT 0,
+    memory INTEGER NOT NULL DEFAULT 0,
+    requested REAL NOT NULL,
+    wakePort INTEGER,
+    PRIMARY KEY (taskID, task)
+);
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    lastUsed REAL NOT NULL,
+    PRIMARY KEY (cache, key)
+);
+CREATE INDEX IF NOT EXISTS cache_lru ON cache_entries(cache, lastUsed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    cache TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    uploadID TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    project TEXT NOT NULL,
+    fileType TEXT NOT NULL,
+    fileName TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+"""
+
+# Columns added after the first release of the queue database.
+QUEUE_UPGRADES = [
+    ('queue', 'handoffDelay', 'REAL'),
+    ('queue', 'pid', 'INTEGER'),
+    ('queue', 'taskList', "TEXT NOT NULL DEFAULT ''"),
+    ('queue', 'priority', 'INTEGER NOT NULL DEFAULT 0'),
+    ('queue', 'inputSize', 'INTEGER NOT NULL DEFAULT 0'),
+    ('history', 'handoffDelay', 'REAL'),
+]
+
+_CONNECTIONS = threading.local()
 
 def get_arguments():
     """ Function to collect command line arguments.
@@ -44,79 +142,467 @@ def get_arguments():
     return parser.parse_args()
 
 
-def add_to_queue(project_home, interact_home):
-    """ Function to add an inSPIRE job to the inSPIRE-Interactive queue.
-    """
-    with open(f'{project_home}/inspire_pids.txt', 'r', encoding='UTF-8') as pid_file:
-        task_id = int(pid_file.readline().strip())
-    if os.path.exists(QUEUE_PATH.format(home_key=interact_home)):
-        queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-    else:
-        queue_df = pd.DataFrame({
-            'user': [],
-            'project': [],
-            'taskID': [],
-            'status': [],
-        })
-
-    user = project_home.split('/')[-2]
-    project = project_home.split('/')[-1]
-    append_df = pd.DataFrame({
-        'user': [user],
-        'project': [project],
-        'taskID': [task_id],
-        'status': 'waiting',
-    })
-    queue_df = pd.concat([queue_df, append_df])
-    queue_df.to_csv(QUEUE_PATH.format(home_key=interact_home), index=False)
-
-def remove_from_queue(interact_home, job_id):
-    """ Function to remove an inSPIRE job from the inSPIRE interactive queue.
-    """
-    queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-    if queue_df[queue_df['taskID'] == job_id].shape[0]:
-        drop_index = queue_df[queue_df['taskID'] == job_id].index[0]
-        queue_df = queue_df.drop(drop_index, axis=0)
-        queue_df.to_csv(QUEUE_PATH.format(home_key=interact_home), index=False)
-
-def update_status(project_home, interact_home, inspire_task, inspire_status):
-    """ Function to update the status of a task in the taskStatus file.
+
+def connect_queue(interact_home):
+    """ Function to fetch this thread's connection to the queue database,
+        creating the schema and migrating any CSV queue on first use.
+    """
+    db_path = QUEUE_DB_PATH.format(home_key=interact_home)
+    cache_key = (os.getpid(), db_path)
+    connection = getattr(_CONNECTIONS, 'cache', {}).get(cache_key)
+    if connection is not None:
+        return connection
+
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(QUEUE_SCHEMA)
+    for table, column, column_type in QUEUE_UPGRADES:
+        columns = [row['name'] for row in connection.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+    if not hasattr(_CONNECTIONS, 'cache'):
+        _CONNECTIONS.cache = {}
+    _CONNECTIONS.cache[cache_key] = connection
+    migrate_csv_queue(interact_home)
+    return connection
+
+
+def close_queue_connections():
+    """ Function to close this thread's connections to the queue database, e.g.
+        before forking processes which should open their own.
+    """
+    for connection in getattr(_CONNECTIONS, 'cache', {}).values():
+        connection.close()
+    _CONNECTIONS.cache = {}
+
+
+@contextmanager
+def queue_transaction(interact_home):
+    """ Context manager holding the queue's write lock so that a read and the
+        writes depending on it are applied atomically.
+    """
+    connection = connect_queue(interact_home)
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def migrate_csv_queue(interact_home):
+    """ Function to move jobs from the CSV queue used by older versions into
+        the queue database. The CSV is renamed so this only happens once.
+    """
+    csv_path = QUEUE_PATH.format(home_key=interact_home)
+    if not os.path.exists(csv_path):
+        return
+
+    with queue_transaction(interact_home) as connection:
+        # Another process may have migrated the queue while we waited for the lock.
+        if not os.path.exists(csv_path):
+            return
+        queue_df = pd.read_csv(csv_path)
+        if 'state' not in queue_df.columns:
+            # Older queues only ever ran the first job.
+            queue_df['state'] = [
+                'running' if idx == 0 else 'waiting' for idx in range(len(queue_df))
+            ]
+        for column in ('cpus', 'memory'):
+            if column not in queue_df.columns:
+                queue_df[column] = 0
+
+        now = time.time()
+        connection.executemany(
+            """INSERT OR IGNORE INTO queue
+                (taskID, user, project, status, state, cpus, memory, submitted)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    int(df_row['taskID']), df_row['user'], df_row['project'],
+                    str(df_row['status']), df_row['state'], int(df_row['cpus']),
+                    int(df_row['memory']), now,
+                ) for _, df_row in queue_df.iterrows()
+            ],
+        )
+        os.replace(csv_path, f'{csv_path}.migrated')
+
+
+def read_queue(interact_home, queue_policy=FIFO_POLICY):
+    """ Function to read the inSPIRE-Interactive queue, with running jobs first
+        and waiting jobs in the order the scheduling policy will start them.
+    """
+    jobs = connect_queue(interact_home).execute('SELECT * FROM queue').fetchall()
+    return pd.DataFrame(
+        [
+            {column: job[column] for column in QUEUE_COLUMNS}
+            for job in order_jobs(jobs, queue_policy)
+        ],
+        columns=QUEUE_COLUMNS,
+    )
+
+
+def get_queue_position(interact_home, user, project, queue_policy=FIFO_POLICY):
+    """ Function to find how many waiting jobs will start before a project's job.
+
+    Returns
+    -------
+    queue_position : int or None
+        The position of the job among the waiting jobs, starting from 1, or
+        None if the project has no waiting job.
+    queue_length : int
+        The number of jobs in the queue, including running jobs.
+    """
+    jobs = connect_queue(interact_home).execute('SELECT * FROM queue').fetchall()
+    waiting_jobs = [job for job in order_jobs(jobs, queue_policy) if job['state'] != 'running']
+    for job_idx, job in enumerate(waiting_jobs):
+        if job['user'] == user and job['project'] == project:
+            return job_idx + 1, len(jobs)
+    return None, len(jobs)
+
+
+def get_queue_job(interact_home, job_id):
+    """ Function to fetch the queue entry of a job, or None if it is not queued.
+    """
+    return connect_queue(interact_home).execute(
+        'SELECT * FROM queue WHERE taskID = ?', (int(job_id),)
+    ).fetchone()
+
+
+def get_project_job(interact_home, user, project):
+    """ Function to fetch the queue entry of a project's job, or None if the
+        project has no waiting or running job.
+    """
+    return connect_queue(interact_home).execute(
+        'SELECT * FROM queue WHERE user = ? AND project = ?', (user, project)
+    ).fetchone()
+
+
+def submit_job(interact_home, user, project, task_list, priority=0, input_size=0):
+    """ Function to add an inSPIRE job to the inSPIRE-Interactive queue along
+        with the priority class and MS input size (bytes) used for scheduling.
+
+    Returns
+    -------
+    job_id : int
+        The ID of the new job.
+    """
+    with queue_transaction(interact_home) as connection:
+        # Job IDs are never reused, including those of finished jobs.
+        job_id = 1 + max(
+            connection.execute('SELECT COALESCE(MAX(taskID), 0) FROM queue').fetchone()[0],
+            connection.execute('SELECT COALESCE(MAX(taskID), 0) FROM history').fetchone()[0],
+        )
+        connection.execute(
+            """INSERT INTO queue
+                (
+                    taskID, user, project, status, state, cpus, memory, submitted,
+                    taskList, priority, inputSize
+                )
+                VALUES (?, ?, ?, 'waiting', 'waiting', 0, 0, ?, ?, ?, ?)""",
+            (
+                job_id, user, project, time.time(), ','.join(task_list),
+                int(priority), int(input_size),
+            ),
+        )
+    notify_worker(interact_home)
+    return job_id
+
+
+def remove_from_queue(interact_home, job_id, outcome='finished'):
+    """ Function to remove an inSPIRE job from the inSPIRE interactive queue,
+        recording it in the job history and waking the worker.
+    """
+    with queue_transaction(interact_home) as connection:
+        job = connection.execute(
+            'SELECT * FROM queue WHERE taskID = ?', (int(job_id),)
+        ).fetchone()
+        if job is None:
+            return
+        finished = time.time()
+        connection.execute(
+            """INSERT INTO history
+                (
+                    taskID, user, project, status, outcome, cpus, memory,
+                    submitted, started, finished, handoffDelay
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                job['taskID'], job['user'], job['project'], job['status'], outcome,
+                job['cpus'], job['memory'], job['submitted'], job['started'], finished,
+                job['handoffDelay'],
+            ),
+        )
+        connection.execute('DELETE FROM queue WHERE taskID = ?', (int(job_id),))
+        connection.execute('DELETE FROM reservations WHERE taskID = ?', (int(job_id),))
+        if job['state'] == 'running':
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('lastRelease', ?)",
+                (finished,),
+            )
+    notify_worker(interact_home)
+
+def update_status(project_home, interact_home, job_id, task_statuses):
+    """ Function to update the status of tasks in the taskStatus file and show
+        the running tasks in the queue.
+
+    Parameters
+    ----------
+    task_statuses : dict
+        Map of task ID to its new status.
     """
     task_df = pd.read_csv(f'{project_home}/taskStatus.csv')
-    queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-    if inspire_task == 'start':
-        task_df['status'].iloc[0] = 'Running'
-        queue_df.iloc[
-            0, queue_df.columns.get_loc('status')
-        ] = task_df.iloc[
-            0, task_df.columns.get_loc('taskName')
+    task_df['status'] = task_df['taskId'].map(task_statuses).fillna(task_df['status'])
+
+    write_task_df(project_home, task_df)
+
+    running_tasks = task_df[task_df['status'] == 'Running']['taskName'].tolist()
+    if running_tasks:
+        with queue_transaction(interact_home) as connection:
+            connection.execute(
+                'UPDATE queue SET status = ? WHERE taskID = ?',
+                (', '.join(running_tasks), int(job_id)),
+            )
+
+
+def request_resources(interact_home, job_id, task, wake_port):
+    """ Function to ask the worker for the resources a task needs. The job is
+        woken on its local port once they are granted. Nothing is requested
+        if the job has been removed from the queue, e.g. cancelled.
+    """
+    with queue_transaction(interact_home) as connection:
+        connection.execute(
+            """INSERT INTO reservations (taskID, task, state, requested, wakePort)
+                SELECT ?, ?, 'requested', ?, ?
+                WHERE EXISTS (SELECT 1 FROM queue WHERE taskID = ?)
+                ON CONFLICT (taskID, task) DO UPDATE SET wakePort = excluded.wakePort""",
+            (int(job_id), task, time.time(), wake_port, int(job_id)),
+        )
+    notify_worker(interact_home)
+
+
+def get_granted_tasks(interact_home, job_id):
+    """ Function to fetch the tasks of a job whose resources have been granted.
+    """
+    return [
+        row['task'] for row in connect_queue(interact_home).execute(
+            "SELECT task FROM reservations WHERE taskID = ? AND state = 'granted'",
+            (int(job_id),),
+        )
+    ]
+
+
+def release_resources(interact_home, job_id, task):
+    """ Function to return the resources held by a finished task.
+    """
+    with queue_transaction(interact_home) as connection:
+        connection.execute(
+            'DELETE FROM reservations WHERE taskID = ? AND task = ?', (int(job_id), task)
+        )
+        update_held_resources(connection, job_id)
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('lastRelease', ?)",
+            (time.time(),),
+        )
+    notify_worker(interact_home)
+
+
+def update_held_resources(connection, job_id):
+    """ Function to show the resources currently held by a job in the queue.
+    """
+    connection.execute(
+        """UPDATE queue SET
+            cpus = (
+                SELECT TOTAL(cpus) FROM reservations
+                WHERE taskID = queue.taskID AND state = 'granted'
+            ),
+            memory = (
+                SELECT TOTAL(memory) FROM reservations
+                WHERE taskID = queue.taskID AND state = 'granted'
+            )
+            WHERE taskID = ?""",
+        (int(job_id),),
+    )
+
+
+def grant_resources(
+        interact_home, task_resources, max_cpus, max_memory,
+        queue_policy=FIFO_POLICY, max_user_jobs=None,
+    ):
+    """ Function to grant waiting resource requests which fit within the CPU
+        and memory budget. Requests of running jobs are considered first and
+        waiting jobs then start in the order given by the scheduling policy.
+        Once a request does not fit, later requests may only use the resources
+        it is not waiting for, so large tasks are never starved.
+
+    Parameters
+    ----------
+    task_resources : dict
+        Map of task ID to the CPUs and memory (GB) it reserves.
+    queue_policy : str
+        The scheduling policy ordering waiting jobs.
+    max_user_jobs : int or None
+        The maximum number of running jobs per user.
+
+    Returns
+    -------
+    wake_ports : list of int
+        Ports of the jobs whose requests were granted.
+    started_jobs : list of sqlite3.Row
+        The queue entries of the jobs which are now running.
+    """
+    wake_ports = []
+    started_job_ids = []
+    with queue_transaction(interact_home) as connection:
+        # Reservations of jobs no longer in the queue, e.g. requested while the
+        # job was being cancelled, will never be released.
+        connection.execute(
+            'DELETE FROM reservations WHERE taskID NOT IN (SELECT taskID FROM queue)'
+        )
+        n_granted, used_cpus, used_memory = connection.execute(
+            """SELECT COUNT(*), TOTAL(cpus), TOTAL(memory) FROM reservations
+                WHERE state = 'granted'"""
+        ).fetchone()
+        free_cpus = max_cpus - used_cpus
+        free_memory = max_memory - used_memory
+
+        jobs = order_jobs(connection.execute('SELECT * FROM queue').fetchall(), queue_policy)
+        job_ranks = {job['taskID']: job_rank for job_rank, job in enumerate(jobs)}
+        job_users = {job['taskID']: job['user'] for job in jobs}
+        user_jobs = {}
+        for job in jobs:
+            if job['state'] == 'running':
+                user_jobs[job['user']] = user_jobs.get(job['user'], 0) + 1
+
+        candidates = [
+            (
+                job_ranks[row['taskID']], row['requested'],
+                row['taskID'], row['task'], row['wakePort'],
+            )
+            for row in connection.execute(
+                "SELECT * FROM reservations WHERE state = 'requested'"
+            )
+            if row['taskID'] in job_ranks
+        ] + [
+            (
+                job_ranks[job['taskID']], job['submitted'],
+                job['taskID'], job['taskList'].split(',')[0], None,
+            )
+            for job in jobs if job['state'] == 'waiting'
         ]
-    else:
-        index = task_df.index[task_df['taskId'] == inspire_task].tolist()[0]
-        if inspire_status == '0':
-            task_df['status'].iloc[index] = 'Completed'
-            if index + 1 < len(task_df):
-                task_df['status'].iloc[index + 1] = 'Running'
-                queue_df.iloc[0, queue_df.columns.get_loc('status')] = task_df.iloc[
-                    index + 1, task_df.columns.get_loc('taskName')
-                ]
-        else:
-            task_df['status'].iloc[index] = 'Failed'
-            for following_idx in range(index+1, len(task_df)):
-                task_df['status'].iloc[following_idx] = 'Skipped'
-
-    task_df.to_csv(f'{project_home}/taskStatus.csv', index=False)
-    queue_df.to_csv(QUEUE_PATH.format(home_key=interact_home), index=False)
-
-
-def check_queue(project_home, interact_home):
-    """ Function to check if the job is first in the queue.
-    """
-    with open(f'{project_home}/inspire_pids.txt', 'r', encoding='UTF-8') as pid_file:
-        task_id = int(pid_file.readline().strip())
-
-    while True:
-        queue_df = pd.read_csv(QUEUE_PATH.format(home_key=interact_home))
-        if int(queue_df['taskID'].iloc[0]) == task_id:
-            break
-        sleep(60)
+
+        now = time.time()
+        for _, _, job_id, task, wake_port in sorted(candidates):
+            if wake_port is None and max_user_jobs is not None and (
+                user_jobs.get(job_users[job_id], 0) >= max_user_jobs
+            ):
+                continue
+            cpus, memory = task_resources[task]
+            # A task larger than the whole budget should still run on an idle server.
+            if not (cpus <= free_cpus and memory <= free_memory) and n_granted:
+                # Keep the resources this request is waiting for.
+                free_cpus -= cpus
+                free_memory -= memory
+                continue
+
+            free_cpus -= cpus
+            free_memory -= memory
+            n_granted += 1
+            connection.execute(
+                """INSERT INTO reservations (taskID, task, state, cpus, memory, requested, wakePort)
+                    VALUES (?, ?, 'granted', ?, ?, ?, ?)
+                    ON CONFLICT (taskID, task) DO UPDATE SET
+                        state = 'granted', cpus = excluded.cpus, memory = excluded.memory""",
+                (job_id, task, cpus, memory, now, wake_port),
+            )
+            if wake_port is None:
+                start_job(connection, job_id, now)
+                started_job_ids.append(job_id)
+                user_jobs[job_users[job_id]] = user_jobs.get(job_users[job_id], 0) + 1
+            else:
+                wake_ports.append(wake_port)
+            update_held_resources(connection, job_id)
+
+    return wake_ports, [get_queue_job(interact_home, job_id) for job_id in started_job_ids]
+
+
+def start_job(connection, job_id, started):
+    """ Function to mark a waiting job as running, recording how long after
+        resources were last freed it started.
+    """
+    submitted = connection.execute(
+        'SELECT submitted FROM queue WHERE taskID = ?', (job_id,)
+    ).fetchone()['submitted']
+    last_release = connection.execute(
+        "SELECT value FROM meta WHERE key = 'lastRelease'"
+    ).fetchone()
+    handoff_delay = None
+    if last_release is not None and last_release['value'] > submitted:
+        # The job was waiting when the resources it now holds were freed.
+        handoff_delay = started - last_release['value']
+    connection.execute(
+        """UPDATE queue SET state = 'running', started = ?, handoffDelay = ?
+            WHERE taskID = ?""",
+        (started, handoff_delay, job_id),
+    )
+
+
+def set_job_pid(interact_home, job_id, pid):
+    """ Function to record the process ID running a job.
+
+    Returns
+    -------
+    queued : bool
+        False if the job was cancelled before its process ID was recorded.
+    """
+    with queue_transaction(interact_home) as connection:
+        cursor = connection.execute(
+            'UPDATE queue SET pid = ? WHERE taskID = ?', (pid, int(job_id))
+        )
+    return cursor.rowcount > 0
+
+
+def register_worker(interact_home, pid, wake_port):
+    """ Function to record the process ID of the worker and the local port on
+        which it listens for wake ups.
+    """
+    with queue_transaction(interact_home) as connection:
+        connection.executemany(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            [('workerPid', pid), ('workerPort', wake_port)],
+        )
+
+
+def get_worker_pid(interact_home):
+    """ Function to fetch the process ID of the registered worker, if any.
+    """
+    worker_pid = connect_queue(interact_home).execute(
+        "SELECT value FROM meta WHERE key = 'workerPid'"
+    ).fetchone()
+    if worker_pid is None:
+        return None
+    return int(worker_pid['value'])
+
+
+def notify_worker(interact_home):
+    """ Function to wake the worker so that it rechecks the queue.
+    """
+    wake_port = connect_queue(interact_home).execute(
+        "SELECT value FROM meta WHERE key = 'workerPort'"
+    ).fetchone()
+    if wake_port is not None:
+        send_wake_up([int(wake_port['value'])])
+
+
+def send_wake_up(wake_ports):
+    """ Function to send a wake up to processes listening on local ports.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as wake_socket:
+        for wake_port in wake_ports:
+            try:
+                wake_socket.sendto(b'wake', ('127.0.0.1', wake_port))
+            except OSError:
+                continue
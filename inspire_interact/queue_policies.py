@@ -0,0 +1,75 @@
+""" Scheduling policies deciding the order in which queued inSPIRE jobs start.
+"""
+from inspire_interact.constants import (
+    FAIR_SHARE_POLICY,
+    FIFO_POLICY,
+    PRIORITY_POLICY,
+    SHORTEST_JOB_POLICY,
+)
+
+
+def fifo_key(job, user_share):
+    """ Function to order jobs by order of arrival.
+    """
+    return (job['seq'],)
+
+
+def priority_key(job, user_share):
+    """ Function to order jobs by priority class, highest first, and then by
+        order of arrival.
+    """
+    return (-job['priority'], job['seq'])
+
+
+def fair_share_key(job, user_share):
+    """ Function to order jobs so that users take turns, i.e. a user's next job
+        comes after the jobs of users with fewer running or earlier queued jobs.
+    """
+    return (user_share, job['seq'])
+
+
+def shortest_job_key(job, user_share):
+    """ Function to order jobs by the size of their MS input, smallest first.
+    """
+    return (job['inputSize'], job['seq'])
+
+
+QUEUE_POLICIES = {
+    FIFO_POLICY: fifo_key,
+    PRIORITY_POLICY: priority_key,
+    FAIR_SHARE_POLICY: fair_share_key,
+    SHORTEST_JOB_POLICY: shortest_job_key,
+}
+
+
+def order_jobs(jobs, queue_policy):
+    """ Function to order the jobs of the queue, running jobs first in order of
+        arrival and then waiting jobs in the order the policy will start them.
+
+    Parameters
+    ----------
+    jobs : list
+        The queue entries, each with the seq, user, state, priority and
+        inputSize columns of the queue.
+    queue_policy : str
+        The name of the scheduling policy.
+
+    Returns
+    -------
+    ordered_jobs : list
+        The queue entries in order.
+    """
+    jobs = sorted(jobs, key=lambda job: job['seq'])
+    running_jobs = [job for job in jobs if job['state'] == 'running']
+    waiting_jobs = [job for job in jobs if job['state'] != 'running']
+
+    user_shares = {}
+    for job in running_jobs:
+        user_shares[job['user']] = user_shares.get(job['user'], 0) + 1
+    waiting_keys = {}
+    for job in waiting_jobs:
+        user_share = user_shares.get(job['user'], 0)
+        user_shares[job['user']] = user_share + 1
+        waiting_keys[job['seq']] = QUEUE_POLICIES[queue_policy](job, user_share)
+
+    return running_jobs + sorted(waiting_jobs, key=lambda job: waiting_keys[job['seq']])
@@ -0,0 +1,151 @@
+""" Functions for the summary of a project's results shown on the results page.
+    The summary is written when the job finishes and stores the modification
+    times of the files it was counted from, so that it is only counted again
+    once those files change. Projects without a summary are counted the first
+    time their results are viewed.
+"""
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from inspire_interact.constants import RESULTS_SUMMARY_PATH
+
+EPITOPE_CANDIDATE_ROUTE = 'inspireOutput/epitope/potentialEpitopeCandidates.csv'
+NS_PERC_PSMS_PATH = 'inspireOutput/non_spectral.percolator.psms.txt'
+NS_PERC_SEP_PSMS_PATH = 'inspireOutput/non_spectral.percolatorSeparate.psms.txt'
+PERC_PSMS_PATH = 'inspireOutput/final.percolator.psms.txt'
+PERC_SEP_PSMS_PATH = 'inspireOutput/final.percolatorSeparate.psms.txt'
+QUANT_FILE_PATH = 'inspireOutput/quant/quantified_per_file.csv'
+SUMMARY_SOURCES = (
+    PERC_PSMS_PATH,
+    PERC_SEP_PSMS_PATH,
+    NS_PERC_PSMS_PATH,
+    NS_PERC_SEP_PSMS_PATH,
+    EPITOPE_CANDIDATE_ROUTE,
+    QUANT_FILE_PATH,
+)
+SUMMARY_CHUNK_SIZE = 100_000
+
+
+def get_source_stamp(project_home):
+    """ Function to get the modification times and sizes of the files the
+        summary is counted from.
+    """
+    source_stamp = {}
+    for source_path in SUMMARY_SOURCES:
+        if os.path.exists(f'{project_home}/{source_path}'):
+            source_stat = os.stat(f'{project_home}/{source_path}')
+            source_stamp[source_path] = [source_stat.st_mtime_ns, source_stat.st_size]
+        else:
+            source_stamp[source_path] = None
+    return source_stamp
+
+
+def read_column(file_path, column, sep=','):
+    """ Function to read a single column of a table in chunks, so that large
+        tables are never held in memory.
+    """
+    try:
+        yield from (
+            chunk_df.iloc[:, 0] for chunk_df in pd.read_csv(
+                file_path, sep=sep, usecols=[column], chunksize=SUMMARY_CHUNK_SIZE,
+            )
+        )
+    except pd.errors.EmptyDataError:
+        return
+
+
+def count_psms(project_home, psms_paths):
+    """ Function to count the PSMs at 1% FDR in the first of the Percolator
+        outputs which exists.
+    """
+    for psms_path in psms_paths:
+        if os.path.exists(f'{project_home}/{psms_path}'):
+            return sum(
+                int((q_values < 0.01).sum()) for q_values in read_column(
+                    f'{project_home}/{psms_path}', 'q-value', sep='\t'
+                )
+            )
+    return 0
+
+
+def count_epitope_candidates(project_home):
+    """ Function to count the epitope candidates found and not found by the
+        search engine, or None if there are no epitope candidates.
+    """
+    if not os.path.exists(f'{project_home}/{EPITOPE_CANDIDATE_ROUTE}'):
+        return None, None
+    shared_count = 0
+    inspire_count = 0
+    for found_by_search in read_column(
+        f'{project_home}/{EPITOPE_CANDIDATE_ROUTE}', 'foundBySearchEngine'
+    ):
+        shared_count += int((found_by_search == 'Yes').sum())
+        inspire_count += int((found_by_search == 'No').sum())
+    return shared_count, inspire_count
+
+
+def count_quantified_peptides(project_home):
+    """ Function to count the peptides quantified via Skyline.
+    """
+    if not os.path.exists(f'{project_home}/{QUANT_FILE_PATH}'):
+        return 0
+    return sum(
+        len(first_column) for first_column in read_column(
+            f'{project_home}/{QUANT_FILE_PATH}', 0
+        )
+    )
+
+
+def write_results_summary(project_home):
+    """ Function to count the results of a project and write the summary.
+
+    Returns
+    -------
+    results_summary : dict
+        Counts of PSMs at 1% FDR, pathogen epitope candidates and quantified
+        peptides, with the files they were counted from.
+    """
+    source_stamp = get_source_stamp(project_home)
+    pathogen_shared, pathogen_inspire = count_epitope_candidates(project_home)
+    results_summary = {
+        'sources': source_stamp,
+        'inspirePsms': count_psms(project_home, (PERC_PSMS_PATH, PERC_SEP_PSMS_PATH)),
+        'nonSpectralPsms': count_psms(
+            project_home, (NS_PERC_PSMS_PATH, NS_PERC_SEP_PSMS_PATH)
+        ),
+        'pathogenShared': pathogen_shared,
+        'pathogenInspire': pathogen_inspire,
+        'quantifiedPeptides': count_quantified_peptides(project_home),
+    }
+
+    summary_path = RESULTS_SUMMARY_PATH.format(project_home=project_home)
+    try:
+        summary_file, temporary_path = tempfile.mkstemp(
+            suffix='.tmp', dir=os.path.dirname(summary_path)
+        )
+        with os.fdopen(summary_file, 'w', encoding='UTF-8') as summary_out:
+            json.dump(results_summary, summary_out)
+        os.replace(temporary_path, summary_path)
+    except OSError:
+        # The summary is still returned if the project cannot be written to.
+        pass
+    return results_summary
+
+
+def get_results_summary(project_home):
+    """ Function to read the summary of a project's results, counting them
+        again if there is no summary or the results have changed since.
+    """
+    summary_path = RESULTS_SUMMARY_PATH.format(project_home=project_home)
+    if os.path.exists(summary_path):
+        try:
+            with open(summary_path, 'r', encoding='UTF-8') as summary_file:
+                results_summary = json.load(summary_file)
+            if results_summary.get('sources') == get_source_stamp(project_home):
+                return results_summary
+        except ValueError:
+            pass
+    return write_results_summary(project_home)
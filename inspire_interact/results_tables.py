@@ -0,0 +1,226 @@
+""" Functions for querying the PSM and peptide assignments of a project. The
+    assignment tables are converted to Parquet sorted by q-value, so that a
+    query only reads the columns it returns and skips the row groups which
+    its filters exclude. Tables are converted when the job finishes, or when
+    first queried if they are missing or older than the assignments.
+"""
+import json
+import math
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from inspire_interact.constants import KEY_FILES, RESULTS_TABLE_PATH
+
+RESULTS_TABLES = ('psms', 'peptides')
+RESULTS_ROW_GROUP_SIZE = 64*1024
+MAX_PAGE_SIZE = 500
+# Names of the columns filtered on in the assignments of different inSPIRE versions.
+FILTER_COLUMNS = {
+    'peptide': ('peptide', 'Peptide'),
+    'protein': ('proteins', 'protein', 'Proteins'),
+    'qValue': ('qValue', 'q-value'),
+    'source': ('source', 'Source'),
+}
+SOURCE_STAMP_KEY = b'inspireInteractSource'
+
+
+def get_source_stamp(csv_path):
+    """ Function to get the modification time and size of an assignments table.
+    """
+    csv_stat = os.stat(csv_path)
+    return json.dumps([csv_stat.st_mtime_ns, csv_stat.st_size]).encode()
+
+
+def find_column(column_names, filter_name):
+    """ Function to find the column used for a filter, or None if the table
+        does not have one.
+    """
+    for column_name in FILTER_COLUMNS[filter_name]:
+        if column_name in column_names:
+            return column_name
+    return None
+
+
+def convert_results_table(project_home, table_name):
+    """ Function to convert an assignments table to Parquet, sorted by q-value.
+    """
+    csv_path = f'{project_home}/{KEY_FILES[table_name]}'
+    parquet_path = RESULTS_TABLE_PATH.format(project_home=project_home, table=table_name)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+
+    source_stamp = get_source_stamp(csv_path)
+    results_table = pa_csv.read_csv(csv_path)
+    if (q_value_column := find_column(results_table.column_names, 'qValue')) is not None:
+        results_table = results_table.sort_by(q_value_column)
+    results_table = results_table.replace_schema_metadata({SOURCE_STAMP_KEY: source_stamp})
+
+    parquet_file, temporary_path = tempfile.mkstemp(
+        suffix='.tmp', dir=os.path.dirname(parquet_path)
+    )
+    os.close(parquet_file)
+    try:
+        pq.write_table(
+            results_table,
+            temporary_path,
+            row_group_size=RESULTS_ROW_GROUP_SIZE,
+            compression='zstd',
+        )
+        os.replace(temporary_path, parquet_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def convert_results_tables(project_home):
+    """ Function to convert all assignment tables of a project to Parquet.
+    """
+    for table_name in RESULTS_TABLES:
+        if os.path.exists(f'{project_home}/{KEY_FILES[table_name]}'):
+            convert_results_table(project_home, table_name)
+
+
+def open_results_table(project_home, table_name):
+    """ Function to open an assignments table as a Parquet dataset, converting
+        it first if it has not been converted since the assignments changed.
+    """
+    if table_name not in RESULTS_TABLES:
+        raise KeyError(f'Unknown results table {table_name}.')
+    csv_path = f'{project_home}/{KEY_FILES[table_name]}'
+    parquet_path = RESULTS_TABLE_PATH.format(project_home=project_home, table=table_name)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f'No {table_name} found for this project.')
+    if not os.path.exists(parquet_path) or (
+        pq.read_schema(parquet_path).metadata or {}
+    ).get(SOURCE_STAMP_KEY) != get_source_stamp(csv_path):
+        convert_results_table(project_home, table_name)
+    return ds.dataset(parquet_path, format='parquet')
+
+
+def get_query_filter(column_names, query):
+    """ Function to create the filter expression of a query, which is pushed
+        down to the Parquet reader.
+    """
+    expressions = []
+    for filter_name in ('peptide', 'protein', 'source'):
+        if not query.get(filter_name):
+            continue
+        if (column_name := find_column(column_names, filter_name)) is None:
+            raise ValueError(f'This table cannot be filtered by {filter_name}.')
+        if filter_name == 'source':
+            expressions.append(ds.field(column_name) == query[filter_name])
+        else:
+            expressions.append(pc.match_substring(
+                ds.field(column_name).cast(pa.string()), query[filter_name], ignore_case=True,
+            ))
+    if query.get('maxQValue') not in (None, ''):
+        if (column_name := find_column(column_names, 'qValue')) is None:
+            raise ValueError('This table cannot be filtered by q-value.')
+        expressions.append(ds.field(column_name) <= float(query['maxQValue']))
+
+    if not expressions:
+        return None
+    query_filter = expressions[0]
+    for expression in expressions[1:]:
+        query_filter = query_filter & expression
+    return query_filter
+
+
+def read_page(dataset, columns, query_filter, sort_column, descending, page, page_size):
+    """ Function to read a single page of a query's results.
+    """
+    first_row = (page - 1)*page_size
+    if sort_column is None:
+        # The table is stored sorted by q-value so reading can stop at the page.
+        page_batches = []
+        skipped_rows = 0
+        for record_batch in dataset.to_batches(columns=columns, filter=query_filter):
+            if skipped_rows + record_batch.num_rows <= first_row:
+                skipped_rows += record_batch.num_rows
+                continue
+            page_batches.append(record_batch.slice(max(first_row - skipped_rows, 0)))
+            skipped_rows = first_row
+            if sum(batch.num_rows for batch in page_batches) >= page_size:
+                break
+        return pa.Table.from_batches(
+            page_batches,
+            schema=pa.schema([dataset.schema.field(column_name) for column_name in columns]),
+        ).slice(0, page_size)
+
+    # Only the rows up to the end of the page need to be sorted, so the table
+    # is streamed keeping only the top rows seen so far.
+    sort_keys = [(sort_column, 'descending' if descending else 'ascending')]
+    read_columns = columns if sort_column in columns else columns + [sort_column]
+    top_count = first_row + page_size
+    top_table = pa.Table.from_batches(
+        [], schema=pa.schema([dataset.schema.field(column_name) for column_name in read_columns]),
+    )
+    for record_batch in dataset.to_batches(columns=read_columns, filter=query_filter):
+        top_table = pa.concat_tables([top_table, pa.Table.from_batches([record_batch])])
+        if top_table.num_rows > top_count:
+            top_table = top_table.take(
+                pc.select_k_unstable(top_table, k=top_count, sort_keys=sort_keys)
+            )
+    if top_table.num_rows:
+        top_table = top_table.take(pc.sort_indices(top_table, sort_keys=sort_keys))
+    return top_table.slice(first_row, page_size).select(columns)
+
+
+def query_results_table(project_home, table_name, query):
+    """ Function to filter, sort and page the assignments of a project.
+
+    Parameters
+    ----------
+    query : dict
+        The filters (peptide, protein, source and maxQValue), the column to
+        sort by and order, the page and page size, and the columns to return.
+
+    Returns
+    -------
+    results_page : dict
+        The columns and rows of the page, with the number of matching rows.
+    """
+    dataset = open_results_table(project_home, table_name)
+    all_columns = dataset.schema.names
+    columns = [
+        column_name for column_name in query.get('columns', '').split(',') if column_name
+    ] or all_columns
+    if (unknown_columns := set(columns) - set(all_columns)):
+        raise ValueError(f'Unknown columns {", ".join(sorted(unknown_columns))}.')
+    sort_column = query.get('sort') or None
+    if sort_column is not None and sort_column not in all_columns:
+        raise ValueError(f'Unknown column {sort_column}.')
+    if sort_column == find_column(all_columns, 'qValue') and query.get('order') != 'desc':
+        sort_column = None
+    page = max(int(query.get('page', 1)), 1)
+    page_size = min(max(int(query.get('pageSize', 50)), 1), MAX_PAGE_SIZE)
+
+    query_filter = get_query_filter(all_columns, query)
+    page_table = read_page(
+        dataset,
+        columns,
+        query_filter,
+        sort_column,
+        query.get('order') == 'desc',
+        page,
+        page_size,
+    )
+    return {
+        'allColumns': all_columns,
+        'columns': columns,
+        'rows': [
+            [
+                None if isinstance(value, float) and not math.isfinite(value) else value
+                for value in row.values()
+            ]
+            for row in page_table.to_pylist()
+        ],
+        'totalRows': dataset.count_rows(filter=query_filter),
+        'page': page,
+        'pageSize': page_size,
+    }
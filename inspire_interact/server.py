@@ -0,0 +1,48 @@
+""" Functions for serving inSPIRE-Interactive from several worker processes, each
+    handling requests on several threads, so that a slow request does not hold
+    up other users. All state shared between requests is kept in the queue
+    database or the project folders rather than in memory.
+"""
+import os
+
+from inspire_interact.queue_manager import close_queue_connections
+
+SERVER_PORT = 5000
+# Worker processes which do not respond for this long are restarted.
+SERVER_TIMEOUT = 120
+
+
+def run_production_server(app, server_workers, server_threads):
+    """ Function to serve the app with gunicorn. Where gunicorn is unavailable,
+        e.g. on Windows, the threaded development server is used instead.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print('gunicorn is not available, using a single process to serve inSPIRE-Interactive.')
+        app.run(host='0.0.0.0', port=SERVER_PORT, debug=False, threaded=True)
+        return
+
+    class InteractServer(BaseApplication):
+        """ gunicorn application serving the already configured app.
+        """
+        def load_config(self):
+            self.cfg.set('bind', f'0.0.0.0:{SERVER_PORT}')
+            self.cfg.set('workers', server_workers)
+            self.cfg.set('threads', server_threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', SERVER_TIMEOUT)
+
+        def load(self):
+            return app
+
+    # Worker processes open their own connections rather than sharing ours.
+    close_queue_connections()
+    server_pid = os.getpid()
+    try:
+        InteractServer().run()
+    except SystemExit:
+        # Worker processes exit through here as well, only the process which
+        # started the server returns to shut down.
+        if os.getpid() != server_pid:
+            raise
@@ -0,0 +1,247 @@
+""" Functions for the server-wide store of Prosit spectral predictions. Spectra
+    are kept as MSP text in append-only segment files which are memory mapped
+    for reading, with an index of where each spectrum is found. Whole segments
+    are evicted, least recently used first, once the store exceeds its size.
+"""
+import mmap
+import os
+import shutil
+import sqlite3
+import time
+
+from inspire.run import run_inspire
+import pandas as pd
+import yaml
+
+from inspire_interact.cache_manager import record_cache_lookups
+from inspire_interact.constants import CACHE_PATH, SPECTRA_CACHE
+from inspire_interact.queue_manager import queue_transaction
+
+SPECTRA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    segment INTEGER PRIMARY KEY AUTOINCREMENT,
+    size INTEGER NOT NULL,
+    lastUsed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spectra (
+    key TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS spectra_segment ON spectra(segment);
+"""
+
+
+def connect_spectra_cache(interact_home):
+    """ Function to connect to the index of the spectral prediction store.
+    """
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=SPECTRA_CACHE)
+    os.makedirs(cache_folder, exist_ok=True)
+    connection = sqlite3.connect(f'{cache_folder}/index.db', timeout=60, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SPECTRA_SCHEMA)
+    return connection
+
+
+def get_spectrum_keys(input_df):
+    """ Function to create the keys identifying the spectrum predicted for each
+        row of the Prosit input, i.e. the modified sequence, charge and
+        collision energy.
+    """
+    return [
+        f'{modified_sequence}/{int(charge)}/{float(collision_energy)!r}'
+        for modified_sequence, charge, collision_energy in zip(
+            input_df['modified_sequence'],
+            input_df['precursor_charge'],
+            input_df['collision_energy'],
+        )
+    ]
+
+
+def open_segment(interact_home, segment):
+    """ Function to memory map a segment of the spectral prediction store.
+    """
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=SPECTRA_CACHE)
+    with open(f'{cache_folder}/segment_{segment}.bin', 'rb') as segment_file:
+        return mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def fetch_cached_spectra(interact_home, connection, spectrum_keys):
+    """ Function to look up spectra in the store in bulk.
+
+    Returns
+    -------
+    cached_spectra : dict
+        Map of key to the memory mapped segment, offset and length of its spectrum.
+    """
+    connection.execute('CREATE TEMP TABLE IF NOT EXISTS lookup (key TEXT PRIMARY KEY)')
+    connection.execute('BEGIN')
+    connection.execute('DELETE FROM lookup')
+    connection.executemany(
+        'INSERT OR IGNORE INTO lookup (key) VALUES (?)', [(key,) for key in spectrum_keys]
+    )
+    locations = connection.execute(
+        """SELECT spectra.key, spectra.segment, spectra.offset, spectra.length
+            FROM lookup JOIN spectra ON spectra.key = lookup.key"""
+    ).fetchall()
+    segments = {segment for _, segment, _, _ in locations}
+    connection.executemany(
+        'UPDATE segments SET lastUsed = ? WHERE segment = ?',
+        [(time.time(), segment) for segment in segments],
+    )
+    connection.execute('COMMIT')
+
+    segment_maps = {}
+    for segment in segments:
+        try:
+            segment_maps[segment] = open_segment(interact_home, segment)
+        except (FileNotFoundError, ValueError):
+            # Evicted by another job since the lookup, these spectra are predicted again.
+            continue
+    return {
+        key: (segment_maps[segment], offset, length)
+        for key, segment, offset, length in locations if segment in segment_maps
+    }
+
+
+def add_spectra_segment(interact_home, connection, msp_path, spectrum_keys):
+    """ Function to add newly predicted spectra to the store as a new segment.
+        The MSP file contains one spectrum for each key, in order.
+    """
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=SPECTRA_CACHE)
+    temporary_path = f'{cache_folder}/segment_{os.getpid()}.tmp'
+
+    locations = []
+    segment_size = 0
+    with open(msp_path, 'rb') as msp_file:
+        with open(temporary_path, 'wb') as segment_file:
+            spectrum = b''
+            for line in msp_file:
+                if line.startswith(b'Name: ') and spectrum:
+                    locations.append((segment_size, len(spectrum.rstrip(b'\r\n'))))
+                    segment_file.write(spectrum)
+                    segment_size += len(spectrum)
+                    spectrum = b''
+                spectrum += line
+            if spectrum:
+                locations.append((segment_size, len(spectrum.rstrip(b'\r\n'))))
+                segment_file.write(spectrum)
+                segment_size += len(spectrum)
+    if len(locations) != len(spectrum_keys):
+        os.remove(temporary_path)
+        raise ValueError(
+            f'Expected {len(spectrum_keys)} predicted spectra but found {len(locations)}.'
+        )
+
+    connection.execute('BEGIN IMMEDIATE')
+    segment = connection.execute(
+        'INSERT INTO segments (size, lastUsed) VALUES (?, ?)', (segment_size, time.time())
+    ).lastrowid
+    os.replace(temporary_path, f'{cache_folder}/segment_{segment}.bin')
+    connection.executemany(
+        'INSERT OR IGNORE INTO spectra (key, segment, offset, length) VALUES (?, ?, ?, ?)',
+        [
+            (key, segment, offset, length)
+            for key, (offset, length) in zip(spectrum_keys, locations)
+        ],
+    )
+    connection.execute('COMMIT')
+
+    segment_map = open_segment(interact_home, segment)
+    return {
+        key: (segment_map, offset, length)
+        for key, (offset, length) in zip(spectrum_keys, locations)
+    }
+
+
+def evict_spectra(interact_home, connection, max_size):
+    """ Function to remove the least recently used segments of the store until
+        it fits within its maximum size (GB).
+    """
+    connection.execute('BEGIN IMMEDIATE')
+    segments = connection.execute(
+        'SELECT segment, size FROM segments ORDER BY lastUsed DESC'
+    ).fetchall()
+    store_size = 0
+    evicted_segments = []
+    for segment, segment_size in segments:
+        store_size += segment_size
+        if store_size > max_size*1024**3:
+            evicted_segments.append(segment)
+    connection.executemany(
+        'DELETE FROM spectra WHERE segment = ?', [(segment,) for segment in evicted_segments]
+    )
+    connection.executemany(
+        'DELETE FROM segments WHERE segment = ?', [(segment,) for segment in evicted_segments]
+    )
+    connection.execute('COMMIT')
+
+    cache_folder = CACHE_PATH.format(home_key=interact_home, cache_name=SPECTRA_CACHE)
+    for segment in evicted_segments:
+        if os.path.exists(f'{cache_folder}/segment_{segment}.bin'):
+            os.remove(f'{cache_folder}/segment_{segment}.bin')
+
+
+def predict_spectra_with_cache(interact_home, project_home, max_size):
+    """ Function to predict spectra for the Prosit input of a project, only
+        predicting the spectra which are not already in the store and then
+        writing all spectra in the order of the input.
+    """
+    with open(f'{project_home}/config.yml', 'r', encoding='UTF-8') as stream:
+        inspire_config = yaml.safe_load(stream)
+    if inspire_config.get('spectralPredictor', 'prosit') != 'prosit':
+        run_inspire('predictSpectra', f'{project_home}/config.yml')
+        return
+    output_folder = inspire_config['outputFolder']
+    input_df = pd.read_csv(f'{output_folder}/prositInput.csv')
+    spectrum_keys = get_spectrum_keys(input_df)
+
+    connection = connect_spectra_cache(interact_home)
+    cached_spectra = fetch_cached_spectra(interact_home, connection, spectrum_keys)
+    missing_df = input_df[
+        [key not in cached_spectra for key in spectrum_keys]
+    ].drop_duplicates(subset=['modified_sequence', 'precursor_charge', 'collision_energy'])
+    n_spectra = len(set(spectrum_keys))
+    with queue_transaction(interact_home) as queue_connection:
+        record_cache_lookups(
+            queue_connection, SPECTRA_CACHE, n_spectra - len(missing_df), len(missing_df),
+        )
+    print(f'Found {n_spectra - len(missing_df)} of {n_spectra} spectra in the cache.')
+
+    if len(missing_df):
+        # Predict in a separate folder so the project's Prosit input is never changed.
+        scratch_folder = f'{output_folder}/spectraCache'
+        os.makedirs(scratch_folder, exist_ok=True)
+        missing_df.to_csv(f'{scratch_folder}/prositInput.csv', index=False)
+        if os.path.exists(f'{output_folder}/collisionEnergyStats.csv'):
+            shutil.copyfile(
+                f'{output_folder}/collisionEnergyStats.csv',
+                f'{scratch_folder}/collisionEnergyStats.csv',
+            )
+        inspire_config['outputFolder'] = scratch_folder
+        with open(f'{scratch_folder}/config.yml', 'w', encoding='UTF-8') as yaml_out:
+            yaml.dump(inspire_config, yaml_out)
+
+        run_inspire('predictSpectra', f'{scratch_folder}/config.yml')
+        cached_spectra.update(add_spectra_segment(
+            interact_home,
+            connection,
+            f'{scratch_folder}/prositPredictions.msp',
+            get_spectrum_keys(missing_df),
+        ))
+        shutil.rmtree(scratch_folder)
+
+    with open(f'{output_folder}/prositPredictions.msp.tmp', 'wb') as msp_file:
+        for key_idx, key in enumerate(spectrum_keys):
+            segment_map, offset, length = cached_spectra[key]
+            if key_idx:
+                msp_file.write(b'\n')
+            msp_file.write(segment_map[offset:offset + length])
+    os.replace(
+        f'{output_folder}/prositPredictions.msp.tmp', f'{output_folder}/prositPredictions.msp'
+    )
+
+    evict_spectra(interact_home, connection, max_size)
+    connection.close()
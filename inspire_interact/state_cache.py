@@ -0,0 +1,55 @@
+""" Functions for a process-wide cache of the files describing the state of each
+    project, e.g. its metadata and task statuses, so that pages and status
+    requests polling many projects do not parse the same files again. A file
+    is only read again once its inode, modification time or size changes,
+    which any write, including an atomic replacement, does.
+"""
+import copy
+import os
+import threading
+
+STATE_CACHE_SIZE = 4096
+
+_STATE_CACHE = {}
+_STATE_LOCK = threading.Lock()
+
+
+def get_file_key(file_path):
+    """ Function to get the key identifying the current contents of a file.
+    """
+    file_stat = os.stat(file_path)
+    return file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
+
+
+def store_cached_file(file_path, contents, file_key):
+    """ Function to store the contents of a file in the cache. Writers can
+        store what they have written so that it is not read back.
+    """
+    with _STATE_LOCK:
+        _STATE_CACHE.pop(file_path, None)
+        while len(_STATE_CACHE) >= STATE_CACHE_SIZE:
+            # Remove the least recently stored file.
+            del _STATE_CACHE[next(iter(_STATE_CACHE))]
+        _STATE_CACHE[file_path] = (file_key, contents)
+
+
+def read_cached_file(file_path, read_file):
+    """ Function to read a file through the cache, parsing it with read_file
+        if it has changed since it was cached. Raises FileNotFoundError if
+        the file does not exist.
+
+    Returns
+    -------
+    contents : object
+        A copy of the parsed contents, which the caller may modify.
+    """
+    file_key = get_file_key(file_path)
+    cached_file = _STATE_CACHE.get(file_path)
+    if cached_file is not None and cached_file[0] == file_key:
+        return copy.deepcopy(cached_file[1])
+
+    # Keyed by the stat taken before reading, a write during the read only
+    # means the file is read again next time.
+    contents = read_file(file_path)
+    store_cached_file(file_path, contents, file_key)
+    return copy.deepcopy(contents)
@@ -218,38 +218,13 @@ async function uploadFiles(serverAddress, user, project, mode) {
     //If file upload was not completed, do not allow users to proceed.
     if(!checkPreconditions(mode, selectedFiles)) return;
 
-    var multiFormData = new FormData();
-    selectedFiles.forEach ((elem) => {
-        multiFormData.append('files', elem )
-    });
-
     let waitingTextElem = document.getElementById(mode + "-waiting");
     waitingTextElem.style.display = 'block';
 
-    //create XHR object to send request
-    var ajax = new XMLHttpRequest(
-        
-    );
-
-    // add progress event to find the progress of file upload 
-    ajax.upload.addEventListener("progress", progressHandler);
+    await postFiles(serverAddress, user, project, selectedFiles, mode);
 
-    // initializes a newly-created request 
-    ajax.open(
-        "POST",
-        'http://' + serverAddress + ':5000/interact/upload/' + user + '/' + project + '/' + mode
-    ); // replace with your file URL
-
-    ajax.onreadystatechange = () => {
-        // Call a function when the state changes.
-        if (ajax.readyState === XMLHttpRequest.DONE && ajax.status === 200) {
-            checkFilePattern(serverAddress, user, project, mode);
-            waitingTextElem.style.display = "none";
-        }
-    };
-    
-    // send request to the server
-    ajax.send(multiFormData);
+    checkFilePattern(serverAddress, user, project, mode);
+    waitingTextElem.style.display = "none";
 };
 
 function progressHandler(ev) {    
@@ -356,6 +331,100 @@ async function clearFilePattern(serverAddress, user, project, file_type) {
 }
 
 
+/**
+ * Lists a folder of the server's storage which files can be imported from, or the import
+ * roots if no folder is given. The import option is only shown if the server has import roots.
+ * 
+ * @param {*} serverAddress address of the server hosting inSPIRE-interact.
+ * @param {*} file_type the type of files being imported.
+ * @param {*} path the folder to list, or null for the import roots.
+ */
+async function loadImportFolder(serverAddress, file_type, path) {
+    let browseUrl = 'http://' + serverAddress + ':5000/interact/import/browse';
+    if (path !== null) {
+        browseUrl += '?path=' + encodeURIComponent(path);
+    }
+    let response = await fetch(browseUrl);
+    if (!response.ok) {
+        // Moved above the import roots, go back to the roots.
+        if (path !== null) loadImportFolder(serverAddress, file_type, null);
+        return;
+    }
+    let folderContents = (await response.json())['message'];
+    if (path === null && folderContents['folders'].length === 0) return;
+
+    document.getElementById(file_type + "-import-div").style.display = 'block';
+    document.getElementById(file_type + "-import-path").textContent = (path === null) ? 'Import folders:' : path;
+    let ul = document.getElementById(file_type + "-import-browser");
+    ul.innerHTML = "";
+
+    let folders = folderContents['folders'].map((folder) => [folder.split(/[\\/]/).pop() + '/', folder]);
+    if (path !== null) {
+        folders.unshift(['../', path.replace(/[\\/][^\\/]*$/, '')]);
+    }
+    folders.forEach (([folderName, folderPath]) => {
+        let li = document.createElement("li");
+        let link = document.createElement("a");
+        link.href = '#';
+        link.textContent = folderName;
+        link.onclick = (ev) => {
+            ev.preventDefault();
+            loadImportFolder(serverAddress, file_type, folderPath);
+        };
+        li.appendChild(link);
+        ul.appendChild(li);
+    });
+    folderContents['files'].forEach ((fileDetails) => {
+        let li = document.createElement("li");
+        let checkbox = document.createElement("input");
+        checkbox.type = 'checkbox';
+        checkbox.value = fileDetails['path'];
+        li.appendChild(checkbox);
+        let fileSize = Math.round((fileDetails['size']/1000000000 + Number.EPSILON) * 1000)/1000;
+        li.appendChild(document.createTextNode(
+            ' ' + fileDetails['path'].split(/[\\/]/).pop() + ' (' + fileSize + ' GB)'
+        ));
+        ul.appendChild(li);
+    });
+}
+
+/**
+ * Imports the files selected in the import browser into the project.
+ * 
+ * @param {*} serverAddress address of the server hosting inSPIRE-interact.
+ * @param {*} file_type the type of files being imported.
+ */
+async function importFiles(serverAddress, user, project, file_type) {
+    let selectedPaths = Array.from(
+        document.getElementById(file_type + "-import-browser").querySelectorAll('input:checked')
+    ).map((checkbox) => checkbox.value);
+    let errorElem = document.getElementById(file_type + "-import-error");
+    if (selectedPaths.length === 0) {
+        errorElem.textContent = 'Please select files to import.';
+        errorElem.style.display = 'block';
+        return;
+    }
+
+    let response = await fetch(
+        'http://' + serverAddress + ':5000/interact/import/' + user + '/' + project + '/' + file_type,
+        {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({'paths': selectedPaths})
+        }
+    );
+    let result = await response.json();
+    if (!response.ok) {
+        errorElem.textContent = result['message'];
+        errorElem.style.display = 'block';
+        return;
+    }
+    errorElem.style.display = 'none';
+    checkFilePattern(serverAddress, user, project, file_type);
+}
+
 /* ============================================= GUI FUNCTIONS ============================================= */
 
 var lastFrame = "init";
@@ -588,20 +657,128 @@ function cycleButtonVisibility(buttonType) {
 
 /* ============================================= BACKEND ============================================= */
 
+const PARALLEL_UPLOADS = 3;
+const MAX_UPLOAD_RETRIES = 5;
+
+const CRC32_TABLE = Array.from({length: 256}, (_, n) => {
+    let c = n;
+    for (let k = 0; k < 8; k++) {
+        c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+    }
+    return c >>> 0;
+});
+
+/**
+ * Computes the CRC32 checksum of a chunk, checked by the server before the chunk is accepted.
+ * 
+ * @param {*} bytes Uint8Array of the chunk.
+ * @returns the unsigned CRC32 checksum.
+ */
+function crc32(bytes) {
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < bytes.length; i++) {
+        crc = CRC32_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+/**
+ * Uploads a single file in chunks, resuming from the last chunk the server received
+ * if the upload was interrupted.
+ * 
+ * @param {*} uploadUrl url of the upload endpoints for the project and file type.
+ * @param {*} file the file to upload.
+ * @param {*} fileIdx index of the file within the selected files.
+ * @param {*} onProgress callback receiving the number of bytes of this file received.
+ */
+async function uploadFileChunks(uploadUrl, file, fileIdx, onProgress) {
+    let upload = await fetch(uploadUrl + '/start', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            'fileName': file.name,
+            'fileIdx': fileIdx,
+            'size': file.size,
+            'lastModified': file.lastModified,
+        }),
+    }).then( response => {
+        return response.json();
+    });
+
+    let offset = upload['offset'];
+    let retries = 0;
+    onProgress(offset);
+    while (offset < file.size) {
+        let chunk = file.slice(offset, offset + upload['chunkSize']);
+        let chunkBytes = new Uint8Array(await chunk.arrayBuffer());
+        let response = null;
+        let result = {'offset': offset};
+        try {
+            response = await fetch(uploadUrl + '/' + upload['uploadID'] + '?offset=' + offset, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'X-Chunk-CRC32': crc32(chunkBytes).toString(),
+                },
+                body: chunkBytes,
+            });
+            result = await response.json();
+        } catch (err) {
+            // The connection dropped, the chunk is sent again.
+        }
+        if (response !== null && response.status === 404) {
+            throw new Error('Upload of ' + file.name + ' expired.');
+        }
+        if (response !== null && (response.ok || response.status === 409)) {
+            retries = 0;
+        } else if (++retries > MAX_UPLOAD_RETRIES) {
+            throw new Error('Upload of ' + file.name + ' failed.');
+        } else {
+            await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** retries));
+        }
+        offset = result['offset'];
+        onProgress(offset);
+    }
+}
+
 /**
- * Posts the selected files to the backend.
+ * Posts the selected files to the backend in resumable chunks, uploading several files at once.
  * 
  * @param {*} serverAddress  address of the server hosting inSPIRE-interact. 
- * @param {*} formData 
+ * @param {*} files the files to upload.
  * @param {*} mode 
  * @returns 
  */
-async function postFiles(serverAddress, user, project, formData, mode){
+async function postFiles(serverAddress, user, project, files, mode){
+    let uploadUrl = 'http://' + serverAddress + ':5000/interact/upload/' + user + '/' + project + '/' + mode;
+    let totalSize = files.reduce((total, file) => total + file.size, 0);
+    let loaded = files.map(() => 0);
+
+    let nextFile = 0;
+    async function uploadNext() {
+        while (nextFile < files.length) {
+            let fileIdx = nextFile++;
+            await uploadFileChunks(uploadUrl, files[fileIdx], fileIdx, (fileLoaded) => {
+                loaded[fileIdx] = fileLoaded;
+                progressHandler({
+                    'loaded': loaded.reduce((total, size) => total + size, 0),
+                    'total': totalSize,
+                });
+            });
+        }
+    }
+    await Promise.all(Array.from({length: Math.min(PARALLEL_UPLOADS, files.length)}, uploadNext));
+
     return await fetch(
-        'http://' + serverAddress + ':5000/interact/upload/' + user + '/' + project + '/' + mode,
+        uploadUrl + '/finish',
         {
             method: 'POST',
-            body: formData,
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({'fileNames': files.map(file => file.name)}),
         }
     ).then( response => {
         return response.json();
@@ -744,6 +921,181 @@ async function cancelPipeline(serverAddress, user, project) {
     }
 };
 
+/**
+ * Updates the rows of the task status table whose status has changed.
+ * 
+ * @param {*} tasks status of each task of the job.
+ * @returns whether all tasks were in the table.
+ */
+function updateTaskTable(tasks) {
+    for (let task of tasks) {
+        let rowElem = document.getElementById('task-' + task['taskIndex']);
+        if (rowElem === null) {
+            return false;
+        }
+        let cellElems = rowElem.getElementsByTagName('text');
+        let statusElem = cellElems[cellElems.length - 1];
+        if (statusElem.textContent !== task['status']) {
+            statusElem.textContent = task['status'];
+            for (let rectElem of rowElem.getElementsByTagName('rect')) {
+                rectElem.setAttribute('fill', task['color']);
+            }
+        }
+    }
+    return true;
+};
+
+/**
+ * Applies a change in the status of a job to the page.
+ * 
+ * @param {*} pageState state of the job when the page was loaded.
+ * @param {*} jobStatus the new status of the job.
+ * @returns whether the page could be updated without reloading it.
+ */
+function applyJobStatus(pageState, jobStatus) {
+    // Starting jobs are shown on the same page as running jobs.
+    let jobState = jobStatus['state'] === 'starting' ? 'running' : jobStatus['state'];
+    if (jobState !== pageState) {
+        return false;
+    }
+    if (jobState === 'running') {
+        return updateTaskTable(jobStatus['tasks']);
+    }
+    document.getElementById('queue-position').innerHTML = jobStatus['queuePosition'];
+    document.getElementById('queue-length').innerHTML = jobStatus['queueLength'];
+    let queueElem = document.getElementById('queue-table');
+    if ('queueSvg' in jobStatus && queueElem.innerHTML !== jobStatus['queueSvg']) {
+        queueElem.innerHTML = jobStatus['queueSvg'];
+    }
+    return true;
+};
+
+/**
+ * Polls the status of a job, updating the parts of the page which change
+ * and reloading it when the job starts or finishes.
+ * 
+ * @param {*} statusUrl address of the job's status.
+ * @param {*} pageState state of the job when the page was loaded.
+ */
+function pollJobStatus(statusUrl, pageState) {
+    let pollId = setInterval(async function() {
+        let response = await fetch(statusUrl);
+        if (response.ok && !applyJobStatus(pageState, await response.json())) {
+            clearInterval(pollId);
+            window.location.reload();
+        }
+    }, 10000);
+};
+
+/**
+ * Watches the status of a job, updating the parts of the page which change
+ * and reloading it when the job starts or finishes.
+ * 
+ * @param {*} serverAddress address of the server hosting inSPIRE-interact.
+ * @param {*} pageState state of the job when the page was loaded.
+ */
+function watchJobStatus(serverAddress, user, project, pageState) {
+    let statusUrl = 'http://' + serverAddress + ':5000/interact/status/' + user + '/' + project;
+    if (typeof EventSource === 'undefined') {
+        // Poll the status where server-sent events are not supported.
+        pollJobStatus(statusUrl, pageState);
+        return;
+    }
+    let statusSource = new EventSource(statusUrl + '/stream');
+    statusSource.addEventListener('status', function(statusEvent) {
+        if (!applyJobStatus(pageState, JSON.parse(statusEvent.data))) {
+            statusSource.close();
+            window.location.reload();
+        }
+    });
+    statusSource.addEventListener('error', function() {
+        // The stream is only closed for good when the server is too busy to
+        // stream the status, otherwise the browser reconnects.
+        if (statusSource.readyState === EventSource.CLOSED) {
+            pollJobStatus(statusUrl, pageState);
+        }
+    });
+};
+
+var resultsQuery = {'page': 1, 'sort': '', 'order': 'asc', 'totalPages': 1};
+
+/**
+ * Sorts the results table by a column, reversing the order if it is already
+ * sorted by that column.
+ * 
+ * @param {*} serverAddress address of the server hosting inSPIRE-interact.
+ * @param {*} column the column to sort by.
+ */
+function sortResults(serverAddress, user, project, column) {
+    if (resultsQuery['sort'] === column) {
+        resultsQuery['order'] = resultsQuery['order'] === 'asc' ? 'desc' : 'asc';
+    } else {
+        resultsQuery['sort'] = column;
+        resultsQuery['order'] = 'asc';
+    }
+    loadResultsPage(serverAddress, user, project, 1);
+};
+
+/**
+ * Loads a single page of the filtered PSMs or peptides into the results table.
+ * 
+ * @param {*} serverAddress address of the server hosting inSPIRE-interact.
+ * @param {*} page the page to load.
+ */
+async function loadResultsPage(serverAddress, user, project, page) {
+    if (page < 1 || page > resultsQuery['totalPages'] && page !== 1) {
+        return;
+    }
+    let queryParams = new URLSearchParams({
+        'page': page,
+        'pageSize': 50,
+        'sort': resultsQuery['sort'],
+        'order': resultsQuery['order'],
+        'peptide': document.getElementById('query-peptide').value,
+        'protein': document.getElementById('query-protein').value,
+        'source': document.getElementById('query-source').value,
+        'maxQValue': document.getElementById('query-max-q-value').value,
+    });
+    let tableName = document.getElementById('query-table-select').value;
+    let response = await fetch(
+        'http://' + serverAddress + ':5000/interact/query_results/' + user + '/' + project + '/' +
+            tableName + '?' + queryParams.toString(),
+    );
+    let resultsPage = await response.json();
+    let tableElem = document.getElementById('query-table');
+    let pageTextElem = document.getElementById('query-page-text');
+    tableElem.replaceChildren();
+    if (!response.ok) {
+        pageTextElem.textContent = resultsPage['message'];
+        return;
+    }
+
+    resultsQuery['page'] = resultsPage['page'];
+    resultsQuery['totalPages'] = Math.max(
+        Math.ceil(resultsPage['totalRows'] / resultsPage['pageSize']), 1
+    );
+    let headerRow = tableElem.insertRow();
+    for (let column of resultsPage['columns']) {
+        let headerElem = document.createElement('th');
+        headerElem.textContent = column;
+        if (column === resultsQuery['sort']) {
+            headerElem.textContent += resultsQuery['order'] === 'asc' ? ' \u25B2' : ' \u25BC';
+        }
+        headerElem.onclick = function() {
+            sortResults(serverAddress, user, project, column);
+        };
+        headerRow.appendChild(headerElem);
+    }
+    for (let row of resultsPage['rows']) {
+        let rowElem = tableElem.insertRow();
+        for (let value of row) {
+            rowElem.insertCell().textContent = value === null ? '' : value;
+        }
+    }
+    pageTextElem.textContent = 'Page ' + resultsQuery['page'] + ' of ' +
+        resultsQuery['totalPages'] + ' (' + resultsPage['totalRows'] + ' rows)';
+};
+
 async function cancelJobById(serverAddress) {
     var configObject = {
         'jobID': document.getElementById('cancel-job-input').value,
@@ -0,0 +1,185 @@
+""" Functions for resumable, chunked uploads. Each file is uploaded in chunks
+    written directly into a partial file in the project's uploads folder,
+    which is moved into place once the last chunk arrives. The number of bytes
+    received is kept in the queue database so that an interrupted upload can
+    continue from where it stopped.
+"""
+import hashlib
+import os
+import time
+import zlib
+
+from inspire_interact.constants import UPLOAD_CHUNK_SIZE, UPLOAD_EXPIRY, UPLOAD_PATH
+from inspire_interact.queue_manager import connect_queue, queue_transaction
+
+UPLOAD_BLOCK_SIZE = 1024*1024
+
+
+def get_upload_name(file_type, file_name, file_idx):
+    """ Function to get the name an uploaded file is saved under.
+    """
+    if file_type == 'proteome':
+        return f'proteome_{file_name}'
+    if file_type == 'proteome-select':
+        return f'host_{file_name}' if file_idx == 0 else f'pathogen_{file_name}'
+    if file_type == 'search':
+        # For search if there are multiple msms.txt, etc, we avoid overwriting
+        return f'{file_idx+1}_' + file_name.replace(' ', '_')
+    # For raw files we preserve name
+    return file_name
+
+
+def combine_proteomes(upload_home, host_file_name, pathogen_file_name):
+    """ Function to combine the host and pathogen proteomes into a single file.
+    """
+    with open(
+        f'{upload_home}/proteome_combined.fasta', mode='w', encoding='UTF-8',
+    ) as total_file:
+        for prot_file in (
+            f'{upload_home}/host_{host_file_name}',
+            f'{upload_home}/pathogen_{pathogen_file_name}',
+        ):
+            with open(
+                prot_file, mode='r', encoding='UTF-8'
+            ) as source_file:
+                for line in source_file:
+                    total_file.write(line)
+
+
+def remove_expired_uploads(interact_home):
+    """ Function to remove uploads which have not received a chunk recently.
+    """
+    with queue_transaction(interact_home) as connection:
+        expired_uploads = connection.execute(
+            'SELECT uploadID, user, project FROM uploads WHERE updated < ?',
+            (time.time() - UPLOAD_EXPIRY,),
+        ).fetchall()
+        connection.executemany(
+            'DELETE FROM uploads WHERE uploadID = ?',
+            [(upload['uploadID'],) for upload in expired_uploads],
+        )
+    for upload in expired_uploads:
+        part_path = UPLOAD_PATH.format(
+            project_home=f'{interact_home}/projects/{upload["user"]}/{upload["project"]}',
+            upload_id=upload['uploadID'],
+        )
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def start_upload(interact_home, user, project, file_type, upload_details):
+    """ Function to start or resume the upload of a file. The same file gets
+        the same upload ID, so an interrupted upload is resumed.
+
+    Returns
+    -------
+    upload : dict
+        The upload ID, the number of bytes already received and the chunk size.
+    """
+    remove_expired_uploads(interact_home)
+    project_home = f'{interact_home}/projects/{user}/{project}'
+    file_name = get_upload_name(
+        file_type, upload_details['fileName'], upload_details['fileIdx']
+    )
+    upload_id = hashlib.sha256((
+        f'{user}/{project}/{file_type}/{file_name}/{upload_details["size"]}/' +
+        f'{upload_details["lastModified"]}'
+    ).encode()).hexdigest()[:32]
+    part_path = UPLOAD_PATH.format(project_home=project_home, upload_id=upload_id)
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+
+    with queue_transaction(interact_home) as connection:
+        connection.execute(
+            """INSERT OR IGNORE INTO uploads
+                (uploadID, user, project, fileType, fileName, size, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (upload_id, user, project, file_type, file_name, upload_details['size'], time.time()),
+        )
+        if not os.path.exists(part_path):
+            # The partial file was removed, e.g. when the folder was cleared.
+            connection.execute('UPDATE uploads SET offset = 0 WHERE uploadID = ?', (upload_id,))
+            with open(part_path, 'wb'):
+                pass
+        offset = connection.execute(
+            'SELECT offset FROM uploads WHERE uploadID = ?', (upload_id,)
+        ).fetchone()['offset']
+
+    if offset == upload_details['size']:
+        finish_upload(interact_home, upload_id)
+    return {'uploadID': upload_id, 'offset': offset, 'chunkSize': UPLOAD_CHUNK_SIZE}
+
+
+def write_chunk(
+    interact_home, user, project, file_type, upload_id, offset, chunk_stream, checksum,
+):
+    """ Function to write a chunk of an upload at its offset in the partial
+        file, only counting it as received if its CRC32 checksum matches.
+        Raises KeyError unless the upload was started for the same user,
+        project and file type.
+
+    Returns
+    -------
+    offset : int
+        The number of bytes received, from which the upload should continue.
+    complete : bool
+        Whether the whole file has been received.
+    accepted : bool
+        Whether the chunk was written, i.e. it started at the expected offset.
+    """
+    upload = connect_queue(interact_home).execute(
+        """SELECT * FROM uploads
+            WHERE uploadID = ? AND user = ? AND project = ? AND fileType = ?""",
+        (upload_id, user, project, file_type),
+    ).fetchone()
+    if upload is None:
+        raise KeyError(f'Unknown upload {upload_id}.')
+    if offset != upload['offset']:
+        return upload['offset'], False, False
+
+    part_path = UPLOAD_PATH.format(
+        project_home=f'{interact_home}/projects/{upload["user"]}/{upload["project"]}',
+        upload_id=upload_id,
+    )
+    chunk_crc = 0
+    chunk_size = 0
+    with open(part_path, 'r+b') as part_file:
+        part_file.seek(offset)
+        while block := chunk_stream.read(UPLOAD_BLOCK_SIZE):
+            if offset + chunk_size + len(block) > upload['size']:
+                raise ValueError('Chunk extends beyond the end of the file.')
+            chunk_crc = zlib.crc32(block, chunk_crc)
+            part_file.write(block)
+            chunk_size += len(block)
+    if chunk_crc != checksum:
+        raise ValueError('Chunk checksum does not match.')
+
+    with queue_transaction(interact_home) as connection:
+        # Only move forward, a retried chunk may have been written twice.
+        connection.execute(
+            """UPDATE uploads SET offset = ?, updated = ?
+                WHERE uploadID = ? AND offset = ?""",
+            (offset + chunk_size, time.time(), upload_id, offset),
+        )
+    if offset + chunk_size == upload['size']:
+        finish_upload(interact_home, upload_id)
+        return offset + chunk_size, True, True
+    return offset + chunk_size, False, True
+
+
+def finish_upload(interact_home, upload_id):
+    """ Function to move a completely received file into its project folder.
+    """
+    with queue_transaction(interact_home) as connection:
+        upload = connection.execute(
+            'SELECT * FROM uploads WHERE uploadID = ?', (upload_id,)
+        ).fetchone()
+        if upload is None:
+            # Already moved by a concurrent request for the last chunk.
+            return
+        connection.execute('DELETE FROM uploads WHERE uploadID = ?', (upload_id,))
+        project_home = f'{interact_home}/projects/{upload["user"]}/{upload["project"]}'
+        os.makedirs(f'{project_home}/{upload["fileType"]}', exist_ok=True)
+        os.replace(
+            UPLOAD_PATH.format(project_home=project_home, upload_id=upload_id),
+            f'{project_home}/{upload["fileType"]}/{upload["fileName"]}',
+        )
@@ -2,22 +2,101 @@
 """
 from copy import deepcopy
 import os
-import time
+import threading
 
 import pandas as pd
 import psutil
 import yaml
 
 from inspire_interact.constants import (
+    ALL_CONFIG_KEYS,
+    ARCHIVE_CACHE_SIZE_KEY,
+    BINDING_CACHE_KEY,
+    CPUS_KEY,
+    FIFO_POLICY,
+    FRAGGER_MEMORY_KEY,
+    FRAGGER_PATH_KEY,
+    IMPORT_ROOTS_KEY,
     INTERACT_HOME_KEY,
+    JOB_CPUS_KEY,
+    JOB_MEMORY_KEY,
+    MAX_USER_JOBS_KEY,
+    MEMORY_KEY,
+    MGF_CACHE_SIZE_KEY,
+    MHCPAN_KEY,
+    QUEUE_POLICY_KEY,
+    REPORT_CACHE_SIZE_KEY,
+    RESCORE_COMMAND_KEY,
     SERVER_ADDRESS_KEY,
+    SERVER_THREADS_KEY,
+    SERVER_WORKERS_KEY,
+    SKYLINE_RUNNER_KEY,
+    SPECTRA_CACHE_SIZE_KEY,
     TASKS_NAMES,
     TASK_DESCRIPTIONS,
+    TASK_IO,
+    TASK_RESOURCES,
+    USER_PRIORITY_KEY,
 )
 from inspire_interact.html_snippets import (
     INSPIRE_FOOTER,
     INSPIRE_HEADER,
 )
+from inspire_interact.queue_policies import QUEUE_POLICIES
+from inspire_interact.state_cache import get_file_key, read_cached_file, store_cached_file
+
+def read_server_config(config_file):
+    """ Function to read the inSPIRE-Interactive server config, filling in
+        defaults for any keys not provided.
+    """
+    with open(config_file, 'r', encoding='UTF-8') as stream:
+        config_dict = yaml.safe_load(stream)
+    for config_key in config_dict:
+        if config_key not in ALL_CONFIG_KEYS:
+            raise ValueError(f'Unrecognised key {config_key} found in config file.')
+
+    server_config = {
+        MHCPAN_KEY: config_dict.get(MHCPAN_KEY),
+        FRAGGER_PATH_KEY: config_dict.get(FRAGGER_PATH_KEY),
+        FRAGGER_MEMORY_KEY: config_dict.get(FRAGGER_MEMORY_KEY),
+        CPUS_KEY: config_dict.get(CPUS_KEY, 1),
+        SKYLINE_RUNNER_KEY: config_dict.get(SKYLINE_RUNNER_KEY),
+        RESCORE_COMMAND_KEY: config_dict.get(RESCORE_COMMAND_KEY, 'percolator'),
+        QUEUE_POLICY_KEY: config_dict.get(QUEUE_POLICY_KEY, FIFO_POLICY),
+        USER_PRIORITY_KEY: config_dict.get(USER_PRIORITY_KEY) or {},
+        MAX_USER_JOBS_KEY: config_dict.get(MAX_USER_JOBS_KEY),
+        MGF_CACHE_SIZE_KEY: config_dict.get(MGF_CACHE_SIZE_KEY, 100),
+        SPECTRA_CACHE_SIZE_KEY: config_dict.get(SPECTRA_CACHE_SIZE_KEY, 20),
+        BINDING_CACHE_KEY: config_dict.get(BINDING_CACHE_KEY, True),
+        ARCHIVE_CACHE_SIZE_KEY: config_dict.get(ARCHIVE_CACHE_SIZE_KEY, 50),
+        REPORT_CACHE_SIZE_KEY: config_dict.get(REPORT_CACHE_SIZE_KEY, 5),
+        SERVER_WORKERS_KEY: config_dict.get(SERVER_WORKERS_KEY, 4),
+        SERVER_THREADS_KEY: config_dict.get(SERVER_THREADS_KEY, 8),
+        IMPORT_ROOTS_KEY: [
+            os.path.realpath(import_root)
+            for import_root in config_dict.get(IMPORT_ROOTS_KEY) or []
+        ],
+    }
+    server_config[JOB_CPUS_KEY] = config_dict.get(JOB_CPUS_KEY, server_config[CPUS_KEY])
+    server_config[JOB_MEMORY_KEY] = config_dict.get(
+        JOB_MEMORY_KEY, server_config[FRAGGER_MEMORY_KEY]
+    )
+    server_config[MEMORY_KEY] = config_dict.get(
+        MEMORY_KEY, psutil.virtual_memory().total // 1024**3
+    )
+    if server_config[QUEUE_POLICY_KEY] not in QUEUE_POLICIES:
+        raise ValueError(
+            f'{QUEUE_POLICY_KEY} must be one of {", ".join(QUEUE_POLICIES)}.'
+        )
+    if server_config[JOB_CPUS_KEY] > server_config[CPUS_KEY]:
+        raise ValueError(f'{JOB_CPUS_KEY} cannot be greater than {CPUS_KEY}.')
+    if server_config[SKYLINE_RUNNER_KEY] is not None:
+        server_config[SKYLINE_RUNNER_KEY] = server_config[SKYLINE_RUNNER_KEY].replace(
+            '\\', '/'
+        )
+
+    return server_config
+
 
 def generate_raw_file_table(user, project, app, variant):
     """ Function to create a html table with raw file, biological sample input
@@ -71,54 +150,34 @@ def generate_raw_file_table(user, project, app, variant):
     return html_table
 
 
-def safe_job_id_fetch(project_home):
-    """ Fetch the job ID of an inSPIRE job if it exists.
-    """
-    if not os.path.exists(f'{project_home}/inspire_pids.txt'):
-        time.sleep(2)
-
-    if os.path.exists(f'{project_home}/inspire_pids.txt'):
-        with open(f'{project_home}/inspire_pids.txt', 'r', encoding='UTF-8') as pid_file:
-            return int(pid_file.readline().strip())
-    return 0
-
-def get_pids(project_home, workflow):
-    """ Function to get the pids
+def load_yaml(file_path):
+    """ Function to parse a yaml file.
     """
-    if not os.path.exists(f'{project_home}/{workflow}_pids.txt'):
-        time.sleep(3)
-        if not os.path.exists(f'{project_home}/{workflow}_pids.txt'):
-            return None
-
-    with open(f'{project_home}/{workflow}_pids.txt', 'r', encoding='UTF-8') as file:
-        lines = file.readlines()
-        pids = [line.rstrip() for line in lines]
-    return pids
+    with open(file_path, 'r', encoding='UTF-8') as stream:
+        return yaml.safe_load(stream)
 
 
 def read_meta(project_home, meta_type):
     """ Function for reading metadata from a project home.
     """
-    if os.path.exists(f'{project_home}/{meta_type}_metadata.yml'):
-        with open(
-            f'{project_home}/{meta_type}_metadata.yml',
-            'r',
-            encoding='UTF-8',
-        ) as stream:
-            return yaml.safe_load(stream)
-    return {}
-
-
-def check_pids(project_home, workflow):
-    """ Function to check if process IDs are still running.
-    """
-    pids = get_pids(project_home, workflow)
-    if pids is None:
-        return 'clear'
-    if psutil.pid_exists(int(pids[0])):
-        return 'waiting'
+    try:
+        return read_cached_file(f'{project_home}/{meta_type}_metadata.yml', load_yaml)
+    except FileNotFoundError:
+        return {}
+
 
-    return 'done'
+def write_meta(project_home, meta_type, meta_dict):
+    """ Function for writing metadata to a project home. The file is replaced
+        atomically so that it is never read while partly written.
+    """
+    meta_path = f'{project_home}/{meta_type}_metadata.yml'
+    temporary_path = f'{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary_path, 'w', encoding='UTF-8') as yaml_out:
+        yaml.dump(meta_dict, yaml_out)
+    # The replaced file keeps the inode and modification time of the temporary one.
+    file_key = get_file_key(temporary_path)
+    os.replace(temporary_path, meta_path)
+    store_cached_file(meta_path, deepcopy(meta_dict), file_key)
 
 
 def subset_tasks(inspire_settings):
@@ -136,6 +195,32 @@ def subset_tasks(inspire_settings):
         tasks = [task for task in tasks if task != 'quantify']
     return tasks
 
+def get_task_dependencies(task_list):
+    """ Function to find the tasks each task of a job depends on, i.e. the
+        earlier tasks of the job which write any of its inputs.
+    """
+    dependencies = {}
+    for task_idx, task in enumerate(task_list):
+        dependencies[task] = [
+            earlier_task for earlier_task in task_list[:task_idx] if set(
+                TASK_IO[earlier_task]['outputs']
+            ).intersection(TASK_IO[task]['inputs'])
+        ]
+    return dependencies
+
+def get_task_resources(server_config):
+    """ Function to find the CPUs and memory (GB) reserved by each inSPIRE task.
+    """
+    task_resources = {}
+    for task, resources in TASK_RESOURCES.items():
+        task_resources[task] = tuple(
+            server_config[resources[resource]] or 0 if isinstance(
+                resources[resource], str
+            ) else resources[resource]
+            for resource in ('cpus', 'memory')
+        )
+    return task_resources
+
 def write_task_status(inspire_settings, project_home):
     """ Function to write the task status DataFrame. 
     """
@@ -147,7 +232,16 @@ def write_task_status(inspire_settings, project_home):
     })
     task_df['taskIndex'] = task_df.index + 1
     task_df['status'] = 'Queued'
-    task_df.to_csv(f'{project_home}/taskStatus.csv', index=False)
+    write_task_df(project_home, task_df)
+
+def write_task_df(project_home, task_df):
+    """ Function to replace the task status file atomically, so that pages never
+        read a partly written table. The job and the web server may both write
+        it, so each writer uses its own temporary file.
+    """
+    temporary_path = f'{project_home}/taskStatus.csv.{os.getpid()}.{threading.get_ident()}.tmp'
+    task_df.to_csv(temporary_path, index=False)
+    os.replace(temporary_path, f'{project_home}/taskStatus.csv')
 
 def format_header_and_footer(server_address):
     """ Helper function to add the server address to the inSPIRE header and footer.
@@ -0,0 +1,436 @@
+""" Long-lived worker which keeps inSPIRE imported and runs jobs from the
+    inSPIRE-Interactive queue.
+"""
+from argparse import ArgumentParser
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from inspire.run import run_inspire
+import psutil
+import pyarrow as pa
+
+from inspire_interact.constants import (
+    ARCHIVE_CACHE_SIZE_KEY,
+    BINDING_CACHE_KEY,
+    CPUS_KEY,
+    JOB_CPUS_KEY,
+    MAX_USER_JOBS_KEY,
+    MEMORY_KEY,
+    MGF_CACHE_SIZE_KEY,
+    OPTIONAL_TASKS,
+    QUEUE_POLICY_KEY,
+    SPECTRA_CACHE_SIZE_KEY,
+)
+from inspire_interact.archive_cache import build_result_archives
+from inspire_interact.binding_cache import predict_binding_with_cache
+from inspire_interact.cache_manager import fetch_cached_scans, store_converted_scans
+from inspire_interact.clean_up import kill_job
+from inspire_interact.fingerprints import (
+    get_reusable_tasks,
+    get_task_fingerprints,
+    read_fingerprints,
+    record_task_outputs,
+    write_fingerprints,
+)
+from inspire_interact.queue_manager import (
+    get_granted_tasks,
+    get_queue_job,
+    grant_resources,
+    read_queue,
+    register_worker,
+    release_resources,
+    remove_from_queue,
+    request_resources,
+    send_wake_up,
+    set_job_pid,
+    update_status,
+)
+from inspire_interact.results_summary import write_results_summary
+from inspire_interact.results_tables import convert_results_tables
+from inspire_interact.spectra_cache import predict_spectra_with_cache
+from inspire_interact.utils import (
+    get_task_dependencies,
+    get_task_resources,
+    read_server_config,
+)
+
+# The worker also rechecks the queue this often in case a wake up is lost.
+WAKE_TIMEOUT = 60
+
+
+def get_arguments():
+    """ Function to collect command line arguments.
+
+    Returns
+    -------
+    args : argparse.Namespace
+        The parsed command line arguments.
+    """
+    parser = ArgumentParser(description='inSPIRE-Interactive Worker.')
+
+    parser.add_argument(
+        '--config_file',
+        required=True,
+        help='All configurations.',
+    )
+    parser.add_argument(
+        '--interact_home',
+        default=os.getcwd(),
+        required=False,
+        help='The inSPIRE-Interactive home folder (default: current directory).',
+    )
+
+    return parser.parse_args()
+
+
+def get_job_context():
+    """ Function to get the multiprocessing context for running jobs. Forked
+        jobs inherit the worker's imports, spawned jobs must import again.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('spawn')
+
+
+def run_task(interact_home, project_home, task, server_config):
+    """ Function which runs a single inSPIRE task, using the server-wide caches
+        where possible. Runs in a child process of the job so that independent
+        tasks can run concurrently.
+    """
+    try:
+        if task == 'convert' and server_config[MGF_CACHE_SIZE_KEY]:
+            fetch_cached_scans(interact_home, project_home)
+        if task == 'predictSpectra' and server_config[SPECTRA_CACHE_SIZE_KEY]:
+            predict_spectra_with_cache(
+                interact_home, project_home, server_config[SPECTRA_CACHE_SIZE_KEY]
+            )
+        elif task == 'predictBinding' and server_config[BINDING_CACHE_KEY]:
+            predict_binding_with_cache(interact_home, project_home, server_config[JOB_CPUS_KEY])
+        else:
+            run_inspire(task, f'{project_home}/config.yml')
+        if task == 'convert' and server_config[MGF_CACHE_SIZE_KEY]:
+            store_converted_scans(
+                interact_home, project_home, server_config[MGF_CACHE_SIZE_KEY]
+            )
+        exit_code = 0
+    except Exception as e:
+        print('inSPIRE failed on task' + task  + 'with Exception:' + str(e))
+        print(traceback.format_exc())
+        exit_code = 1
+
+    sys.stdout.flush()
+    os._exit(exit_code)
+
+
+def get_ready_tasks(task_list, dependencies, task_statuses):
+    """ Function to find the queued tasks whose dependencies have all finished,
+        marking tasks as skipped if a required dependency did not complete.
+    """
+    ready_tasks = []
+    # Tasks are in dependency order, so skips propagate in a single pass.
+    for task in task_list:
+        if task_statuses[task] != 'Queued':
+            continue
+        dependency_statuses = [
+            (dependency, task_statuses[dependency]) for dependency in dependencies[task]
+        ]
+        if any(
+            status in ('Failed', 'Skipped') and dependency not in OPTIONAL_TASKS
+            for dependency, status in dependency_statuses
+        ):
+            task_statuses[task] = 'Skipped'
+        elif all(
+            status in ('Completed', 'Reused', 'Failed', 'Skipped')
+            for _, status in dependency_statuses
+        ):
+            ready_tasks.append(task)
+    return ready_tasks
+
+
+def clear_wake_socket(wake_socket):
+    """ Function to discard the wake ups received on a socket.
+    """
+    while True:
+        try:
+            wake_socket.recv(64)
+        except (BlockingIOError, socket.timeout):
+            break
+
+
+def reuse_previous_results(project_home, task_list):
+    """ Function to find the tasks whose results from a previous run of the
+        project can be reused, forgetting the previous results of all others.
+
+    Returns
+    -------
+    fingerprint_data : dict
+        The task fingerprints and file hashes of the project.
+    fingerprints : dict
+        Map of task ID to its fingerprint for this run.
+    reused_tasks : list of str
+        The tasks which do not need to run again.
+    """
+    fingerprint_data = read_fingerprints(project_home)
+    fingerprints = get_task_fingerprints(
+        project_home, task_list, fingerprint_data['fileHashes']
+    )
+    reused_tasks = get_reusable_tasks(task_list, fingerprint_data, fingerprints)
+    for task in task_list:
+        if task not in reused_tasks:
+            fingerprint_data['tasks'].pop(task, None)
+    write_fingerprints(project_home, fingerprint_data)
+
+    # Search results are cached by inSPIRE and must be reread if prepare reruns.
+    if 'prepare' not in reused_tasks and os.path.exists(
+        f'{project_home}/inspireOutput/formated_df.csv'
+    ):
+        os.remove(f'{project_home}/inspireOutput/formated_df.csv')
+
+    return fingerprint_data, fingerprints, reused_tasks
+
+
+def run_job(interact_home, job_id, project_home, task_list, server_config):
+    """ Function which runs all inSPIRE tasks of a job, requesting resources for
+        each task once the tasks it depends on have finished and starting it
+        when the worker grants them. Tasks whose results from a previous run
+        can be reused are not run again. Runs in a child process of the worker.
+    """
+    if hasattr(os, 'setpgrp'):
+        # Cancelling the job should also stop any processes started by inSPIRE.
+        os.setpgrp()
+
+    with open(f'{project_home}/inspire_log.txt', 'w', encoding='UTF-8') as log_file:
+        os.dup2(log_file.fileno(), sys.stdout.fileno())
+        os.dup2(log_file.fileno(), sys.stderr.fileno())
+
+    dependencies = get_task_dependencies(task_list)
+    fingerprint_data, fingerprints, reused_tasks = reuse_previous_results(
+        project_home, task_list
+    )
+    task_statuses = {
+        task: 'Reused' if task in reused_tasks else 'Queued' for task in task_list
+    }
+    task_context = get_job_context()
+    running = {}
+    started = {}
+    completed_tasks = {}
+    requested = set()
+    finished = []
+    written_statuses = None
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as wake_socket:
+        wake_socket.bind(('127.0.0.1', 0))
+        wake_socket.setblocking(False)
+        wake_port = wake_socket.getsockname()[1]
+
+        while True:
+            for task in get_ready_tasks(task_list, dependencies, task_statuses):
+                if task not in requested:
+                    request_resources(interact_home, job_id, task, wake_port)
+                    requested.add(task)
+            # Release only after requesting the next tasks so that they keep
+            # their place ahead of tasks requested later.
+            for task in finished:
+                release_resources(interact_home, job_id, task)
+            finished = []
+            for task in get_granted_tasks(interact_home, job_id):
+                if task_statuses[task] == 'Reused':
+                    # The worker grants the first task when starting the job.
+                    release_resources(interact_home, job_id, task)
+                if task_statuses[task] != 'Queued':
+                    continue
+                started[task] = time.time()
+                task_process = task_context.Process(
+                    target=run_task, args=(interact_home, project_home, task, server_config)
+                )
+                task_process.start()
+                running[task] = task_process
+                task_statuses[task] = 'Running'
+                requested.discard(task)
+            if task_statuses != written_statuses:
+                update_status(project_home, interact_home, job_id, task_statuses)
+                written_statuses = dict(task_statuses)
+
+            if not running and not requested:
+                break
+            wait(
+                [wake_socket] + [task_process.sentinel for task_process in running.values()],
+                timeout=WAKE_TIMEOUT,
+            )
+            clear_wake_socket(wake_socket)
+            for task, task_process in list(running.items()):
+                if task_process.exitcode is None:
+                    continue
+                task_process.join()
+                del running[task]
+                task_statuses[task] = 'Completed' if task_process.exitcode == 0 else 'Failed'
+                finished.append(task)
+                if task_process.exitcode == 0:
+                    completed_tasks[task] = (started[task], time.time(), set(running))
+            record_task_outputs(
+                project_home, fingerprint_data, fingerprints, completed_tasks, running
+            )
+
+    job_failed = any(
+        status not in ('Completed', 'Reused') and task not in OPTIONAL_TASKS
+        for task, status in task_statuses.items()
+    )
+    if not job_failed:
+        try:
+            # Prepare the results now rather than when they are first viewed.
+            write_results_summary(project_home)
+            convert_results_tables(project_home)
+        except (KeyError, OSError, ValueError, pa.ArrowException):
+            print(traceback.format_exc())
+    sys.stdout.flush()
+    os._exit(int(job_failed))
+
+
+def start_jobs(interact_home, server_config, task_resources, running):
+    """ Function to grant resources to waiting tasks, starting any jobs whose
+        first task has been granted.
+    """
+    wake_ports, started_jobs = grant_resources(
+        interact_home,
+        task_resources,
+        server_config[CPUS_KEY],
+        server_config[MEMORY_KEY],
+        server_config[QUEUE_POLICY_KEY],
+        server_config[MAX_USER_JOBS_KEY],
+    )
+    send_wake_up(wake_ports)
+
+    job_context = get_job_context()
+    for job in started_jobs:
+        project_home = f'{interact_home}/projects/{job["user"]}/{job["project"]}'
+        job_process = job_context.Process(
+            target=run_job,
+            args=(
+                interact_home,
+                job['taskID'],
+                project_home,
+                job['taskList'].split(','),
+                server_config,
+            ),
+        )
+        job_process.start()
+        if hasattr(os, 'setpgid'):
+            try:
+                # Also made by the job itself, whichever runs first, so that
+                # the job can be stopped as a group as soon as it is recorded.
+                os.setpgid(job_process.pid, job_process.pid)
+            except OSError:
+                pass
+        running[job['taskID']] = job_process
+        if not set_job_pid(interact_home, job['taskID'], job_process.pid) and (
+            not kill_job(job_process.pid)
+        ):
+            print(f'Could not stop process {job_process.pid} of cancelled job {job["taskID"]}.')
+        print(f'Started job {job["taskID"]} for {job["user"]}/{job["project"]}.')
+
+
+def finish_jobs(interact_home, server_config, running, adopted, archiving):
+    """ Function to remove finished jobs from the queue, building the result
+        archives of completed jobs in the background.
+    """
+    for job_id, job_process in list(running.items()):
+        if job_process.exitcode is None:
+            continue
+        job_process.join()
+        del running[job_id]
+        job = get_queue_job(interact_home, job_id)
+        # Cancelled jobs have already been removed from the queue.
+        remove_from_queue(
+            interact_home, job_id, 'finished' if job_process.exitcode == 0 else 'failed'
+        )
+        print(f'Job {job_id} exited with code {job_process.exitcode}.')
+        if job is not None and job_process.exitcode == 0 and server_config[ARCHIVE_CACHE_SIZE_KEY]:
+            archive_process = get_job_context().Process(
+                target=build_result_archives,
+                args=(
+                    interact_home,
+                    job['user'],
+                    job['project'],
+                    server_config[ARCHIVE_CACHE_SIZE_KEY],
+                ),
+            )
+            archive_process.start()
+            archiving.append(archive_process)
+
+    for archive_process in list(archiving):
+        if archive_process.exitcode is not None:
+            archive_process.join()
+            archiving.remove(archive_process)
+
+    for job_id, pid in list(adopted.items()):
+        if not psutil.pid_exists(pid):
+            del adopted[job_id]
+            remove_from_queue(interact_home, job_id, 'finished')
+
+
+def adopt_running_jobs(interact_home):
+    """ Function to find jobs left running by a previous worker. Jobs whose
+        process has died are removed from the queue.
+
+    Returns
+    -------
+    adopted : dict
+        Map of job ID to the process ID of jobs which are still running.
+    """
+    adopted = {}
+    queue_df = read_queue(interact_home)
+    for job_id in queue_df[queue_df['state'] == 'running']['taskID'].tolist():
+        job = get_queue_job(interact_home, job_id)
+        if job['pid'] is not None and psutil.pid_exists(job['pid']):
+            adopted[job_id] = job['pid']
+        else:
+            remove_from_queue(interact_home, job_id, 'lost')
+    return adopted
+
+
+def run_worker(interact_home, server_config):
+    """ Function to run jobs from the queue until the worker is stopped.
+    """
+    running = {}
+    archiving = []
+    adopted = adopt_running_jobs(interact_home)
+    task_resources = get_task_resources(server_config)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as wake_socket:
+        wake_socket.bind(('127.0.0.1', 0))
+        wake_socket.setblocking(False)
+        register_worker(interact_home, os.getpid(), wake_socket.getsockname()[1])
+        print(f'inSPIRE-Interactive worker {os.getpid()} waiting for jobs.')
+
+        while True:
+            finish_jobs(interact_home, server_config, running, adopted, archiving)
+            start_jobs(interact_home, server_config, task_resources, running)
+
+            wait(
+                [wake_socket] + [job_process.sentinel for job_process in running.values()],
+                timeout=WAKE_TIMEOUT,
+            )
+            clear_wake_socket(wake_socket)
+
+
+def main():
+    """ Main function to run the inSPIRE-Interactive worker.
+    """
+    args = get_arguments()
+    server_config = read_server_config(args.config_file)
+    interact_home = os.path.abspath(args.interact_home).replace('\\', '/')
+
+    # Exit immediately when stopped, leaving running jobs to be adopted on restart.
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, lambda *_: os._exit(0))
+    run_worker(interact_home, server_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+""" Functions for streaming zip archives of project folders to the client while
+    they are being built, with no temporary archive written to disk. Files are
+    split into blocks which are deflated in parallel and joined with full
+    flushes, so large files and many small files both use all threads.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import struct
+import time
+import zlib
+
+ZIP_BLOCK_SIZE = 4*1024*1024
+ZIP_COMPRESS_LEVEL = 6
+ZIP_THREADS = min(4, os.cpu_count() or 1)
+# Files which are already compressed are stored rather than deflated again.
+COMPRESSED_EXTENSIONS = (
+    '.bz2', '.gz', '.jpeg', '.jpg', '.parquet', '.pdf', '.png', '.xz', '.zip', '.zst',
+)
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+# General purpose flags: sizes follow the data in a descriptor, UTF-8 names.
+ZIP_FLAGS = 0x0008 | 0x0800
+
+
+def get_dos_time(mtime):
+    """ Function to convert a modification time to the MS-DOS date and time
+        stored in zip headers.
+    """
+    local_time = time.localtime(max(mtime, 315532800))
+    dos_date = (local_time.tm_year - 1980) << 9 | local_time.tm_mon << 5 | local_time.tm_mday
+    dos_time = local_time.tm_hour << 11 | local_time.tm_min << 5 | local_time.tm_sec // 2
+    return dos_time, dos_date
+
+
+def get_zip_members(folder_path, extra_files=None):
+    """ Function to list the files to archive, mapping the name of each member
+        to the path of the file, with any extra files added at the root.
+    """
+    zip_members = []
+    for dir_path, dir_names, file_names in os.walk(folder_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            file_path = f'{dir_path}/{file_name}'
+            zip_members.append(
+                (os.path.relpath(file_path, folder_path).replace(os.sep, '/'), file_path)
+            )
+    for member_name, file_path in (extra_files or {}).items():
+        if os.path.exists(file_path):
+            zip_members.append((member_name, file_path))
+    return zip_members
+
+
+def compress_block(file_path, offset, is_last, compress):
+    """ Function to read one block of a file and deflate it as part of a raw
+        deflate stream, only finishing the stream on the last block.
+
+    Returns
+    -------
+    block : bytes
+        The uncompressed block, used for the CRC.
+    data : bytes
+        The data to write to the archive.
+    """
+    with open(file_path, 'rb') as member_file:
+        member_file.seek(offset)
+        block = member_file.read(ZIP_BLOCK_SIZE)
+    if not compress:
+        return block, block
+    compressor = zlib.compressobj(ZIP_COMPRESS_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return block, compressor.compress(block) + compressor.flush(
+        zlib.Z_FINISH if is_last else zlib.Z_FULL_FLUSH
+    )
+
+
+def get_member_blocks(zip_members):
+    """ Function to split all files to archive into blocks.
+    """
+    for member_idx, (_, file_path) in enumerate(zip_members):
+        file_size = os.path.getsize(file_path)
+        compress = not file_path.lower().endswith(COMPRESSED_EXTENSIONS)
+        for offset in range(0, max(file_size, 1), ZIP_BLOCK_SIZE):
+            yield member_idx, file_path, offset, offset + ZIP_BLOCK_SIZE >= file_size, compress
+
+
+def stream_zip(folder_path, extra_files=None):
+    """ Function to generate a zip archive of a folder in chunks, as it is
+        built. Sizes are written after each member's data and ZIP64 records
+        are added when the archive or a member is too large for zip.
+    """
+    zip_members = get_zip_members(folder_path, extra_files)
+    central_directory = []
+    position = 0
+
+    with ThreadPoolExecutor(max_workers=ZIP_THREADS) as executor:
+        member_blocks = get_member_blocks(zip_members)
+        pending = deque()
+        current_member = None
+        while True:
+            # Keep a few blocks ahead so that all threads stay busy.
+            while len(pending) < 2*ZIP_THREADS:
+                next_block = next(member_blocks, None)
+                if next_block is None:
+                    break
+                member_idx, file_path, offset, is_last, compress = next_block
+                pending.append((member_idx, compress, is_last, executor.submit(
+                    compress_block, file_path, offset, is_last, compress,
+                )))
+            if not pending:
+                break
+
+            member_idx, compress, is_last, block_future = pending.popleft()
+            if member_idx != current_member:
+                current_member = member_idx
+                member_name, file_path = zip_members[member_idx]
+                file_stat = os.stat(file_path)
+                zip64 = file_stat.st_size >= ZIP64_LIMIT - ZIP_BLOCK_SIZE
+                member = {
+                    'name': member_name.encode('UTF-8'),
+                    'method': ZIP_DEFLATED if compress else ZIP_STORED,
+                    'dosTime': get_dos_time(file_stat.st_mtime),
+                    'mode': file_stat.st_mode,
+                    'offset': position,
+                    'zip64': zip64,
+                    'crc': 0,
+                    'compressedSize': 0,
+                    'size': 0,
+                }
+                local_header = struct.pack(
+                    '<IHHHHHIIIHH',
+                    0x04034b50,
+                    45 if zip64 else 20,
+                    ZIP_FLAGS,
+                    member['method'],
+                    *member['dosTime'],
+                    0,
+                    ZIP64_LIMIT if zip64 else 0,
+                    ZIP64_LIMIT if zip64 else 0,
+                    len(member['name']),
+                    20 if zip64 else 0,
+                ) + member['name']
+                if zip64:
+                    local_header += struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+                position += len(local_header)
+                yield local_header
+
+            block, data = block_future.result()
+            member['crc'] = zlib.crc32(block, member['crc'])
+            member['size'] += len(block)
+            member['compressedSize'] += len(data)
+            position += len(data)
+            yield data
+
+            if is_last:
+                data_descriptor = struct.pack(
+                    '<IIQQ' if member['zip64'] else '<IIII',
+                    0x08074b50,
+                    member['crc'],
+                    member['compressedSize'],
+                    member['size'],
+                )
+                position += len(data_descriptor)
+                central_directory.append(member)
+                yield data_descriptor
+
+    yield from get_central_directory(central_directory, position)
+
+
+def get_central_directory(central_directory, position):
+    """ Function to create the central directory and end of central directory
+        records of an archive, from the members written.
+    """
+    directory_start = position
+    directory_records = []
+    for member in central_directory:
+        zip64_fields = []
+        sizes = []
+        for field in ('size', 'compressedSize', 'offset'):
+            if member[field] >= ZIP64_LIMIT or (member['zip64'] and field != 'offset'):
+                zip64_fields.append(member[field])
+                sizes.append(ZIP64_LIMIT)
+            else:
+                sizes.append(member[field])
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(
+                f'<HH{len(zip64_fields)}Q', 0x0001, 8*len(zip64_fields), *zip64_fields
+            )
+        directory_records.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII',
+            0x02014b50,
+            45 | 3 << 8,
+            45 if zip64_fields else 20,
+            ZIP_FLAGS,
+            member['method'],
+            *member['dosTime'],
+            member['crc'],
+            sizes[1],
+            sizes[0],
+            len(member['name']),
+            len(extra),
+            0,
+            0,
+            0,
+            (member['mode'] & 0xFFFF) << 16,
+            sizes[2],
+        ) + member['name'] + extra)
+    directory = b''.join(directory_records)
+    directory_size = len(directory)
+    n_members = len(central_directory)
+
+    end_records = b''
+    if (
+        n_members >= ZIP64_COUNT_LIMIT or
+        directory_start >= ZIP64_LIMIT or
+        directory_size >= ZIP64_LIMIT
+    ):
+        zip64_end_start = directory_start + directory_size
+        end_records += struct.pack(
+            '<IQHHIIQQQQ',
+            0x06064b50, 44, 45 | 3 << 8, 45, 0, 0,
+            n_members, n_members, directory_size, directory_start,
+        )
+        end_records += struct.pack('<IIQI', 0x07064b50, 0, zip64_end_start, 1)
+    end_records += struct.pack(
+        '<IHHHHIIH',
+        0x06054b50,
+        0,
+        0,
+        min(n_members, ZIP64_COUNT_LIMIT),
+        min(n_members, ZIP64_COUNT_LIMIT),
+        min(directory_size, ZIP64_LIMIT),
+        min(directory_start, ZIP64_LIMIT),
+        0,
+    )
+    yield directory
+    yield end_records
@@ -15,6 +15,8 @@ setup(
     entry_points={
         'console_scripts': [
             'inspire-interact=inspire_interact.api:main',
+            'inspire-interact-worker=inspire_interact.worker:main',
+            'inspire-interact-benchmark=inspire_interact.benchmark:main',
         ]
     },
     packages=find_packages(),
@@ -25,8 +27,10 @@ setup(
         'click==8.1.3',
         'flask==2.3.2',
         'flask_cors==3.0.10',
+        'gunicorn>=21.2; platform_system != "Windows"',
         'itsdangerous==2.1.2',
         'psutil==5.9.6',
+        'pyarrow==14.0.2',
         'Werkzeug==3.0.1',
     ],
     project_urls={
@@ -0,0 +1,12 @@
+""" Fixtures shared by the inSPIRE-Interactive tests.
+"""
+import pytest
+
+
+@pytest.fixture
+def interact_home(tmp_path):
+    """ Fixture creating an empty interactHome with its queue folder.
+    """
+    (tmp_path / 'projects').mkdir()
+    (tmp_path / 'locks').mkdir()
+    return tmp_path.as_posix()
@@ -0,0 +1,51 @@
+""" Tests of replacing cached result archives when their contents change.
+"""
+from inspire_interact.archive_cache import add_archive
+from inspire_interact.constants import ARCHIVE_CACHE
+from inspire_interact.queue_manager import connect_queue
+
+MAX_SIZE = 1
+
+
+def get_cached_keys(interact_home):
+    """ Function to list the keys of the archive cache.
+    """
+    return sorted(
+        row['key'] for row in connect_queue(interact_home).execute(
+            'SELECT key FROM cache_entries WHERE cache = ?', (ARCHIVE_CACHE,)
+        )
+    )
+
+
+def cache_archive(interact_home, key):
+    """ Function to write an archive and add it to the cache under a key.
+    """
+    archive_path = f'{interact_home}/archive.zip'
+    with open(archive_path, 'wb') as archive_out:
+        archive_out.write(key.encode())
+    add_archive(interact_home, key, archive_path, MAX_SIZE)
+
+
+def test_new_archive_replaces_earlier_contents(interact_home):
+    cache_archive(interact_home, f'project/inspireOutput_{"a"*16}.zip')
+    cache_archive(interact_home, f'project/inspireOutput_{"b"*16}.zip')
+
+    assert get_cached_keys(interact_home) == [f'project/inspireOutput_{"b"*16}.zip']
+
+
+def test_other_archives_are_kept(interact_home):
+    other_keys = [
+        # Matched by the LIKE wildcard _ in spectral_plots_.
+        f'project/spectralXplots_{"a"*16}.zip',
+        # Shares the prefix of the new key but is a different archive.
+        f'project/spectral_plots_extra_{"a"*16}.zip',
+        f'other/spectral_plots_{"a"*16}.zip',
+    ]
+    for key in other_keys:
+        cache_archive(interact_home, key)
+
+    cache_archive(interact_home, f'project/spectral_plots_{"b"*16}.zip')
+
+    assert get_cached_keys(interact_home) == sorted(
+        other_keys + [f'project/spectral_plots_{"b"*16}.zip']
+    )
@@ -0,0 +1,151 @@
+""" Tests of reusing the results of tasks whose settings and inputs are unchanged.
+"""
+import os
+import time
+
+import pytest
+import yaml
+
+from inspire_interact.fingerprints import (
+    get_reusable_tasks,
+    get_task_fingerprints,
+    record_task_outputs,
+)
+
+TASK_LIST = [
+    'convert', 'fragger', 'prepare', 'predictSpectra',
+    'featureGeneration', 'featureSelection+', 'generateReport',
+]
+
+
+@pytest.fixture
+def project_home(tmp_path):
+    """ Fixture creating a project with MS data, a proteome and its config.
+    """
+    for folder in ('ms', 'proteome', 'inspireOutput'):
+        (tmp_path / folder).mkdir()
+    (tmp_path / 'ms' / 'sample.raw').write_bytes(b'raw data')
+    (tmp_path / 'proteome' / 'proteome.fasta').write_text('>prot\nMKTAYIAK\n')
+    write_config(tmp_path.as_posix(), {})
+    return tmp_path.as_posix()
+
+
+def write_config(project_home, changes):
+    """ Function to write the inSPIRE config of the project with some changes.
+    """
+    inspire_config = {
+        'scansFolder': f'{project_home}/ms',
+        'scansFormat': 'mgf',
+        'proteome': f'{project_home}/proteome/proteome.fasta',
+        'mzAccuracy': 0.02,
+        'falseDiscoveryRate': 0.01,
+        'nCores': 4,
+    }
+    inspire_config.update(changes)
+    with open(f'{project_home}/config.yml', 'w', encoding='UTF-8') as yaml_out:
+        yaml.dump(inspire_config, yaml_out)
+
+
+def write_output(project_home, file_name, contents, modified):
+    """ Function to write an output file with a given modification time.
+    """
+    with open(f'{project_home}/inspireOutput/{file_name}', 'w', encoding='UTF-8') as task_out:
+        task_out.write(contents)
+    os.utime(f'{project_home}/inspireOutput/{file_name}', (modified, modified))
+
+
+def run_tasks(project_home, fingerprints, task_list=TASK_LIST):
+    """ Function to run each task in turn, writing one output each.
+    """
+    fingerprint_data = {'tasks': {}, 'fileHashes': {}}
+    # Later than the files of the project, one second per step.
+    clock = time.time() + 10
+    for task in task_list:
+        write_output(project_home, f'{task}.out', task, clock + 1)
+        record_task_outputs(
+            project_home,
+            fingerprint_data,
+            fingerprints,
+            {task: (clock, clock + 2, set())},
+            {},
+        )
+        clock += 3
+    return fingerprint_data
+
+
+def get_changed_tasks(project_home, change):
+    """ Function to find the tasks which would run again after a change.
+    """
+    fingerprints = get_task_fingerprints(project_home, TASK_LIST, {})
+    fingerprint_data = run_tasks(project_home, fingerprints)
+    change()
+    new_fingerprints = get_task_fingerprints(project_home, TASK_LIST, {})
+    reusable_tasks = get_reusable_tasks(TASK_LIST, fingerprint_data, new_fingerprints)
+    return [task for task in TASK_LIST if task not in reusable_tasks]
+
+
+def test_unchanged_project_reuses_all_tasks(project_home):
+    assert get_changed_tasks(project_home, lambda: None) == []
+
+
+def test_execution_settings_do_not_invalidate(project_home):
+    assert get_changed_tasks(
+        project_home, lambda: write_config(project_home, {'nCores': 16})
+    ) == []
+
+
+def test_late_setting_invalidates_later_tasks(project_home):
+    assert get_changed_tasks(
+        project_home, lambda: write_config(project_home, {'falseDiscoveryRate': 0.05})
+    ) == ['featureSelection+', 'generateReport']
+
+
+def test_search_setting_invalidates_dependent_tasks(project_home):
+    assert get_changed_tasks(
+        project_home, lambda: write_config(project_home, {'mzAccuracy': 0.05})
+    ) == TASK_LIST[1:]
+
+
+def test_changed_input_file_invalidates_all_tasks(project_home):
+    def change_raw_file():
+        with open(f'{project_home}/ms/sample.raw', 'wb') as raw_out:
+            raw_out.write(b'new raw data')
+
+    assert get_changed_tasks(project_home, change_raw_file) == TASK_LIST
+
+
+def test_changed_output_invalidates_task_and_dependents(project_home):
+    def change_output():
+        with open(f'{project_home}/inspireOutput/prepare.out', 'w', encoding='UTF-8') as out:
+            out.write('changed by hand')
+
+    assert get_changed_tasks(project_home, change_output) == TASK_LIST[2:]
+
+
+def test_tasks_run_together_record_only_their_own_changes(project_home):
+    task_list = TASK_LIST[:3] + ['predictSpectra', 'predictBinding']
+    fingerprints = get_task_fingerprints(project_home, task_list, {})
+    fingerprint_data = run_tasks(project_home, fingerprints, task_list[:3])
+    clock = time.time() + 100
+
+    # predictSpectra and predictBinding start together, predictBinding
+    # rewrites its output after predictSpectra has completed.
+    completed_tasks = {}
+    write_output(project_home, 'spectra.out', 'spectra', clock + 1)
+    write_output(project_home, 'binding.out', 'partial', clock + 1)
+    completed_tasks['predictSpectra'] = (clock, clock + 2, {'predictBinding'})
+    record_task_outputs(
+        project_home, fingerprint_data, fingerprints, completed_tasks, {'predictBinding'}
+    )
+
+    assert 'predictSpectra' not in fingerprint_data['tasks']
+
+    write_output(project_home, 'binding.out', 'binding', clock + 3)
+    completed_tasks['predictBinding'] = (clock, clock + 4, set())
+    record_task_outputs(project_home, fingerprint_data, fingerprints, completed_tasks, {})
+
+    assert completed_tasks == {}
+    assert sorted(fingerprint_data['tasks']['predictSpectra']['outputs']) == [
+        f'{project_home}/inspireOutput/spectra.out',
+    ]
+    assert get_reusable_tasks(task_list, fingerprint_data, fingerprints) == task_list
@@ -0,0 +1,56 @@
+""" Tests of caching the rendered task status tables.
+"""
+import os
+
+import flask
+import pandas as pd
+import pytest
+
+from inspire_interact import handle_results
+from inspire_interact.handle_results import create_status_fig
+from inspire_interact.utils import write_task_df
+
+
+def write_statuses(project_home, statuses):
+    """ Function to write the task status file of a project.
+    """
+    os.makedirs(project_home, exist_ok=True)
+    write_task_df(project_home, pd.DataFrame({
+        'taskId': [f'task{task_idx}' for task_idx in range(len(statuses))],
+        'taskName': [f'Task {task_idx}' for task_idx in range(len(statuses))],
+        'taskIndex': list(range(1, len(statuses) + 1)),
+        'status': statuses,
+    }))
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    """ Fixture rendering templates from the package's templates folder.
+    """
+    with flask.Flask('inspire_interact', template_folder='templates').app_context():
+        yield
+
+
+def test_status_table_is_rendered_again_after_a_change(tmp_path):
+    project_home = tmp_path.as_posix()
+    write_statuses(project_home, ['Queued', 'Queued'])
+    queued_svg = create_status_fig(project_home)
+
+    assert create_status_fig(project_home) is queued_svg
+
+    write_statuses(project_home, ['Completed', 'Queued'])
+
+    assert 'Completed' in create_status_fig(project_home)
+
+
+def test_cache_keeps_most_recent_tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(handle_results, 'FIG_CACHE_SIZE', 3)
+    monkeypatch.setattr(handle_results, '_FIG_CACHE', {})
+    project_homes = [(tmp_path / f'project{idx}').as_posix() for idx in range(5)]
+    for project_home in project_homes:
+        write_statuses(project_home, ['Queued'])
+        create_status_fig(project_home)
+
+    assert list(handle_results._FIG_CACHE) == [
+        ('status', project_home) for project_home in project_homes[2:]
+    ]
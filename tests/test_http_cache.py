@@ -0,0 +1,114 @@
+""" Tests of sending result files in byte ranges.
+"""
+import os
+
+import flask
+import pytest
+
+from inspire_interact.http_cache import send_result_file
+
+FILE_SIZE = 10_000
+
+
+@pytest.fixture
+def result_file(tmp_path):
+    """ Fixture writing a result file of random bytes.
+    """
+    file_path = (tmp_path / 'spectralPlots.pdf').as_posix()
+    with open(file_path, 'wb') as file_out:
+        file_out.write(os.urandom(FILE_SIZE))
+    return file_path
+
+
+def send(file_path, headers=None, **kwargs):
+    """ Function to send a file for a request with the given headers.
+
+    Returns
+    -------
+    response : flask.Response
+        The response sent.
+    body : bytes
+        The body of the response.
+    """
+    app = flask.Flask(__name__)
+    with app.test_request_context(headers=headers or {}):
+        response = send_result_file(flask.request, file_path, **kwargs)
+        body = b''.join(response.response) if response.status_code in (200, 206) else b''
+        response.close()
+    return response, body
+
+
+def read_bytes(file_path, start, stop):
+    """ Function to read a range of a file.
+    """
+    with open(file_path, 'rb') as file_in:
+        return file_in.read()[start:stop]
+
+
+def test_whole_file(result_file):
+    response, body = send(result_file)
+
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert response.content_length == FILE_SIZE
+    assert body == read_bytes(result_file, 0, FILE_SIZE)
+
+
+@pytest.mark.parametrize('range_header, start, stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=100-199', 100, 200),
+    ('bytes=9000-', 9000, FILE_SIZE),
+    ('bytes=-500', FILE_SIZE - 500, FILE_SIZE),
+    # A suffix longer than the file is the whole file.
+    ('bytes=-20000', 0, FILE_SIZE),
+    # A range past the end is shortened to the file.
+    ('bytes=9990-20000', 9990, FILE_SIZE),
+])
+def test_single_range(result_file, range_header, start, stop):
+    response, body = send(result_file, {'Range': range_header})
+
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{FILE_SIZE}'
+    assert response.content_length == stop - start
+    assert body == read_bytes(result_file, start, stop)
+
+
+def test_range_outside_file(result_file):
+    response, _ = send(result_file, {'Range': f'bytes={FILE_SIZE}-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{FILE_SIZE}'
+
+
+def test_several_ranges_send_whole_file(result_file):
+    response, body = send(result_file, {'Range': 'bytes=0-9,20-29'})
+
+    assert response.status_code == 200
+    assert len(body) == FILE_SIZE
+
+
+def test_if_range(result_file):
+    etag = send(result_file)[0].get_etag()[0]
+
+    matching, body = send(result_file, {'Range': 'bytes=0-9', 'If-Range': f'"{etag}"'})
+    changed, _ = send(result_file, {'Range': 'bytes=0-9', 'If-Range': '"old"'})
+
+    assert matching.status_code == 206
+    assert body == read_bytes(result_file, 0, 10)
+    assert changed.status_code == 200
+
+
+def test_not_modified(result_file):
+    etag = send(result_file)[0].get_etag()[0]
+
+    response, _ = send(result_file, {'If-None-Match': f'"{etag}"'})
+
+    assert response.status_code == 304
+
+
+def test_download_name(result_file):
+    response, _ = send(result_file, mimetype='application/zip', download_name='results.zip')
+
+    assert response.headers['Content-Type'] == 'application/zip'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=results.zip'
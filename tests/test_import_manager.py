@@ -0,0 +1,93 @@
+""" Tests of importing files from server storage, which must stay within the
+    configured import roots.
+"""
+import os
+
+import pytest
+
+from inspire_interact.import_manager import (
+    import_files,
+    list_import_folder,
+    resolve_import_path,
+)
+
+
+@pytest.fixture
+def import_root(tmp_path):
+    """ Fixture creating an import root beside a folder which is not one.
+
+    Returns
+    -------
+    import_root : str
+        The real path of the import root.
+    """
+    for folder in ('nas/run1', 'nas2', 'private'):
+        (tmp_path / folder).mkdir(parents=True)
+    (tmp_path / 'nas' / 'run1' / 'sample.raw').write_bytes(b'raw data')
+    (tmp_path / 'nas' / '.hidden').write_bytes(b'hidden')
+    (tmp_path / 'nas2' / 'other.raw').write_bytes(b'other data')
+    (tmp_path / 'private' / 'secret.txt').write_bytes(b'secret')
+    os.symlink(tmp_path / 'private', tmp_path / 'nas' / 'escape')
+    os.symlink(tmp_path / 'nas' / 'run1' / 'sample.raw', tmp_path / 'nas' / 'latest.raw')
+    return os.path.realpath(tmp_path / 'nas')
+
+
+def test_path_within_root_is_resolved(import_root):
+    assert resolve_import_path([import_root], f'{import_root}/run1/sample.raw') == (
+        f'{import_root}/run1/sample.raw'
+    )
+    assert resolve_import_path([import_root], f'{import_root}/latest.raw') == (
+        f'{import_root}/run1/sample.raw'
+    )
+
+
+@pytest.mark.parametrize('import_path', [
+    '{root}/../private/secret.txt',
+    '{root}/run1/../../private/secret.txt',
+    # Shares the root's name as a prefix but is a different folder.
+    '{root}2/other.raw',
+    # A link within the root leading out of it.
+    '{root}/escape/secret.txt',
+    '/etc/passwd',
+])
+def test_path_outside_roots_is_refused(import_root, import_path):
+    with pytest.raises(ValueError, match='not within an import root'):
+        resolve_import_path([import_root], import_path.format(root=import_root))
+
+
+def test_listing_hides_links_out_of_roots(import_root):
+    folder_contents = list_import_folder([import_root], import_root)
+
+    assert folder_contents['folders'] == [f'{import_root}/run1']
+    assert [file_details['path'] for file_details in folder_contents['files']] == [
+        f'{import_root}/latest.raw',
+    ]
+    with pytest.raises(ValueError):
+        list_import_folder([import_root], f'{import_root}/escape')
+
+
+def test_files_are_imported_into_project(interact_home, import_root):
+    imported_files = import_files(
+        interact_home, [import_root], 'user', 'project', 'ms', [f'{import_root}/run1/sample.raw'],
+    )
+
+    assert list(imported_files) == ['sample.raw']
+    with open(f'{interact_home}/projects/user/project/ms/sample.raw', 'rb') as file_in:
+        assert file_in.read() == b'raw data'
+
+
+def test_import_outside_roots_is_refused(interact_home, import_root):
+    with pytest.raises(ValueError):
+        import_files(
+            interact_home, [import_root], 'user', 'project', 'ms',
+            [f'{import_root}/escape/secret.txt'],
+        )
+    with pytest.raises(ValueError, match='not a file'):
+        import_files(interact_home, [import_root], 'user', 'project', 'ms', [import_root])
+    with pytest.raises(ValueError, match='cannot be imported'):
+        import_files(
+            interact_home, [import_root], 'user', 'project', 'config',
+            [f'{import_root}/run1/sample.raw'],
+        )
+
+    assert not os.path.exists(f'{interact_home}/projects/user/project/ms/secret.txt')
@@ -0,0 +1,63 @@
+""" Tests of streaming the status of a project's job as server-sent events.
+"""
+import json
+import os
+
+import pytest
+
+from inspire_interact import job_status
+from inspire_interact.job_status import (
+    close_status_stream,
+    open_status_stream,
+    stream_job_status,
+)
+from inspire_interact.queue_manager import grant_resources, remove_from_queue, submit_job
+
+TASK_RESOURCES = {'convert': (1, 1)}
+
+
+@pytest.fixture(autouse=True)
+def fast_stream(monkeypatch):
+    """ Fixture checking for changes without waiting, for a few seconds at most.
+    """
+    monkeypatch.setattr(job_status, 'STATUS_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(job_status, 'STATUS_STREAM_LIFETIME', 5)
+
+
+def read_event(status_stream):
+    """ Function to read the next status event, skipping keep-alive comments.
+    """
+    for message in status_stream:
+        if message.startswith('event: status\n'):
+            return json.loads(message.split('data: ', 1)[1])
+    return None
+
+
+def test_stream_sends_each_change_until_finished(interact_home):
+    os.makedirs(f'{interact_home}/projects/user/project')
+    job_id = submit_job(interact_home, 'user', 'project', ['convert'])
+    grant_resources(interact_home, TASK_RESOURCES, 1, 1)
+    status_stream = stream_job_status(interact_home, 'user', 'project', None)
+
+    assert next(status_stream) == f'retry: {job_status.STATUS_RETRY_MS}\n\n'
+    assert read_event(status_stream)['state'] == 'starting'
+
+    remove_from_queue(interact_home, job_id)
+
+    assert read_event(status_stream) == {'state': 'finished'}
+    assert next(status_stream, None) is None
+
+
+def test_streams_are_limited_to_a_share_of_threads():
+    stream_ids = [open_status_stream(8) for _ in range(5)]
+
+    assert None not in stream_ids[:4]
+    assert stream_ids[4] is None
+
+    close_status_stream(stream_ids[0])
+    reopened_id = open_status_stream(8)
+
+    assert reopened_id is not None
+    for stream_id in stream_ids[1:4] + [reopened_id]:
+        close_status_stream(stream_id)
+    assert open_status_stream(1) is None
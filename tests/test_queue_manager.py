@@ -0,0 +1,108 @@
+""" Tests of granting resources to the jobs of the queue.
+"""
+from inspire_interact.constants import FIFO_POLICY, PRIORITY_POLICY
+from inspire_interact.queue_manager import (
+    connect_queue,
+    get_granted_tasks,
+    get_queue_job,
+    grant_resources,
+    release_resources,
+    remove_from_queue,
+    request_resources,
+    submit_job,
+)
+
+TASK_RESOURCES = {
+    'convert': (2, 4),
+    'fragger': (2, 8),
+    'prepare': (1, 8),
+}
+TASK_LIST = ['convert', 'fragger', 'prepare']
+
+
+def get_reservations(interact_home):
+    """ Function to list the reservations of the queue as (job, task, state).
+    """
+    return sorted(
+        (row['taskID'], row['task'], row['state'])
+        for row in connect_queue(interact_home).execute('SELECT * FROM reservations')
+    )
+
+
+def test_waiting_jobs_start_in_order_within_budget(interact_home):
+    job_ids = [
+        submit_job(interact_home, f'user{job_idx}', 'project', TASK_LIST)
+        for job_idx in range(3)
+    ]
+
+    wake_ports, started_jobs = grant_resources(interact_home, TASK_RESOURCES, 4, 64)
+
+    assert wake_ports == []
+    assert [job['taskID'] for job in started_jobs] == job_ids[:2]
+    assert get_queue_job(interact_home, job_ids[2])['state'] == 'waiting'
+    assert get_granted_tasks(interact_home, job_ids[0]) == ['convert']
+
+
+def test_priority_policy_starts_highest_priority_first(interact_home):
+    low_id = submit_job(interact_home, 'userA', 'project', TASK_LIST, priority=0)
+    high_id = submit_job(interact_home, 'userB', 'project', TASK_LIST, priority=5)
+
+    _, started_jobs = grant_resources(interact_home, TASK_RESOURCES, 2, 64, PRIORITY_POLICY)
+
+    assert [job['taskID'] for job in started_jobs] == [high_id]
+    assert get_queue_job(interact_home, low_id)['state'] == 'waiting'
+
+
+def test_running_job_requests_come_before_waiting_jobs(interact_home):
+    running_id = submit_job(interact_home, 'userA', 'project', TASK_LIST)
+    waiting_id = submit_job(interact_home, 'userB', 'project', TASK_LIST)
+    grant_resources(interact_home, TASK_RESOURCES, 2, 64, FIFO_POLICY)
+
+    request_resources(interact_home, running_id, 'fragger', 40000)
+    release_resources(interact_home, running_id, 'convert')
+    wake_ports, started_jobs = grant_resources(interact_home, TASK_RESOURCES, 2, 64)
+
+    assert wake_ports == [40000]
+    assert started_jobs == []
+    assert get_granted_tasks(interact_home, running_id) == ['fragger']
+    assert get_queue_job(interact_home, waiting_id)['state'] == 'waiting'
+
+
+def test_blocked_request_keeps_resources_it_waits_for(interact_home):
+    first_id = submit_job(interact_home, 'userA', 'project', TASK_LIST)
+    grant_resources(interact_home, TASK_RESOURCES, 3, 64)
+    second_id = submit_job(interact_home, 'userB', 'project', ['prepare'])
+
+    # The first job's fragger request does not fit beside its convert task,
+    # so the later, smaller job may not take the CPU it is waiting for.
+    request_resources(interact_home, first_id, 'fragger', 40000)
+    wake_ports, started_jobs = grant_resources(interact_home, TASK_RESOURCES, 3, 64)
+
+    assert wake_ports == []
+    assert started_jobs == []
+    assert get_queue_job(interact_home, second_id)['state'] == 'waiting'
+
+
+def test_requests_of_removed_jobs_are_not_recorded(interact_home):
+    job_id = submit_job(interact_home, 'userA', 'project', TASK_LIST)
+    grant_resources(interact_home, TASK_RESOURCES, 4, 64)
+    remove_from_queue(interact_home, job_id, 'cancelled')
+
+    request_resources(interact_home, job_id, 'fragger', 40000)
+    request_resources(interact_home, 99, 'prepare', 40001)
+
+    assert get_reservations(interact_home) == []
+
+
+def test_orphaned_reservations_are_removed(interact_home):
+    job_id = submit_job(interact_home, 'userA', 'project', TASK_LIST)
+    connect_queue(interact_home).execute(
+        """INSERT INTO reservations (taskID, task, state, requested, wakePort)
+            VALUES (99, 'prepare', 'requested', 0, 40000)"""
+    )
+
+    wake_ports, started_jobs = grant_resources(interact_home, TASK_RESOURCES, 4, 64)
+
+    assert wake_ports == []
+    assert [job['taskID'] for job in started_jobs] == [job_id]
+    assert get_reservations(interact_home) == [(job_id, 'convert', 'granted')]
@@ -0,0 +1,113 @@
+""" Tests of querying pages of the PSM assignments, checked against pandas.
+"""
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from inspire_interact import results_tables
+from inspire_interact.results_tables import query_results_table
+
+PSM_COUNT = 200
+COLUMNS = ['source', 'scan', 'peptide', 'proteins', 'qValue', 'score']
+
+
+@pytest.fixture
+def psm_df(tmp_path, monkeypatch):
+    """ Fixture writing the PSM assignments of a project, out of q-value order.
+    """
+    # Small row groups so that pages span several of them.
+    monkeypatch.setattr(results_tables, 'RESULTS_ROW_GROUP_SIZE', 16)
+    rng = random.Random(1)
+    psm_df = pd.DataFrame({
+        'source': [f'sample{psm_idx % 3}.mgf' for psm_idx in range(PSM_COUNT)],
+        'scan': list(range(PSM_COUNT)),
+        'peptide': [
+            ''.join(rng.choices('ACDEFGHIKLMN', k=9)) for _ in range(PSM_COUNT)
+        ],
+        'proteins': [f'prot{psm_idx % 7}' for psm_idx in range(PSM_COUNT)],
+        'qValue': rng.sample(range(PSM_COUNT), PSM_COUNT),
+        'score': rng.sample(range(PSM_COUNT), PSM_COUNT),
+    })
+    psm_df['qValue'] = psm_df['qValue']/1000
+    psm_df['score'] = psm_df['score']/10
+    os.makedirs(tmp_path / 'inspireOutput')
+    psm_df.to_csv(tmp_path / 'inspireOutput' / 'finalPsmAssignments.csv', index=False)
+    return psm_df
+
+
+def query_page(project_home, **query):
+    """ Function to query a page of the PSMs, returning its rows as a DataFrame.
+    """
+    results_page = query_results_table(project_home, 'psms', query)
+    return results_page, pd.DataFrame(results_page['rows'], columns=results_page['columns'])
+
+
+def get_expected_page(psm_df, page, page_size, columns=COLUMNS):
+    """ Function to get the rows of a page of an already filtered and sorted table.
+    """
+    return psm_df.iloc[(page - 1)*page_size:page*page_size][columns].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('page', [1, 3, 20])
+def test_pages_in_q_value_order(tmp_path, psm_df, page):
+    results_page, page_df = query_page(tmp_path.as_posix(), page=page, pageSize=10)
+
+    assert results_page['totalRows'] == PSM_COUNT
+    pd.testing.assert_frame_equal(
+        page_df, get_expected_page(psm_df.sort_values('qValue'), page, 10),
+    )
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_sorted_page_matches_full_sort(tmp_path, psm_df, order):
+    _, page_df = query_page(
+        tmp_path.as_posix(), sort='score', order=order, page=4, pageSize=15,
+        columns='peptide,qValue',
+    )
+
+    expected_df = psm_df.sort_values('score', ascending=order == 'asc')
+    pd.testing.assert_frame_equal(
+        page_df, get_expected_page(expected_df, 4, 15, ['peptide', 'qValue']),
+    )
+
+
+def test_filters_are_applied_before_paging(tmp_path, psm_df):
+    results_page, page_df = query_page(
+        tmp_path.as_posix(), source='sample1.mgf', protein='PROT3', maxQValue='0.1',
+        sort='scan', order='desc', pageSize=5,
+    )
+
+    expected_df = psm_df[
+        (psm_df['source'] == 'sample1.mgf') &
+        (psm_df['proteins'] == 'prot3') &
+        (psm_df['qValue'] <= 0.1)
+    ].sort_values('scan', ascending=False)
+    assert results_page['totalRows'] == len(expected_df)
+    pd.testing.assert_frame_equal(page_df, get_expected_page(expected_df, 1, 5))
+
+
+def test_page_past_the_end_is_empty(tmp_path, psm_df):
+    results_page, _ = query_page(tmp_path.as_posix(), page=100, pageSize=50)
+
+    assert results_page['rows'] == []
+    assert results_page['totalRows'] == PSM_COUNT
+
+
+def test_changed_assignments_are_converted_again(tmp_path, psm_df):
+    query_page(tmp_path.as_posix())
+    psm_df.iloc[:10].to_csv(
+        tmp_path / 'inspireOutput' / 'finalPsmAssignments.csv', index=False,
+    )
+
+    assert query_page(tmp_path.as_posix())[0]['totalRows'] == 10
+
+
+@pytest.mark.parametrize('query', [
+    {'columns': 'peptide,missing'},
+    {'sort': 'missing'},
+])
+def test_unknown_columns_are_refused(tmp_path, psm_df, query):
+    with pytest.raises(ValueError, match='Unknown column'):
+        query_results_table(tmp_path.as_posix(), 'psms', query)
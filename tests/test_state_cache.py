@@ -0,0 +1,71 @@
+""" Tests of caching the parsed files describing the state of projects.
+"""
+import os
+
+import pytest
+
+from inspire_interact import state_cache
+from inspire_interact.state_cache import read_cached_file
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """ Fixture counting the times each file is parsed, with an empty cache.
+    """
+    monkeypatch.setattr(state_cache, '_STATE_CACHE', {})
+    return []
+
+
+def create_parser(reads):
+    """ Function to create a parser which records each file it reads.
+    """
+    def parse_file(file_path):
+        reads.append(file_path)
+        with open(file_path, 'r', encoding='UTF-8') as file_in:
+            return {'lines': file_in.read().splitlines()}
+    return parse_file
+
+
+def test_unchanged_file_is_parsed_once(tmp_path, reads):
+    (tmp_path / 'meta.txt').write_text('a\nb\n')
+
+    contents = read_cached_file((tmp_path / 'meta.txt').as_posix(), create_parser(reads))
+    contents['lines'].append('changed by caller')
+
+    assert read_cached_file((tmp_path / 'meta.txt').as_posix(), create_parser(reads)) == {
+        'lines': ['a', 'b'],
+    }
+    assert len(reads) == 1
+
+
+def test_replaced_file_is_parsed_again(tmp_path, reads):
+    file_path = (tmp_path / 'meta.txt').as_posix()
+    (tmp_path / 'meta.txt').write_text('a\n')
+    read_cached_file(file_path, create_parser(reads))
+    file_stat = os.stat(file_path)
+
+    # Same size and modification time, replaced atomically.
+    (tmp_path / 'meta.txt.tmp').write_text('b\n')
+    os.utime(tmp_path / 'meta.txt.tmp', ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+    os.replace(tmp_path / 'meta.txt.tmp', file_path)
+
+    assert read_cached_file(file_path, create_parser(reads)) == {'lines': ['b']}
+    assert len(reads) == 2
+
+
+def test_missing_file_is_not_cached(tmp_path, reads):
+    with pytest.raises(FileNotFoundError):
+        read_cached_file((tmp_path / 'missing.txt').as_posix(), create_parser(reads))
+
+    assert reads == []
+
+
+def test_cache_keeps_most_recent_files(tmp_path, reads, monkeypatch):
+    monkeypatch.setattr(state_cache, 'STATE_CACHE_SIZE', 2)
+    file_paths = [(tmp_path / f'meta{idx}.txt').as_posix() for idx in range(3)]
+    for file_path in file_paths:
+        with open(file_path, 'w', encoding='UTF-8') as file_out:
+            file_out.write(file_path)
+        read_cached_file(file_path, create_parser(reads))
+
+    assert list(state_cache._STATE_CACHE) == file_paths[1:]
@@ -0,0 +1,71 @@
+""" Tests of resumable, chunked uploads.
+"""
+import io
+import os
+import zlib
+
+import pytest
+
+from inspire_interact.upload_manager import start_upload, write_chunk
+
+FILE_DATA = os.urandom(1000)
+UPLOAD_DETAILS = {
+    'fileName': 'sample.raw', 'fileIdx': 0, 'size': len(FILE_DATA), 'lastModified': 1,
+}
+
+
+def send_chunk(interact_home, upload_id, start, stop, checksum=None, project='project'):
+    """ Function to send part of the file as a chunk of an upload.
+    """
+    chunk = FILE_DATA[start:stop]
+    return write_chunk(
+        interact_home,
+        'user',
+        project,
+        'ms',
+        upload_id,
+        start,
+        io.BytesIO(chunk),
+        zlib.crc32(chunk) if checksum is None else checksum,
+    )
+
+
+def test_chunks_are_moved_into_place_once_complete(interact_home):
+    upload = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+
+    assert send_chunk(interact_home, upload['uploadID'], 0, 600) == (600, False, True)
+    assert send_chunk(interact_home, upload['uploadID'], 600, 1000) == (1000, True, True)
+    with open(f'{interact_home}/projects/user/project/ms/sample.raw', 'rb') as file_in:
+        assert file_in.read() == FILE_DATA
+
+
+def test_interrupted_upload_resumes(interact_home):
+    upload = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+    send_chunk(interact_home, upload['uploadID'], 0, 400)
+
+    resumed = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+
+    assert resumed['uploadID'] == upload['uploadID']
+    assert resumed['offset'] == 400
+
+
+def test_chunk_at_wrong_offset_is_not_written(interact_home):
+    upload = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+
+    assert send_chunk(interact_home, upload['uploadID'], 200, 400) == (0, False, False)
+
+
+def test_chunk_with_wrong_checksum_is_not_received(interact_home):
+    upload = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+
+    with pytest.raises(ValueError, match='checksum'):
+        send_chunk(interact_home, upload['uploadID'], 0, 400, checksum=0)
+
+    assert start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)['offset'] == 0
+
+
+def test_chunk_of_another_project_is_refused(interact_home):
+    upload = start_upload(interact_home, 'user', 'project', 'ms', UPLOAD_DETAILS)
+
+    with pytest.raises(KeyError):
+        send_chunk(interact_home, upload['uploadID'], 0, 400, project='other')
@@ -0,0 +1,155 @@
+""" Tests of streaming zip archives, read back with the standard library.
+"""
+import io
+import os
+import zipfile
+
+from inspire_interact import zip_stream
+from inspire_interact.zip_stream import ZIP64_LIMIT, stream_zip
+
+# Parts of a streamed archive kept in memory, the rest of a large member is zeros.
+ARCHIVE_END_SIZE = 1024*1024
+
+
+def create_folder(folder_path):
+    """ Function to create a folder of files of different kinds and sizes.
+
+    Returns
+    -------
+    contents : dict
+        Map of archive member name to the contents of the file.
+    """
+    contents = {
+        'empty.txt': b'',
+        'small.csv': b'peptide,qValue\nAAAA,0.01\n',
+        'large.csv': b''.join(f'PEPTIDE{idx},{idx/1e5}\n'.encode() for idx in range(20_000)),
+        'random.bin': os.urandom(50_000),
+        'plots/spectralPlots.pdf': b'%PDF-1.4' + os.urandom(10_000),
+    }
+    for member_name, file_data in contents.items():
+        os.makedirs(os.path.dirname(f'{folder_path}/{member_name}'), exist_ok=True)
+        with open(f'{folder_path}/{member_name}', 'wb') as file_out:
+            file_out.write(file_data)
+    return contents
+
+
+class SparseArchive(io.RawIOBase):
+    """ Archive of which only the start and end are kept, read as zeros between.
+    """
+    def __init__(self, archive_start, archive_end, archive_size):
+        self.archive_start = archive_start
+        self.archive_end = archive_end
+        self.archive_size = archive_size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.position = {
+            io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.archive_size,
+        }[whence] + offset
+        return self.position
+
+    def readinto(self, buffer):
+        read_size = max(min(len(buffer), self.archive_size - self.position), 0)
+        end_start = self.archive_size - len(self.archive_end)
+        for buffer_idx in range(read_size):
+            archive_idx = self.position + buffer_idx
+            if archive_idx < len(self.archive_start):
+                buffer[buffer_idx] = self.archive_start[archive_idx]
+            elif archive_idx >= end_start:
+                buffer[buffer_idx] = self.archive_end[archive_idx - end_start]
+            else:
+                buffer[buffer_idx] = 0
+        self.position += read_size
+        return read_size
+
+
+def read_archive(folder_path, extra_files=None):
+    """ Function to stream an archive and open it with zipfile.
+    """
+    return zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(folder_path, extra_files))))
+
+
+def test_archive_contains_all_files(tmp_path, monkeypatch):
+    # Small blocks so that large files are deflated in several parts.
+    monkeypatch.setattr(zip_stream, 'ZIP_BLOCK_SIZE', 4096)
+    contents = create_folder(tmp_path / 'output')
+    with open(tmp_path / 'config.yml', 'wb') as config_out:
+        config_out.write(b'experimentTitle: test\n')
+    contents['config.yml'] = b'experimentTitle: test\n'
+
+    with read_archive(
+        (tmp_path / 'output').as_posix(), {'config.yml': (tmp_path / 'config.yml').as_posix()}
+    ) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(contents)
+        for member_name, file_data in contents.items():
+            assert archive.read(member_name) == file_data
+
+
+def test_compressed_files_are_stored(tmp_path):
+    create_folder(tmp_path)
+
+    with read_archive(tmp_path.as_posix()) as archive:
+        assert archive.getinfo('plots/spectralPlots.pdf').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('large.csv').compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_zip64_end_records_are_readable(tmp_path, monkeypatch):
+    # Written once an archive has too many members for the zip end record.
+    monkeypatch.setattr(zip_stream, 'ZIP64_COUNT_LIMIT', 2)
+    contents = create_folder(tmp_path)
+
+    archive_data = b''.join(stream_zip(tmp_path.as_posix()))
+
+    assert b'PK\x06\x06' in archive_data
+    with zipfile.ZipFile(io.BytesIO(archive_data)) as archive:
+        assert archive.testzip() is None
+        assert len(archive.namelist()) == len(contents)
+
+
+def test_missing_extra_files_are_skipped(tmp_path):
+    contents = create_folder(tmp_path)
+
+    with read_archive(
+        tmp_path.as_posix(), {'config.yml': (tmp_path / 'missing.yml').as_posix()}
+    ) as archive:
+        assert sorted(archive.namelist()) == sorted(contents)
+
+
+def test_zip64_members_beyond_4gb_are_readable(tmp_path):
+    # A sparse file, so that only the start and end take up space.
+    with open(tmp_path / 'large.pdf', 'wb') as large_out:
+        large_out.write(b'%PDF-1.4')
+        large_out.seek(ZIP64_LIMIT + 4096)
+        large_out.write(b'%%EOF')
+    with open(tmp_path / 'small.csv', 'wb') as small_out:
+        small_out.write(b'peptide,qValue\nAAAA,0.01\n')
+
+    archive_start = b''
+    archive_end = b''
+    archive_size = 0
+    for data in stream_zip(tmp_path.as_posix()):
+        if len(archive_start) < ARCHIVE_END_SIZE:
+            archive_start += data[:ARCHIVE_END_SIZE - len(archive_start)]
+        archive_end = (archive_end + data)[-ARCHIVE_END_SIZE:]
+        archive_size += len(data)
+
+    assert b'PK\x06\x06' in archive_end
+    with zipfile.ZipFile(SparseArchive(archive_start, archive_end, archive_size)) as archive:
+        large_info = archive.getinfo('large.pdf')
+        small_info = archive.getinfo('small.csv')
+        assert large_info.file_size == ZIP64_LIMIT + 4101
+        assert large_info.compress_type == zipfile.ZIP_STORED
+        assert small_info.header_offset > ZIP64_LIMIT
+        with archive.open('large.pdf') as large_in:
+            assert large_in.read(8) == b'%PDF-1.4'
+        assert archive.read('small.csv') == b'peptide,qValue\nAAAA,0.01\n'